@@ -1,5 +1,7 @@
 from django.contrib.auth.hashers import check_password, make_password
+from core.utils.exceptions import ServiceBusy
 from .models import User
+from .utils.hashing import HashingOverloaded, PasswordHasherPool
 
 
 class Authentication:
@@ -51,4 +53,56 @@ class Authentication:
             )
             return user
         except Exception:
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    async def asignin(email: str, password: str):
+        """
+        Versão assíncrona de ``signin``.
+        
+        A verificação da senha roda no pool dedicado de hashing, sem
+        bloquear o event loop.
+        
+        Raises:
+            ServiceBusy: Se a fila de hashing estiver cheia
+        """
+        try:
+            user = await User.objects.aget(email=email)
+        except User.DoesNotExist:
+            return False
+        
+        try:
+            if await PasswordHasherPool.check_password(password, user.password):
+                return user
+        except HashingOverloaded:
+            raise ServiceBusy()
+        
+        return False
+    
+    @staticmethod
+    async def asignup(name: str, email: str, password: str):
+        """
+        Versão assíncrona de ``signup``.
+        
+        O hash da senha é gerado no pool dedicado de hashing, sem bloquear
+        o event loop.
+        
+        Raises:
+            ServiceBusy: Se a fila de hashing estiver cheia
+        """
+        if await User.objects.filter(email=email).aexists():
+            return False
+        
+        try:
+            encoded = await PasswordHasherPool.make_password(password)
+        except HashingOverloaded:
+            raise ServiceBusy()
+        
+        try:
+            return await User.objects.acreate(
+                name=name,
+                email=email,
+                password=encoded
+            )
+        except Exception:
+            return False
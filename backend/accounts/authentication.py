@@ -0,0 +1,140 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core.utils.cache import SharedCache
+from core.utils.replicas import ReplicaRouting
+from .models import User
+
+
+class CachedUser(SimpleLazyObject):
+    """
+    Usuário autenticado carregado sob demanda.
+
+    Responde ``id``, ``pk``, ``email``, ``is_superuser`` e as flags de
+    autenticação a partir do snapshot em cache. Qualquer outro atributo (ou
+    uso como instância de modelo no ORM) carrega o ``User`` completo do banco
+    uma única vez, de forma transparente.
+    """
+
+    def __init__(self, snapshot):
+        self.__dict__['_snapshot'] = snapshot
+        super().__init__(lambda: User.objects.get(id=snapshot['id']))
+
+    def __getattr__(self, name):
+        snapshot = self.__dict__['_snapshot']
+
+        if self._wrapped is empty:
+            if name in snapshot:
+                return snapshot[name]
+            if name == 'pk':
+                return snapshot['id']
+            if name == 'is_staff':
+                return snapshot['is_superuser']
+            if name in ('is_authenticated', 'is_active'):
+                return True
+            if name == 'is_anonymous':
+                return False
+
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Autenticação JWT com cache da verificação do token e do usuário.
+
+    Tokens já verificados ficam em cache (chave = hash do token) até
+    ``AUTH_CACHE_TIMEOUT`` ou a expiração do token, o que vier antes; em um
+    acerto o token é apenas decodificado e a expiração é conferida de novo,
+    exatamente como na verificação completa. O usuário vem de um snapshot
+    leve em cache, invalidado quando o usuário é salvo ou removido.
+
+    O snapshot só é usado com um cache compartilhado (``SharedCache``): no
+    cache local a invalidação não chegaria aos outros processos, que
+    continuariam com email, is_superuser ou is_active antigos por até
+    ``AUTH_CACHE_TIMEOUT``.
+    """
+
+    @staticmethod
+    def token_cache_key(raw_token):
+        """Retorna a chave de cache de um token."""
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return f'auth:token:{hashlib.sha256(raw_token).hexdigest()}'
+
+    @staticmethod
+    def user_cache_key(user_id):
+        """Retorna a chave de cache do snapshot de um usuário."""
+        return f'auth:user:{user_id}'
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """Remove o snapshot em cache de um usuário."""
+        cache.delete(CachedJWTAuthentication.user_cache_key(user_id))
+
+    def get_validated_token(self, raw_token):
+        """Valida o token usando o cache de tokens já verificados."""
+        key = self.token_cache_key(raw_token)
+        token_type = cache.get(key)
+
+        if token_type is not None:
+            for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
+                if AuthToken.token_type != token_type:
+                    continue
+                try:
+                    token = AuthToken(raw_token, verify=False)
+                    token.check_exp()
+                    return token
+                except TokenError:
+                    cache.delete(key)
+                    raise InvalidToken(_('Token is invalid or expired'))
+
+        token = super().get_validated_token(raw_token)
+
+        remaining = int(token['exp'] - token.current_time.timestamp())
+        timeout = min(settings.AUTH_CACHE_TIMEOUT, remaining)
+        if timeout > 0:
+            cache.set(key, token.token_type, timeout)
+
+        return token
+
+    def get_user(self, validated_token):
+        """Retorna o usuário do token a partir do snapshot em cache."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        # Define se as leituras desta requisição podem ir para a réplica
+        ReplicaRouting.identify(user_id)
+
+        if not SharedCache.available():
+            return super().get_user(validated_token)
+
+        key = self.user_cache_key(user_id)
+        snapshot = cache.get(key)
+
+        if snapshot is None:
+            user = super().get_user(validated_token)
+            snapshot = {
+                'id': user.id,
+                'email': user.email,
+                'is_superuser': user.is_superuser,
+            }
+            cache.set(key, snapshot, settings.AUTH_CACHE_TIMEOUT)
+            return user
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # A checagem de troca de senha precisa do hash atual
+            return super().get_user(validated_token)
+
+        return CachedUser(snapshot)
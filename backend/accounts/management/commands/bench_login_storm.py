@@ -0,0 +1,75 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from accounts.utils.hashing import PasswordHasherPool
+
+
+class Command(BaseCommand):
+    help = 'Mede logins/s e a latência de /api/v1/chats/ durante um pico de logins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='Email de um usuário existente')
+        parser.add_argument('--password', required=True, help='Senha do usuário')
+        parser.add_argument('--logins', type=int, default=200, help='Total de logins')
+        parser.add_argument('--concurrency', type=int, default=50, help='Logins simultâneos')
+        parser.add_argument('--probe-interval', type=float, default=0.05, help='Intervalo (s) entre requisições de chats')
+
+    def handle(self, *args, **options):
+        user = User.objects.get(email=options['email'])
+        token = str(AccessToken.for_user(user))
+
+        # O AsyncClient sempre envia Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            result = asyncio.run(self.storm(token, options))
+
+        self.stdout.write(f"Logins: {result['logins']} em {result['elapsed']:.2f}s "
+                          f"({result['logins'] / result['elapsed']:.1f}/s), "
+                          f"rejeitados (503): {result['rejected']}")
+
+        latencies = result['latencies']
+        if latencies:
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(f"Chats: {len(latencies)} requisições, "
+                              f"p50 {statistics.median(latencies):.1f} ms, p99 {p99:.1f} ms")
+
+        self.stdout.write(self.style.SUCCESS(f'Pool de hashing: {PasswordHasherPool.stats()}'))
+
+    async def storm(self, token, options):
+        """Dispara os logins concorrentes enquanto mede a rota de chats."""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        body = {'email': options['email'], 'password': options['password']}
+        result = {'logins': 0, 'rejected': 0, 'latencies': []}
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                response = await client.post('/api/v1/accounts/signin/', body, content_type='application/json')
+            if response.status_code == 503:
+                result['rejected'] += 1
+            else:
+                result['logins'] += 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get('/api/v1/chats/', headers={'authorization': f'Bearer {token}'})
+                result['latencies'].append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(options['probe_interval'])
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(options['logins'])))
+        result['elapsed'] = time.perf_counter() - started
+        done.set()
+        await prober
+
+        return result
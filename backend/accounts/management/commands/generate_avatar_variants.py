@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from accounts.utils.avatars import AvatarPipeline
+from core.utils.storage import media_storage
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes de tamanho fixo dos avatares enviados antes do pipeline'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Gerando variantes de avatares...')
+        
+        generated_count = 0
+        
+        for user in User.objects.filter(avatar_variants={}).only('id', 'avatar').iterator():
+            name = media_storage.name_from_url(user.avatar)
+            if not user.has_custom_avatar() or not name or not media_storage.exists(name):
+                continue
+            
+            try:
+                if AvatarPipeline.process(user.id, user.avatar):
+                    generated_count += 1
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'Usuário {user.id}: {e}'))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'{generated_count} avatares processados com sucesso!')
+        )
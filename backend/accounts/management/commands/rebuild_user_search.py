@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from accounts.utils.search import UserSearch
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca (search_text e tokens) de todos os usuários'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruindo índice de busca de usuários...')
+        
+        rebuilt_count = 0
+        
+        for user in User.objects.only('id', 'name', 'email').iterator():
+            User.objects.filter(id=user.id).update(
+                search_text=UserSearch.build_search_text(user.name, user.email)
+            )
+            UserSearch.index_user(user)
+            rebuilt_count += 1
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'{rebuilt_count} usuários indexados com sucesso!')
+        )
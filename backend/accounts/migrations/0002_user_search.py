@@ -0,0 +1,59 @@
+# Generated by Django 4.2.18 on 2026-10-18 23:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.utils.search import UserSearch
+
+
+def build_search_index(apps, schema_editor):
+    """Preenche search_text e os tokens dos usuários existentes."""
+    User = apps.get_model('accounts', 'User')
+    UserSearchToken = apps.get_model('accounts', 'UserSearchToken')
+
+    for user in User.objects.only('id', 'name', 'email').iterator():
+        User.objects.filter(id=user.id).update(
+            search_text=UserSearch.build_search_text(user.name, user.email)
+        )
+        UserSearch.index_user(user, token_model=UserSearchToken)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('W', 'WORD'), ('G', 'GRAM')], max_length=1)),
+                ('token', models.CharField(max_length=64)),
+            ],
+            options={
+                'db_table': 'user_search_tokens',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.CharField(default='', editable=False, max_length=340),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['name', 'id'], name='users_name_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='usersearchtoken',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='usersearchtoken',
+            index=models.Index(fields=['kind', 'token'], name='user_search_kind_token_idx'),
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.18 on 2026-10-19 00:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def fill_sync_seq(apps, schema_editor):
+    """Começa a sequência de cada usuário na maior versão dos seus chats."""
+    User = apps.get_model('accounts', 'User')
+    Chat = apps.get_model('chats', 'Chat')
+
+    latest = [
+        Coalesce(Subquery(
+            Chat.objects.filter(**{side: OuterRef('pk')}).order_by('-version').values('version')[:1]
+        ), Value(0))
+        for side in ('from_user', 'to_user')
+    ]
+    User.objects.update(sync_seq=Greatest(*latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_avatar_variants'),
+        ('chats', '0008_message_attachment_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='sync_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_sync_seq, migrations.RunPython.noop),
+    ]
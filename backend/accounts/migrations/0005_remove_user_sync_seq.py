@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-19 02:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_sync_seq'),
+        ('chats', '0009_sync_sequence_table'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='sync_seq',
+        ),
+    ]
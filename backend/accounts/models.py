@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
-import hashlib
-from urllib.parse import urlencode
+
+from .utils.initials import InitialsAvatar
+from .utils.search import UserSearch
 
 
 class UserManager(BaseUserManager):
@@ -27,10 +28,12 @@ class User(AbstractBaseUser):
     """Modelo de usuário customizado."""
     
     avatar = models.TextField(default='/media/avatars/default-avatar.png')
+    avatar_variants = models.JSONField(default=dict, blank=True)
     name = models.CharField(max_length=80)
     email = models.EmailField(unique=True)
     is_superuser = models.BooleanField(default=False)
     last_access = models.DateTimeField(auto_now_add=True)
+    search_text = models.CharField(max_length=340, default='', editable=False)
     
     objects = UserManager()
     
@@ -38,10 +41,38 @@ class User(AbstractBaseUser):
     
     class Meta:
         db_table = 'users'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='users_name_id_idx'),
+        ]
     
     def __str__(self):
         return self.email
     
+    def save(self, *args, **kwargs):
+        """Salva o usuário mantendo os tokens de busca sincronizados."""
+        search_text = UserSearch.build_search_text(self.name, self.email)
+        reindex = self._state.adding or search_text != self.search_text
+        self.search_text = search_text
+        
+        update_fields = kwargs.get('update_fields')
+        if reindex and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        
+        super().save(*args, **kwargs)
+        
+        if reindex:
+            UserSearch.index_user(self)
+        
+        # Invalida o snapshot usado pela autenticação
+        from .authentication import CachedJWTAuthentication
+        CachedJWTAuthentication.invalidate_user(self.id)
+    
+    def delete(self, *args, **kwargs):
+        """Remove o usuário e invalida o snapshot usado pela autenticação."""
+        from .authentication import CachedJWTAuthentication
+        CachedJWTAuthentication.invalidate_user(self.id)
+        return super().delete(*args, **kwargs)
+    
     def has_perm(self, perm, obj=None):
         """Verifica se o usuário tem uma permissão específica."""
         return self.is_superuser
@@ -57,62 +88,107 @@ class User(AbstractBaseUser):
     
     def get_initials(self):
         """Retorna as iniciais do nome do usuário."""
-        if self.name:
-            parts = self.name.strip().split()
+        return User.initials_for(self.name, self.email)
+    
+    @staticmethod
+    def initials_for(name, email):
+        """Calcula as iniciais a partir do nome (ou do email, se não houver nome)."""
+        if name:
+            parts = name.strip().split()
             if len(parts) >= 2:
                 return f"{parts[0][0].upper()}{parts[-1][0].upper()}"
             elif len(parts) == 1:
                 return parts[0][:2].upper()
-        return self.email[:2].upper()
+        
+        return email[:2].upper()
+    
+    def has_custom_avatar(self):
+        """Verifica se o usuário enviou um avatar próprio."""
+        return User.is_custom_avatar(self.avatar)
+    
+    @staticmethod
+    def is_custom_avatar(avatar):
+        """Verifica se o valor do campo avatar é um avatar enviado (não o padrão)."""
+        return bool(avatar and 
+                    avatar != '/media/avatars/default-avatar.png' and
+                    not avatar.startswith('https://ui-avatars.com'))
+    
+    def get_avatar_variant(self, size):
+        """
+        Retorna a menor variante do avatar com pelo menos ``size`` pixels.
+        
+        Args:
+            size (int): Tamanho desejado em pixels
+            
+        Returns:
+            dict: ``{'webp': caminho, 'jpeg': caminho}`` ou None se o avatar
+            ainda não tem variantes
+        """
+        return User.pick_avatar_variant(self.avatar_variants, size)
+    
+    @staticmethod
+    def pick_avatar_variant(variants, size):
+        """Escolhe em ``variants`` a menor variante com pelo menos ``size`` pixels."""
+        if not variants:
+            return None
+        
+        sizes = sorted(int(key) for key in variants)
+        chosen = next((key for key in sizes if key >= size), sizes[-1])
+        return variants[str(chosen)]
     
-    def get_avatar_url(self, request=None):
+    def get_avatar_url(self, request=None, size=None):
         """
         Retorna URL do avatar do usuário.
         Se não tiver avatar customizado, gera um avatar padrão.
+        
+        Args:
+            request: Request usado para montar a URL absoluta
+            size (int): Tamanho de exibição; escolhe a variante adequada
         """
         # Se tem avatar customizado e não é o padrão
-        if (self.avatar and 
-            self.avatar != '/media/avatars/default-avatar.png' and
-            not self.avatar.startswith('https://ui-avatars.com')):
+        if self.has_custom_avatar():
+            avatar = self.avatar
+            variant = self.get_avatar_variant(size) if size else None
+            if variant:
+                avatar = variant['jpeg']
             if request:
-                return request.build_absolute_uri(self.avatar)
-            return self.avatar
+                return request.build_absolute_uri(avatar)
+            return avatar
         
-        # Gerar avatar padrão usando UI Avatars
+        # Gerar avatar padrão com as iniciais
         return self.get_default_avatar()
     
     def get_default_avatar(self):
-        """Gera URL do avatar padrão usando iniciais."""
-        initials = self.get_initials()
-        
-        # Gerar cor baseada no hash do email
-        hash_object = hashlib.md5(self.email.encode())
-        hex_dig = hash_object.hexdigest()
-        
-        # Extrair cores RGB do hash
-        r = int(hex_dig[0:2], 16)
-        g = int(hex_dig[2:4], 16) 
-        b = int(hex_dig[4:6], 16)
-        
-        # Garantir que as cores não sejam muito escuras
-        r = max(r, 100)
-        g = max(g, 100)  
-        b = max(b, 100)
-        
-        background_color = f"{r:02x}{g:02x}{b:02x}"
-        
-        params = {
-            'name': initials,
-            'size': 200,
-            'background': background_color,
-            'color': 'ffffff',
-            'bold': 'true',
-            'format': 'png'
-        }
-        
-        return f"https://ui-avatars.com/api/?{urlencode(params)}"
+        """Gera URL do avatar padrão (iniciais sobre cor baseada no email), servido localmente."""
+        return InitialsAvatar.url(self.get_initials(), InitialsAvatar.color(self.email))
     
     @property
     def avatar_url(self):
         """Propriedade computada para facilitar acesso ao avatar."""
         return self.get_avatar_url()
+
+
+class UserSearchToken(models.Model):
+    """Token normalizado do nome/email de um usuário, usado pela busca."""
+    
+    KIND_CHOICES = [
+        (UserSearch.WORD, "WORD"),
+        (UserSearch.GRAM, "GRAM"),
+    ]
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="search_tokens"
+    )
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    token = models.CharField(max_length=UserSearch.MAX_TOKEN_LENGTH)
+    
+    class Meta:
+        db_table = "user_search_tokens"
+        indexes = [
+            models.Index(fields=['kind', 'token'], name='user_search_kind_token_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.token}"
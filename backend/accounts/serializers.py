@@ -4,19 +4,37 @@ from .models import User
 
 
 class UserSerializer(serializers.ModelSerializer):
-    """Serializer para o modelo User."""
+    """
+    Serializer para o modelo User.
+    
+    O contexto pode trazer ``avatar_size`` (px) para que ``avatar``,
+    ``avatar_url`` e ``avatar_webp`` usem a variante de avatar adequada ao
+    tamanho de exibição em vez da maior.
+    """
     
     avatar_url = serializers.SerializerMethodField()
+    avatar_webp = serializers.SerializerMethodField()
     initials = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ['id', 'avatar', 'avatar_url', 'initials', 'name', 'email', 'last_access']
+        fields = ['id', 'avatar', 'avatar_url', 'avatar_webp', 'initials', 'name', 'email', 'last_access']
     
     def get_avatar_url(self, obj):
         """Retorna URL completa do avatar."""
         request = self.context.get('request')
-        return obj.get_avatar_url(request)
+        return obj.get_avatar_url(request, self.context.get('avatar_size'))
+    
+    def get_avatar_webp(self, obj):
+        """Retorna URL da variante WebP do avatar (None se não houver)."""
+        variant = self.get_variant(obj)
+        return settings.CURRENT_URL + variant['webp'] if variant else None
+    
+    def get_variant(self, obj):
+        """Retorna a variante do avatar para o tamanho do contexto."""
+        if not obj.has_custom_avatar():
+            return None
+        return obj.get_avatar_variant(self.context.get('avatar_size') or max(settings.AVATAR_SIZES))
     
     def get_initials(self, obj):
         """Retorna iniciais do usuário."""
@@ -26,6 +44,10 @@ class UserSerializer(serializers.ModelSerializer):
         """Sobrescreve o método para incluir informações de avatar."""
         representation = super().to_representation(instance)
         
+        variant = self.get_variant(instance)
+        if variant:
+            representation['avatar'] = variant['jpeg']
+        
         # Manter compatibilidade - avatar padrão
         if representation['avatar'] == '/media/avatars/default-avatar.png':
             representation['avatar'] = representation['avatar_url']
@@ -1,6 +1,11 @@
 import os
 import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
@@ -9,10 +14,21 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from unittest.mock import patch, MagicMock
 from PIL import Image
 import io
+from threading import BoundedSemaphore
+from asgiref.sync import async_to_sync
 
 from accounts.models import User
 from accounts.serializers import UserSerializer
 from accounts.auth import Authentication
+from accounts.authentication import CachedJWTAuthentication
+from accounts.utils.activity import LastAccessTracker
+from accounts.utils.avatars import AvatarPipeline
+from accounts.utils.hashing import HashingOverloaded, PasswordHasherPool
+from accounts.utils.initials import InitialsAvatar
+from attachments.models import StoredFile
+from core.utils.pagination import CursorPagination
+from core.utils.storage import media_storage
+from accounts.utils.search import UserSearch
 
 
 class UserModelTest(TestCase):
@@ -88,9 +104,9 @@ class UserModelTest(TestCase):
         
         avatar_url = user.get_default_avatar()
         
-        self.assertIn('ui-avatars.com', avatar_url)
-        self.assertIn('name=JD', avatar_url)
-        self.assertIn('size=200', avatar_url)
+        self.assertNotIn('ui-avatars.com', avatar_url)
+        self.assertIn('/api/v1/accounts/avatars/initials/JD/', avatar_url)
+        self.assertIn(f'/{InitialsAvatar.color(user.email)}/200.', avatar_url)
     
     def test_get_avatar_url_default(self):
         """Testa URL de avatar padrão."""
@@ -102,7 +118,7 @@ class UserModelTest(TestCase):
         
         avatar_url = user.get_avatar_url()
         
-        self.assertIn('ui-avatars.com', avatar_url)
+        self.assertIn('/avatars/initials/JD/', avatar_url)
     
     def test_get_avatar_url_custom(self):
         """Testa URL de avatar customizado."""
@@ -187,7 +203,7 @@ class UserSerializerTest(TestCase):
         serializer = UserSerializer(self.user)
         data = serializer.data
         
-        self.assertIn('ui-avatars.com', data['avatar_url'])
+        self.assertIn('/avatars/initials/TU/', data['avatar_url'])
         self.assertEqual(data['initials'], 'TU')
     
     def test_serializer_custom_avatar(self):
@@ -248,6 +264,19 @@ class SignInViewTest(APITestCase):
         response = self.client.post(self.url, data)
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_signin_hashing_overloaded(self):
+        """Testa que a fila de hashing cheia responde 503 com Retry-After."""
+        data = {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        }
+        
+        with patch.object(PasswordHasherPool, 'run', side_effect=HashingOverloaded()):
+            response = self.client.post(self.url, data)
+        
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
 
 
 class SignUpViewTest(APITestCase):
@@ -364,9 +393,30 @@ class UserViewTest(APITestCase):
         response = self.client.get(self.url)
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_get_user_info_not_modified(self):
+        """Testa resposta 304 quando a ETag enviada ainda é válida."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_get_user_info_etag_changes_on_update(self):
+        """Testa que a ETag muda quando o perfil é alterado."""
+        etag = self.client.get(self.url)['ETag']
+        
+        self.user.name = 'Outro Nome'
+        self.user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Outro Nome')
 
 
-@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), AVATAR_PROCESSING_WORKERS=0)
 class AvatarViewTest(APITestCase):
     """Testes para a view de avatar."""
     
@@ -423,6 +473,104 @@ class AvatarViewTest(APITestCase):
         self.user.refresh_from_db()
         self.assertNotEqual(self.user.avatar, '/media/avatars/default-avatar.png')
     
+    def test_upload_avatar_generates_variants(self):
+        """Testa que o upload gera as variantes e remove o original."""
+        self.client.post(self.url, {'avatar': self.create_test_image()})
+        
+        self.user.refresh_from_db()
+        self.assertEqual(sorted(self.user.avatar_variants, key=int), ['48', '128', '512'])
+        self.assertEqual(self.user.avatar, self.user.avatar_variants['512']['jpeg'])
+        for formats in self.user.avatar_variants.values():
+            for avatar in formats.values():
+                self.assertTrue(media_storage.exists(media_storage.name_from_url(avatar)))
+        
+        # Só sobram as 6 variantes; a referência ao original foi liberada
+        self.assertEqual(StoredFile.objects.count(), 6)
+    
+    def test_upload_avatar_fixes_orientation(self):
+        """Testa que a orientação EXIF é aplicada antes do redimensionamento."""
+        image = Image.new('RGB', (100, 100), color='blue')
+        image.paste((255, 0, 0), (0, 0, 50, 100))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotacionar 90° no sentido horário
+        file = io.BytesIO()
+        image.save(file, 'JPEG', exif=exif)
+        upload = SimpleUploadedFile('rotated.jpg', file.getvalue(), content_type='image/jpeg')
+        
+        self.client.post(self.url, {'avatar': upload})
+        
+        self.user.refresh_from_db()
+        with Image.open(media_storage.path(media_storage.name_from_url(self.user.avatar_variants['48']['jpeg']))) as variant:
+            self.assertEqual(variant.size, (48, 48))
+            red, green, blue = variant.getpixel((24, 4))
+        self.assertGreater(red, blue)
+    
+    def test_serializer_uses_list_variant(self):
+        """Testa que listagens recebem a variante pequena do avatar."""
+        self.client.post(self.url, {'avatar': self.create_test_image()})
+        self.user.refresh_from_db()
+        
+        data = UserSerializer(self.user, context={'avatar_size': 48}).data
+        
+        variant = self.user.avatar_variants['48']
+        self.assertTrue(data['avatar'].endswith(variant['jpeg']))
+        self.assertTrue(data['avatar_url'].endswith(variant['jpeg']))
+        self.assertTrue(data['avatar_webp'].endswith(variant['webp']))
+    
+    def test_superseded_upload_is_discarded(self):
+        """Testa que variantes de um avatar já substituído são descartadas."""
+        avatar = AvatarPipeline.store(self.create_test_image())
+        
+        result = AvatarPipeline.process(self.user.id, avatar)
+        
+        self.assertIsNone(result)
+        self.assertEqual(list(StoredFile.objects.values_list('name', flat=True)), [media_storage.name_from_url(avatar)])
+    
+    def test_identical_uploads_share_file(self):
+        """Testa que usuários com o mesmo avatar compartilham os arquivos."""
+        other = User.objects.create(name='Other', email='other@example.com')
+        
+        # O avatar anterior é liberado após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'avatar': self.create_test_image()})
+            self.client.force_authenticate(other)
+            self.client.post(self.url, {'avatar': self.create_test_image()})
+        
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.avatar, other.avatar)
+        self.assertEqual(set(StoredFile.objects.values_list('references', flat=True)), {2})
+        
+        # Remover o avatar de um usuário mantém o arquivo do outro
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.url)
+        self.assertTrue(media_storage.exists(media_storage.name_from_url(self.user.avatar)))
+        self.assertEqual(set(StoredFile.objects.values_list('references', flat=True)), {1})
+    
+    def test_failed_save_keeps_previous_avatar(self):
+        """Testa que um save com erro não libera o avatar ainda em uso."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'avatar': self.create_test_image()})
+        self.user.refresh_from_db()
+        previous = AvatarPipeline.urls(self.user)
+        references = dict(StoredFile.objects.values_list('name', 'references'))
+        
+        User.objects.create(name='Other', email='other@example.com')
+        image = Image.new('RGB', (120, 80), color='blue')
+        upload = io.BytesIO()
+        image.save(upload, 'PNG')
+        avatar = SimpleUploadedFile('novo.png', upload.getvalue(), content_type='image/png')
+        
+        # Email duplicado: o save falha depois do novo arquivo ser gravado
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+            self.client.put(reverse('user'), {'name': 'Test', 'email': 'other@example.com', 'avatar': avatar})
+        
+        self.user.refresh_from_db()
+        self.assertEqual(AvatarPipeline.urls(self.user), previous)
+        for url in previous:
+            self.assertTrue(media_storage.exists(media_storage.name_from_url(url)))
+        self.assertEqual(dict(StoredFile.objects.values_list('name', 'references')), references)
+    
     def test_upload_avatar_invalid_type(self):
         """Testa upload de arquivo inválido."""
         text_file = SimpleUploadedFile(
@@ -463,4 +611,372 @@ class AvatarViewTest(APITestCase):
         
         response = self.client.get(self.url)
         
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+@override_settings(INITIALS_AVATAR_CACHE_DIR=tempfile.mkdtemp())
+class InitialsAvatarViewTest(APITestCase):
+    """Testes para o avatar padrão gerado localmente."""
+    
+    def url(self, initials='JD', color='a0b1c2', size=128, image_format='svg'):
+        return reverse('initials-avatar', kwargs={
+            'initials': initials, 'color': color, 'size': size, 'image_format': image_format
+        })
+    
+    def test_svg_avatar(self):
+        """Testa o SVG com iniciais, cor e cache imutável."""
+        response = self.client.get(self.url())
+        content = b''.join(response.streaming_content)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(b'fill="#a0b1c2"', content)
+        self.assertIn(b'>JD</text>', content)
+    
+    def test_png_avatar_cached_on_disk(self):
+        """Testa o PNG e o cache em disco por (iniciais, cor, tamanho)."""
+        response = self.client.get(self.url(image_format='png'))
+        image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+        
+        self.assertEqual(image.size, (128, 128))
+        self.assertEqual(image.convert('RGB').getpixel((2, 2)), (0xa0, 0xb1, 0xc2))
+        
+        with patch.object(InitialsAvatar, 'png') as render:
+            self.client.get(self.url(image_format='png'))
+        render.assert_not_called()
+    
+    def test_default_avatar_url_is_served(self):
+        """Testa que a URL do avatar padrão do usuário é atendida sem autenticação."""
+        user = User.objects.create(name='Élise Dupont', email='elise@example.com')
+        path = user.get_default_avatar().replace(settings.CURRENT_URL, '')
+        
+        response = self.client.get(path, HTTP_AUTHORIZATION='Bearer invalido')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_invalid_parameters(self):
+        """Testa parâmetros inválidos."""
+        self.assertEqual(self.client.get(self.url(color='zzzzzz')).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url(size=4096)).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url(image_format='gif')).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserSearchTest(TestCase):
+    """Testes para a busca indexada de usuários."""
+    
+    def setUp(self):
+        self.joao = User.objects.create(name='João Conceição', email='joao@example.com')
+        self.maria = User.objects.create(name='Maria Antônia', email='maria.silva@example.com')
+    
+    def test_normalize_removes_accents_and_case(self):
+        """Testa normalização sem acentos e em minúsculas."""
+        self.assertEqual(UserSearch.normalize('  JOÃO   Conceição '), 'joao conceicao')
+    
+    def test_tokens_created_on_save(self):
+        """Testa que os tokens são gravados ao salvar o usuário."""
+        tokens = set(self.joao.search_tokens.values_list('kind', 'token'))
+        
+        self.assertIn((UserSearch.WORD, 'joao'), tokens)
+        self.assertIn((UserSearch.WORD, 'conceicao'), tokens)
+        self.assertIn((UserSearch.GRAM, 'cei'), tokens)
+    
+    def test_tokens_updated_on_rename(self):
+        """Testa que os tokens acompanham a troca de nome."""
+        self.joao.name = 'Pedro'
+        self.joao.save()
+        
+        words = set(self.joao.search_tokens.filter(kind=UserSearch.WORD).values_list('token', flat=True))
+        self.assertIn('pedro', words)
+        self.assertNotIn('conceicao', words)
+    
+    def test_prefix_search_ignores_accents(self):
+        """Testa busca por prefixo sem acentos."""
+        results = UserSearch.filter(User.objects.all(), 'joa')
+        
+        self.assertEqual(list(results), [self.joao])
+    
+    def test_infix_search(self):
+        """Testa busca por trecho no meio da palavra."""
+        results = UserSearch.filter(User.objects.all(), 'ÇÃO')
+        
+        self.assertEqual(list(results), [self.joao])
+    
+    def test_search_by_email(self):
+        """Testa busca pelo email."""
+        results = UserSearch.filter(User.objects.all(), 'maria.sil')
+        
+        self.assertEqual(list(results), [self.maria])
+    
+    def test_search_without_words(self):
+        """Testa que termo sem letras ou números não retorna usuários."""
+        self.assertEqual(UserSearch.filter(User.objects.all(), '@@').count(), 0)
+
+
+class UsersListViewTest(APITestCase):
+    """Testes para a view de listagem de usuários."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('users-list')
+        self.user = User.objects.create(name='Current User', email='current@example.com')
+        
+        for index in range(5):
+            User.objects.create(name=f'Usuário {index}', email=f'user{index}@example.com')
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    
+    def test_list_excludes_current_user(self):
+        """Testa que o usuário logado não aparece na listagem."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        emails = [user['email'] for user in response.data['data']['data']]
+        self.assertNotIn('current@example.com', emails)
+        self.assertEqual(len(emails), 5)
+    
+    def test_keyset_pagination(self):
+        """Testa paginação por cursor até a última página."""
+        response = self.client.get(self.url, {'limit': 2})
+        pagination = response.data['data']['pagination']
+        names = [user['name'] for user in response.data['data']['data']]
+        
+        self.assertTrue(pagination['hasNext'])
+        self.assertFalse(pagination['hasPrev'])
+        
+        while pagination['hasNext']:
+            response = self.client.get(self.url, {'limit': 2, 'cursor': pagination['nextCursor']})
+            pagination = response.data['data']['pagination']
+            names += [user['name'] for user in response.data['data']['data']]
+        
+        self.assertEqual(names, [f'Usuário {index}' for index in range(5)])
+        self.assertIsNone(pagination['nextCursor'])
+    
+    def test_limit_is_capped(self):
+        """Testa que o limite máximo é respeitado."""
+        response = self.client.get(self.url, {'limit': 1000})
+        
+        self.assertEqual(response.data['data']['pagination']['limit'], 50)
+    
+    def test_search_is_accent_insensitive(self):
+        """Testa busca sem acentos e sem diferenciar maiúsculas."""
+        response = self.client.get(self.url, {'search': 'USUARIO 3'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['name'] for user in response.data['data']['data']], ['Usuário 3'])
+    
+    def test_invalid_cursor(self):
+        """Testa cursor inválido."""
+        response = self.client.get(self.url, {'cursor': 'invalido'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_malformed_cursor_values(self):
+        """Testa cursor bem codificado com valores de tipo errado."""
+        for values in (['User', 'abc'], ['User', None], ['User', True], [1, 1], ['User', [1]]):
+            with self.subTest(values=values):
+                response = self.client.get(self.url, {'cursor': CursorPagination.encode(values)})
+                
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class LastAccessTrackerTest(APITestCase):
+    """Testes para a gravação em lote do last_access."""
+    
+    def setUp(self):
+        LastAccessTracker.pending.clear()
+        self.user = User.objects.create(name='Test User', email='test@example.com')
+        self.old_access = timezone.now() - timedelta(hours=1)
+        User.objects.filter(id=self.user.id).update(last_access=self.old_access)
+        self.user.refresh_from_db()
+    
+    def tearDown(self):
+        LastAccessTracker.pending.clear()
+        if LastAccessTracker.timer is not None:
+            LastAccessTracker.timer.cancel()
+            LastAccessTracker.timer = None
+    
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=3600)
+    def test_touch_is_buffered_until_flush(self):
+        """Testa que o acesso só é gravado no flush."""
+        self.assertTrue(LastAccessTracker.touch(self.user))
+        
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_access, self.old_access)
+        
+        self.assertEqual(LastAccessTracker.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_access, self.old_access)
+    
+    def test_min_interval_skips_recent_access(self):
+        """Testa que acessos dentro do intervalo mínimo não são registrados."""
+        self.user.last_access = timezone.now()
+        
+        self.assertFalse(LastAccessTracker.touch(self.user))
+        self.assertNotIn(self.user.id, LastAccessTracker.pending)
+    
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=0)
+    def test_flush_interval_triggers_write(self):
+        """Testa que o lote é gravado quando o intervalo de flush expira."""
+        LastAccessTracker.touch(self.user)
+        
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_access, self.old_access)
+        self.assertEqual(LastAccessTracker.pending, {})
+    
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=3600)
+    def test_user_view_does_not_save_user(self):
+        """Testa que GET /me/ não grava o usuário a cada chamada."""
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        
+        with patch.object(User, 'save') as mock_save:
+            response = self.client.get(reverse('user'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_save.assert_not_called()
+        self.assertIn(self.user.id, LastAccessTracker.pending)
+    
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=3600)
+    def test_timer_flushes_without_later_access(self):
+        """Testa que o buffer é gravado pelo timer mesmo sem novos acessos."""
+        LastAccessTracker.touch(self.user)
+        
+        timer = LastAccessTracker.timer
+        self.assertIsNotNone(timer)
+        self.assertEqual(timer.interval, 3600)
+        timer.cancel()
+        
+        # Executa o que o timer faria, na thread do teste
+        with patch('accounts.utils.activity.close_old_connections') as mock_close:
+            LastAccessTracker.run_scheduled()
+        
+        mock_close.assert_called_once()
+        self.assertIsNone(LastAccessTracker.timer)
+        self.assertEqual(LastAccessTracker.pending, {})
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_access, self.old_access)
+    
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=0)
+    def test_database_error_requeues_batch(self):
+        """Testa que uma falha de banco não chega à requisição e o lote volta ao buffer."""
+        from django.db import DatabaseError
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        
+        with patch.object(User.objects, 'bulk_update', side_effect=DatabaseError('down')), \
+                self.assertLogs('accounts.utils.activity', level='ERROR'):
+            response = self.client.get(reverse('user'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(self.user.id, LastAccessTracker.pending)
+        
+        self.assertEqual(LastAccessTracker.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_access, self.old_access)
+    
+    def test_requeue_keeps_newer_access(self):
+        """Testa que o lote devolvido não sobrescreve acessos mais recentes."""
+        newer = timezone.now()
+        LastAccessTracker.pending[self.user.id] = newer
+        
+        LastAccessTracker.requeue({self.user.id: self.old_access})
+        
+        self.assertEqual(LastAccessTracker.pending[self.user.id], newer)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': tempfile.mkdtemp()
+}})
+class CachedJWTAuthenticationTest(APITestCase):
+    """Testes para a autenticação JWT com cache (compartilhado entre processos)."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(name='Test User', email='test@example.com')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+    
+    def test_second_request_skips_user_query(self):
+        """Testa que o usuário vem do cache a partir da segunda requisição."""
+        self.client.get(reverse('chats'))
+        
+        with self.assertNumQueries(0):
+            user, token = CachedJWTAuthentication().authenticate(
+                self.client_request()
+            )
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(user.email, self.user.email)
+            self.assertTrue(user.is_authenticated)
+    
+    def test_lazy_user_loads_full_model(self):
+        """Testa que atributos fora do snapshot carregam o usuário completo."""
+        self.client.get(reverse('chats'))
+        user, token = CachedJWTAuthentication().authenticate(self.client_request())
+        
+        self.assertEqual(user.name, 'Test User')
+        self.assertIsInstance(user, User)
+    
+    def test_user_change_invalidates_snapshot(self):
+        """Testa que salvar o usuário invalida o snapshot."""
+        self.client.get(reverse('chats'))
+        
+        self.user.email = 'novo@example.com'
+        self.user.save()
+        user, token = CachedJWTAuthentication().authenticate(self.client_request())
+        
+        self.assertEqual(user.email, 'novo@example.com')
+    
+    def test_expired_cached_token_is_rejected(self):
+        """Testa que a expiração é conferida mesmo com o token em cache."""
+        self.client.get(reverse('chats'))
+        
+        expired = timezone.now() + timedelta(days=30)
+        with patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=expired):
+            response = self.client.get(reverse('chats'))
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_process_local_cache_skips_snapshot(self):
+        """Testa que sem cache compartilhado o usuário sempre vem do banco."""
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local):
+            self.client.get(reverse('chats'))
+            
+            # Outro processo alterou o usuário: a invalidação não chegaria aqui
+            User.objects.filter(id=self.user.id).update(email='novo@example.com')
+            user, token = CachedJWTAuthentication().authenticate(self.client_request())
+        
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.email, 'novo@example.com')
+    
+    def client_request(self):
+        """Monta uma requisição com o header Authorization do token."""
+        from rest_framework.test import APIRequestFactory
+        return APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+
+class PasswordHasherPoolTest(TestCase):
+    """Testes para o pool dedicado de hashing de senhas."""
+    
+    def test_hash_and_check(self):
+        """Testa que hash e verificação rodam no pool."""
+        encoded = async_to_sync(PasswordHasherPool.make_password)('segredo123')
+        
+        self.assertTrue(async_to_sync(PasswordHasherPool.check_password)('segredo123', encoded))
+        self.assertFalse(async_to_sync(PasswordHasherPool.check_password)('outra', encoded))
+        self.assertGreaterEqual(PasswordHasherPool.stats()['completed'], 3)
+    
+    def test_rejects_when_full(self):
+        """Testa que chamadas acima do limite falham rápido."""
+        PasswordHasherPool.setup()
+        
+        with patch.object(PasswordHasherPool, 'slots', BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            with self.assertRaises(HashingOverloaded):
+                async_to_sync(PasswordHasherPool.make_password)('segredo123')
+        
+        self.assertGreaterEqual(PasswordHasherPool.stats()['rejected'], 1)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import SignInView, SignUpView, UserView, AvatarView, UsersListView
+from .views import SignInView, SignUpView, UserView, AvatarView, UsersListView, InitialsAvatarView
 
 urlpatterns = [
     path('signin/', SignInView.as_view(), name='signin'),
@@ -7,4 +7,9 @@ urlpatterns = [
     path('me/', UserView.as_view(), name='user'),
     path('avatar/', AvatarView.as_view(), name='avatar'),
     path('users/', UsersListView.as_view(), name='users-list'),
+    path(
+        'avatars/initials/<str:initials>/<str:color>/<int:size>.<str:image_format>',
+        InitialsAvatarView.as_view(),
+        name='initials-avatar'
+    ),
 ]
\ No newline at end of file
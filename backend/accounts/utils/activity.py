@@ -0,0 +1,137 @@
+import atexit
+import logging
+import time
+from datetime import timedelta
+from threading import Lock, Timer
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+
+class LastAccessTracker:
+    """
+    Registro em memória (write-behind) do last_access dos usuários.
+
+    Em vez de um UPDATE da linha inteira do usuário a cada requisição, os
+    acessos ficam em um buffer por processo e são gravados em lote com um
+    único ``bulk_update`` (UPDATE ... CASE) por batch. Um usuário só volta ao
+    buffer depois de ``LAST_ACCESS_MIN_INTERVAL`` segundos desde o último
+    valor gravado, então o banco fica no máximo alguns minutos atrasado, o
+    suficiente para a ordenação por ``-last_access`` do admin.
+
+    O lote é gravado pela requisição que encontra o intervalo de flush
+    vencido ou, sem novos acessos, por um timer agendado quando o buffer
+    recebe o primeiro acesso. Falhas de banco são registradas no log e o
+    lote volta ao buffer para a próxima tentativa (o buffer tem no máximo
+    uma entrada por usuário), sem chegar à requisição que disparou o flush.
+    """
+
+    pending = {}
+    lock = Lock()
+    last_flush = time.monotonic()
+    timer = None
+
+    @classmethod
+    def touch(cls, user):
+        """
+        Registra um acesso do usuário.
+
+        Atualiza ``user.last_access`` na instância (para a resposta) apenas
+        quando o acesso entra no buffer.
+
+        Args:
+            user: Instância do usuário autenticado
+
+        Returns:
+            bool: True se o acesso foi registrado para gravação
+        """
+        current = now()
+        min_interval = timedelta(seconds=settings.LAST_ACCESS_MIN_INTERVAL)
+
+        if user.last_access and current - user.last_access < min_interval:
+            return False
+
+        user.last_access = current
+
+        with cls.lock:
+            cls.pending[user.id] = current
+            should_flush = time.monotonic() - cls.last_flush >= settings.LAST_ACCESS_FLUSH_INTERVAL
+
+        if should_flush:
+            cls.flush()
+        else:
+            cls.schedule()
+
+        return True
+
+    @classmethod
+    def schedule(cls):
+        """Agenda a gravação do buffer para daqui a ``LAST_ACCESS_FLUSH_INTERVAL`` segundos."""
+        with cls.lock:
+            if cls.timer is not None or not cls.pending:
+                return
+
+            cls.timer = Timer(settings.LAST_ACCESS_FLUSH_INTERVAL, cls.run_scheduled)
+            cls.timer.daemon = True
+            cls.timer.start()
+
+    @classmethod
+    def run_scheduled(cls):
+        """Executa o flush agendado na thread do timer e reagenda o que sobrar."""
+        with cls.lock:
+            cls.timer = None
+
+        try:
+            cls.flush()
+        finally:
+            close_old_connections()
+
+        cls.schedule()
+
+    @classmethod
+    def flush(cls):
+        """
+        Grava no banco todos os acessos pendentes.
+
+        Se a gravação falhar, o erro é registrado e o lote volta ao buffer,
+        sem sobrescrever acessos mais recentes registrados nesse meio tempo.
+
+        Returns:
+            int: Quantidade de usuários atualizados
+        """
+        from ..models import User
+
+        with cls.lock:
+            pending, cls.pending = cls.pending, {}
+            cls.last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        users = [User(id=user_id, last_access=last_access) for user_id, last_access in pending.items()]
+
+        try:
+            # Savepoint: uma falha não invalida a transação da requisição
+            with transaction.atomic():
+                User.objects.bulk_update(users, ['last_access'], batch_size=settings.LAST_ACCESS_BATCH_SIZE)
+        except DatabaseError:
+            logger.exception('Falha ao gravar o last_access de %s usuários; o lote volta ao buffer', len(users))
+            cls.requeue(pending)
+            return 0
+
+        return len(users)
+
+    @classmethod
+    def requeue(cls, pending):
+        """Devolve ao buffer um lote não gravado, mantendo o acesso mais recente."""
+        with cls.lock:
+            for user_id, last_access in pending.items():
+                current = cls.pending.get(user_id)
+                if current is None or current < last_access:
+                    cls.pending[user_id] = last_access
+
+
+atexit.register(LastAccessTracker.flush)
@@ -0,0 +1,204 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.utils.storage import media_storage
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarPipeline:
+    """
+    Gera as variantes de tamanho fixo dos avatares enviados.
+
+    O upload é salvo como veio e vira o avatar imediatamente; um pool de
+    ``AVATAR_PROCESSING_WORKERS`` threads decodifica a imagem uma única vez,
+    corrige a orientação (EXIF), recorta o quadrado central e grava cada
+    tamanho de ``AVATAR_SIZES`` em WebP e JPEG. Ao final o usuário passa a
+    apontar para as variantes e a referência ao original é liberada. Todos
+    os arquivos passam pela storage endereçada por conteúdo. Com
+    ``AVATAR_PROCESSING_WORKERS = 0`` o processamento roda na própria
+    requisição.
+    """
+
+    FORMATS = {
+        'webp': ('WEBP', {'quality': 80, 'method': 4}),
+        'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    }
+
+    executor = None
+    setup_lock = Lock()
+
+    @classmethod
+    def submit(cls, user_id, avatar):
+        """
+        Agenda a geração das variantes do avatar recém enviado.
+
+        Args:
+            user_id: ID do dono do avatar
+            avatar (str): URL pública do arquivo original (ex: /media/avatars/ab/abcd.png)
+        """
+        if settings.AVATAR_PROCESSING_WORKERS <= 0:
+            return cls.process(user_id, avatar)
+
+        with cls.setup_lock:
+            if cls.executor is None:
+                cls.executor = ThreadPoolExecutor(
+                    max_workers=settings.AVATAR_PROCESSING_WORKERS,
+                    thread_name_prefix='avatar-processing'
+                )
+
+        return cls.executor.submit(cls.run, user_id, avatar)
+
+    @classmethod
+    def run(cls, user_id, avatar):
+        """Executa ``process`` em uma thread do pool, registrando falhas."""
+        try:
+            return cls.process(user_id, avatar)
+        except Exception:
+            logger.exception('Falha ao processar avatar do usuário %s', user_id)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def process(cls, user_id, avatar):
+        """
+        Gera as variantes e aponta o usuário para elas.
+
+        Se o usuário trocou de avatar durante o processamento, as variantes
+        geradas são descartadas e o registro não é alterado.
+
+        Returns:
+            dict: Variantes geradas (``{tamanho: {formato: caminho}}``) ou
+            None se o avatar foi substituído
+        """
+        from ..models import User
+
+        with media_storage.open(media_storage.name_from_url(avatar)) as source:
+            variants = cls.render(source)
+
+        largest = variants[str(max(settings.AVATAR_SIZES))]['jpeg']
+        updated = User.objects.filter(id=user_id, avatar=avatar).update(
+            avatar=largest,
+            avatar_variants=variants
+        )
+
+        if not updated:
+            cls.release_variants(variants)
+            return None
+
+        media_storage.release_url(avatar)
+
+        # update() não passa pelo save(): invalida o snapshot de autenticação
+        from ..authentication import CachedJWTAuthentication
+        CachedJWTAuthentication.invalidate_user(user_id)
+
+        return variants
+
+    @classmethod
+    def render(cls, source):
+        """
+        Decodifica a imagem uma vez e grava todas as variantes.
+
+        Args:
+            source: Arquivo (aberto) da imagem original
+
+        Returns:
+            dict: ``{tamanho: {'webp': url, 'jpeg': url}}`` com URLs públicas
+        """
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image).convert('RGBA')
+
+        square = ImageOps.fit(image, (max(settings.AVATAR_SIZES),) * 2, Image.LANCZOS)
+
+        # JPEG não tem transparência: compõe sobre fundo branco
+        flattened = Image.new('RGB', square.size, (255, 255, 255))
+        flattened.paste(square, mask=square.getchannel('A'))
+
+        variants = {}
+        for size in sorted(settings.AVATAR_SIZES, reverse=True):
+            variants[str(size)] = {}
+            for name, (image_format, options) in cls.FORMATS.items():
+                picture = square if image_format == 'WEBP' else flattened
+                if picture.size[0] != size:
+                    picture = picture.resize((size, size), Image.LANCZOS)
+
+                output = io.BytesIO()
+                picture.save(output, image_format, **options)
+
+                extension = 'jpg' if name == 'jpeg' else name
+                stored = media_storage.save(f'avatars/{size}.{extension}', ContentFile(output.getvalue()))
+                variants[str(size)][name] = media_storage.url(stored)
+
+        return variants
+
+    @classmethod
+    def store(cls, upload):
+        """
+        Grava o avatar enviado na storage endereçada por conteúdo.
+
+        Returns:
+            str: URL pública do arquivo original
+        """
+        return media_storage.url(media_storage.save(f'avatars/{upload.name}', upload))
+
+    @classmethod
+    def replace(cls, user, avatar):
+        """
+        Troca o avatar do usuário e salva o usuário (com os demais campos alterados).
+
+        As referências ao avatar anterior (e às variantes) só são liberadas
+        após o commit: se o save falhar (ex: email duplicado), o usuário
+        continua apontando para arquivos válidos e a referência ao novo
+        arquivo, já gravado por ``store``, é que é liberada.
+
+        Args:
+            user: Usuário a salvar
+            avatar (str): Novo valor do campo avatar (URL de ``store`` ou o padrão)
+        """
+        previous = cls.urls(user)
+        user.avatar = avatar
+        user.avatar_variants = {}
+
+        try:
+            with transaction.atomic():
+                user.save()
+                transaction.on_commit(lambda: cls.release(previous))
+        except Exception:
+            if type(user).is_custom_avatar(avatar):
+                media_storage.release_url(avatar)
+            raise
+
+    @classmethod
+    def urls(cls, user):
+        """Lista as URLs do avatar customizado do usuário e das variantes."""
+        if not user.has_custom_avatar():
+            return []
+
+        urls = cls.variant_urls(user.avatar_variants)
+        if user.avatar not in urls:
+            urls.append(user.avatar)
+        return urls
+
+    @staticmethod
+    def release(urls):
+        """Libera as referências de uma lista de URLs da storage."""
+        for url in urls:
+            media_storage.release_url(url)
+
+    @classmethod
+    def release_variants(cls, variants):
+        """Libera as referências de um dict de variantes."""
+        for url in cls.variant_urls(variants):
+            media_storage.release_url(url)
+
+    @staticmethod
+    def variant_urls(variants):
+        """Lista as URLs de um dict de variantes."""
+        return [url for formats in (variants or {}).values() for url in formats.values()]
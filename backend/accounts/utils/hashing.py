@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+logger = logging.getLogger(__name__)
+
+
+class HashingOverloaded(Exception):
+    """Fila de hashing de senhas cheia."""
+
+
+class PasswordHasherPool:
+    """
+    Executor dedicado e limitado para hashing de senhas.
+
+    ``check_password``/``make_password`` levam centenas de milissegundos de
+    CPU de propósito. Rodando no event loop (ou na thread única usada pelo
+    ASGI para views síncronas) elas travam o tráfego de chat durante picos
+    de login. Aqui elas rodam em um pool próprio de
+    ``PASSWORD_HASHING_WORKERS`` threads (o PBKDF2 do hashlib libera o GIL),
+    com no máximo ``PASSWORD_HASHING_MAX_PENDING`` operações em andamento;
+    acima disso a chamada falha rápido com ``HashingOverloaded``.
+    """
+
+    executor = None
+    slots = None
+    setup_lock = Lock()
+
+    metrics_lock = Lock()
+    metrics = {
+        'completed': 0,
+        'rejected': 0,
+        'in_flight': 0,
+        'queue_time_total_ms': 0.0,
+        'queue_time_max_ms': 0.0,
+        'hash_time_total_ms': 0.0,
+    }
+
+    @classmethod
+    def setup(cls):
+        """Cria o executor e o limite de concorrência na primeira chamada."""
+        with cls.setup_lock:
+            if cls.executor is None:
+                cls.executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_WORKERS,
+                    thread_name_prefix='password-hashing'
+                )
+                cls.slots = BoundedSemaphore(settings.PASSWORD_HASHING_MAX_PENDING)
+
+    @classmethod
+    async def run(cls, func, *args):
+        """
+        Executa ``func(*args)`` no pool de hashing sem bloquear o event loop.
+
+        Raises:
+            HashingOverloaded: Se o limite de operações pendentes foi atingido
+        """
+        if cls.executor is None:
+            cls.setup()
+
+        if not cls.slots.acquire(blocking=False):
+            with cls.metrics_lock:
+                cls.metrics['rejected'] += 1
+            raise HashingOverloaded()
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                cls.record(started - submitted, time.perf_counter() - started)
+
+        with cls.metrics_lock:
+            cls.metrics['in_flight'] += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(cls.executor, job)
+        finally:
+            cls.slots.release()
+            with cls.metrics_lock:
+                cls.metrics['in_flight'] -= 1
+
+    @classmethod
+    def record(cls, queue_time, hash_time):
+        """Registra tempo de fila e de execução de uma operação."""
+        queue_ms = queue_time * 1000
+        with cls.metrics_lock:
+            cls.metrics['completed'] += 1
+            cls.metrics['queue_time_total_ms'] += queue_ms
+            cls.metrics['queue_time_max_ms'] = max(cls.metrics['queue_time_max_ms'], queue_ms)
+            cls.metrics['hash_time_total_ms'] += hash_time * 1000
+
+        if queue_ms >= settings.PASSWORD_HASHING_QUEUE_WARNING_MS:
+            logger.warning('Hashing de senha aguardou %.0f ms na fila', queue_ms)
+
+    @classmethod
+    def stats(cls):
+        """Retorna uma cópia das métricas com as médias calculadas."""
+        with cls.metrics_lock:
+            stats = dict(cls.metrics)
+
+        completed = stats['completed'] or 1
+        stats['queue_time_avg_ms'] = stats['queue_time_total_ms'] / completed
+        stats['hash_time_avg_ms'] = stats['hash_time_total_ms'] / completed
+        return stats
+
+    @classmethod
+    async def check_password(cls, password, encoded):
+        """Versão assíncrona de ``django.contrib.auth.hashers.check_password``."""
+        return await cls.run(check_password, password, encoded)
+
+    @classmethod
+    async def make_password(cls, password):
+        """Versão assíncrona de ``django.contrib.auth.hashers.make_password``."""
+        return await cls.run(make_password, password)
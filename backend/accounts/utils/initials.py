@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+
+class InitialsAvatar:
+    """
+    Gera localmente o avatar padrão (iniciais brancas sobre fundo colorido).
+
+    Substitui o serviço externo ui-avatars.com mantendo o mesmo visual: a
+    cor vem do md5 do email e as iniciais de ``User.get_initials``. Cada
+    imagem é identificada por (iniciais, cor, tamanho, formato), então a URL
+    nunca muda de conteúdo e o arquivo gerado fica em cache no disco
+    (``INITIALS_AVATAR_CACHE_DIR``).
+    """
+
+    FORMATS = {
+        'svg': 'image/svg+xml',
+        'png': 'image/png',
+    }
+
+    DEFAULT_SIZE = 200
+    MIN_SIZE = 16
+    MAX_SIZE = 512
+
+    INITIALS_PATTERN = re.compile(r'^\S{1,2}$')
+    COLOR_PATTERN = re.compile(r'^[0-9a-f]{6}$')
+
+    @staticmethod
+    def color(email):
+        """
+        Calcula a cor de fundo a partir do email.
+
+        Args:
+            email (str): Email do usuário
+
+        Returns:
+            str: Cor em hexadecimal (sem #), nunca muito escura
+        """
+        hex_dig = hashlib.md5(email.encode()).hexdigest()
+
+        # Extrair cores RGB do hash e garantir que não sejam muito escuras
+        r = max(int(hex_dig[0:2], 16), 100)
+        g = max(int(hex_dig[2:4], 16), 100)
+        b = max(int(hex_dig[4:6], 16), 100)
+
+        return f"{r:02x}{g:02x}{b:02x}"
+
+    @staticmethod
+    def url(initials, color, size=DEFAULT_SIZE, image_format=None):
+        """
+        Monta a URL absoluta do avatar gerado localmente.
+
+        Args:
+            initials (str): Iniciais do usuário
+            color (str): Cor de fundo em hexadecimal
+            size (int): Tamanho em pixels
+            image_format (str): 'svg' ou 'png' (padrão ``INITIALS_AVATAR_FORMAT``)
+        """
+        from django.urls import reverse
+
+        path = reverse('initials-avatar', kwargs={
+            'initials': initials.replace('/', '') or '?',
+            'color': color,
+            'size': size,
+            'image_format': image_format or settings.INITIALS_AVATAR_FORMAT,
+        })
+        return f"{settings.CURRENT_URL}{path}"
+
+    @staticmethod
+    def is_valid(initials, color, size, image_format):
+        """Valida os parâmetros recebidos na URL do avatar."""
+        return bool(
+            InitialsAvatar.INITIALS_PATTERN.match(initials) and
+            InitialsAvatar.COLOR_PATTERN.match(color) and
+            InitialsAvatar.MIN_SIZE <= size <= InitialsAvatar.MAX_SIZE and
+            image_format in InitialsAvatar.FORMATS
+        )
+
+    @staticmethod
+    def svg(initials, color, size):
+        """Renderiza o avatar como SVG."""
+        font_size = round(size * 0.4)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+            f'<rect width="100%" height="100%" fill="#{color}"/>'
+            f'<text x="50%" y="50%" dy=".1em" fill="#ffffff" font-family="Helvetica, Arial, sans-serif" '
+            f'font-size="{font_size}" font-weight="bold" text-anchor="middle" dominant-baseline="middle">'
+            f'{escape(initials)}</text></svg>'
+        ).encode()
+
+    @staticmethod
+    def png(initials, color, size):
+        """Renderiza o avatar como PNG."""
+        image = Image.new('RGB', (size, size), f'#{color}')
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(round(size * 0.4))
+
+        # Contorno fino na cor do texto simula o negrito
+        draw.text(
+            (size / 2, size / 2), initials, fill='#ffffff', font=font, anchor='mm',
+            stroke_width=max(1, size // 100), stroke_fill='#ffffff'
+        )
+
+        output = io.BytesIO()
+        image.save(output, 'PNG', optimize=True)
+        return output.getvalue()
+
+    @staticmethod
+    def render(initials, color, size, image_format):
+        """
+        Retorna o caminho do avatar no cache em disco, gerando se preciso.
+
+        Args:
+            initials (str): Iniciais (1 ou 2 caracteres)
+            color (str): Cor de fundo em hexadecimal
+            size (int): Tamanho em pixels
+            image_format (str): 'svg' ou 'png'
+
+        Returns:
+            str: Caminho do arquivo gerado
+        """
+        directory = str(settings.INITIALS_AVATAR_CACHE_DIR)
+        name = f"{initials.encode().hex()}_{color}_{size}.{image_format}"
+        path = os.path.join(directory, name)
+
+        if not os.path.exists(path):
+            content = getattr(InitialsAvatar, image_format)(initials, color, size)
+            os.makedirs(directory, exist_ok=True)
+
+            # Grava em arquivo temporário e renomeia: leitores nunca veem arquivo parcial
+            descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(temporary, path)
+
+        return path
@@ -0,0 +1,78 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .initials import InitialsAvatar
+
+# Campo do DRF compartilhado: mesmo fuso das datas dos serializers. As linhas
+# levam o datetime nativo, que o renderer (ORJSONRenderer) codifica em C no
+# mesmo formato ISO 8601 dos serializers ou em epoch no modo compacto
+DATETIME = serializers.DateTimeField()
+
+
+class UserRows:
+    """
+    Versão rápida de ``UserSerializer`` para listagens.
+
+    Recebe os valores crus do usuário (``values()`` ou ``row(user)``) e
+    monta o mesmo JSON de ``UserSerializer`` sem a introspecção de campos do
+    DRF. Qualquer mudança em ``UserSerializer`` precisa ser replicada aqui
+    (os testes de paridade comparam as duas saídas).
+    """
+
+    FIELDS = ('id', 'avatar', 'avatar_variants', 'name', 'email', 'last_access')
+
+    DEFAULT_AVATAR = '/media/avatars/default-avatar.png'
+
+    @staticmethod
+    def row(user):
+        """Extrai de uma instância os valores usados por ``represent``."""
+        return {field: getattr(user, field) for field in UserRows.FIELDS}
+
+    @staticmethod
+    def represent(row, request=None, avatar_size=None):
+        """
+        Args:
+            row (dict): Valores de ``UserRows.FIELDS``
+            request: Request usado para montar a URL absoluta do avatar
+            avatar_size (int): Mesmo significado do contexto ``avatar_size``
+
+        Returns:
+            dict: Mesmo formato de ``UserSerializer(...).data``, com as datas
+            em ``datetime``
+        """
+        from ..models import User
+
+        avatar = row['avatar']
+        initials = User.initials_for(row['name'], row['email'])
+
+        variant = None
+        if User.is_custom_avatar(avatar):
+            variant = User.pick_avatar_variant(row['avatar_variants'], avatar_size or max(settings.AVATAR_SIZES))
+
+            sized = User.pick_avatar_variant(row['avatar_variants'], avatar_size) if avatar_size else None
+            avatar_url = sized['jpeg'] if sized else avatar
+            if request:
+                avatar_url = request.build_absolute_uri(avatar_url)
+        else:
+            avatar_url = InitialsAvatar.url(initials, InitialsAvatar.color(row['email']))
+
+        if variant:
+            avatar = variant['jpeg']
+
+        if avatar == UserRows.DEFAULT_AVATAR:
+            avatar = avatar_url
+        elif avatar and not avatar.startswith('http'):
+            avatar = settings.CURRENT_URL + avatar
+
+        last_access = row['last_access']
+
+        return {
+            'id': row['id'],
+            'avatar': avatar,
+            'avatar_url': avatar_url,
+            'avatar_webp': settings.CURRENT_URL + variant['webp'] if variant else None,
+            'initials': initials,
+            'name': row['name'],
+            'email': row['email'],
+            'last_access': DATETIME.enforce_timezone(last_access) if last_access is not None else None,
+        }
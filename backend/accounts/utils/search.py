@@ -0,0 +1,148 @@
+import re
+import unicodedata
+
+from django.db.models import Count, Q
+
+
+class UserSearch:
+    """
+    Classe utilitária para a busca indexada de usuários.
+
+    Nome e email são normalizados (minúsculas e sem acentos) e quebrados em
+    tokens gravados na tabela ``user_search_tokens``: palavras inteiras, usadas
+    na busca por prefixo, e trigramas, usados na busca por trechos no meio
+    das palavras. Assim a busca nunca precisa de ``LIKE '%termo%'`` na tabela
+    de usuários.
+    """
+
+    WORD = 'W'
+    GRAM = 'G'
+    NGRAM_SIZE = 3
+    MAX_TOKEN_LENGTH = 64
+
+    WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Remove acentos, converte para minúsculas e colapsa espaços.
+
+        Args:
+            text (str): Texto original (ex.: "João Conceição")
+
+        Returns:
+            str: Texto normalizado (ex.: "joao conceicao")
+        """
+        if not text:
+            return ''
+
+        decomposed = unicodedata.normalize('NFKD', text)
+        without_accents = ''.join(
+            char for char in decomposed if not unicodedata.combining(char)
+        )
+        return ' '.join(without_accents.casefold().split())
+
+    @staticmethod
+    def split_words(text: str) -> list:
+        """Retorna as palavras alfanuméricas do texto já normalizado."""
+        return UserSearch.WORD_PATTERN.findall(UserSearch.normalize(text))
+
+    @staticmethod
+    def ngrams(word: str) -> set:
+        """Retorna os trigramas de uma palavra."""
+        size = UserSearch.NGRAM_SIZE
+        return {word[i:i + size] for i in range(len(word) - size + 1)}
+
+    @staticmethod
+    def build_search_text(name: str, email: str) -> str:
+        """Monta o texto normalizado armazenado em ``User.search_text``."""
+        return UserSearch.normalize(f'{name or ""} {email or ""}')
+
+    @staticmethod
+    def tokenize(name: str, email: str) -> set:
+        """
+        Gera os tokens de busca de um usuário.
+
+        Args:
+            name (str): Nome do usuário
+            email (str): Email do usuário
+
+        Returns:
+            set: Conjunto de tuplas (tipo, token)
+        """
+        tokens = set()
+
+        for word in UserSearch.split_words(f'{name or ""} {email or ""}'):
+            word = word[:UserSearch.MAX_TOKEN_LENGTH]
+            tokens.add((UserSearch.WORD, word))
+            for gram in UserSearch.ngrams(word):
+                tokens.add((UserSearch.GRAM, gram))
+
+        return tokens
+
+    @staticmethod
+    def index_user(user, token_model=None):
+        """
+        Regrava os tokens de busca de um usuário.
+
+        Args:
+            user: Instância do usuário já salva
+            token_model: Modelo de token (usado pelas migrations com o modelo histórico)
+        """
+        if token_model is None:
+            from ..models import UserSearchToken
+            token_model = UserSearchToken
+
+        token_model.objects.filter(user_id=user.id).delete()
+        token_model.objects.bulk_create([
+            token_model(user_id=user.id, kind=kind, token=token)
+            for kind, token in UserSearch.tokenize(user.name, user.email)
+        ])
+
+    @staticmethod
+    def filter(queryset, query: str):
+        """
+        Filtra um queryset de usuários pelo termo de busca.
+
+        Cada palavra do termo precisa casar com o prefixo de alguma palavra
+        do nome/email ou, a partir de três caracteres, aparecer no meio de
+        uma delas. As palavras do termo são combinadas com AND.
+
+        Args:
+            queryset: QuerySet de User
+            query (str): Termo digitado pelo usuário
+
+        Returns:
+            QuerySet: QuerySet filtrado
+        """
+        from ..models import UserSearchToken
+
+        words = UserSearch.split_words(query)
+        if not words:
+            return queryset.none()
+
+        for word in words:
+            word = word[:UserSearch.MAX_TOKEN_LENGTH]
+
+            # No MySQL istartswith vira um LIKE 'termo%' simples, que usa o índice
+            prefix_matches = UserSearchToken.objects.filter(
+                kind=UserSearch.WORD,
+                token__istartswith=word
+            ).values('user_id')
+            condition = Q(id__in=prefix_matches)
+
+            grams = UserSearch.ngrams(word)
+            if grams:
+                gram_matches = UserSearchToken.objects.filter(
+                    kind=UserSearch.GRAM,
+                    token__in=grams
+                ).values('user_id').annotate(
+                    hits=Count('token', distinct=True)
+                ).filter(hits=len(grams)).values('user_id')
+
+                # Trigramas podem vir de palavras diferentes; confirma no texto normalizado
+                condition |= Q(id__in=gram_matches, search_text__contains=word)
+
+            queryset = queryset.filter(condition)
+
+        return queryset
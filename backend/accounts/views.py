@@ -1,11 +1,10 @@
-import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.exceptions import AuthenticationFailed
-from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse
 from django.conf import settings
-from django.utils.timezone import now
+from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -13,22 +12,31 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from .auth import Authentication
 from .serializers import UserSerializer
 from .models import User
+from .utils.activity import LastAccessTracker
+from .utils.avatars import AvatarPipeline
+from .utils.initials import InitialsAvatar
+from .utils.rows import UserRows
+from .utils.search import UserSearch
+from core.utils.conditional import ConditionalGet
 from core.utils.exceptions import ValidationError
+from core.utils.pagination import CursorPagination
+from core.utils.replicas import replica_reads
+from core.utils.views import AsyncAPIView
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class SignInView(APIView, Authentication):
+class SignInView(AsyncAPIView, Authentication):
     """View para autenticação de usuários."""
     
     permission_classes = [AllowAny]
     
-    def post(self, request):
-        """Realiza o login do usuário."""
+    async def post(self, request):
+        """Realiza o login do usuário (hash da senha fora do event loop)."""
         email = request.data.get('email')
         password = request.data.get('password')
         
-        # Chama o método signin da classe Authentication
-        user = self.signin(email, password)
+        # Chama o método asignin da classe Authentication
+        user = await self.asignin(email, password)
         
         if not user:
             raise AuthenticationFailed('Credenciais inválidas')
@@ -50,13 +58,13 @@ class SignInView(APIView, Authentication):
         })
 
 
-class SignUpView(APIView, Authentication):
+class SignUpView(AsyncAPIView, Authentication):
     """View para registro de novos usuários."""
     
     permission_classes = [AllowAny]
     
-    def post(self, request):
-        """Realiza o registro de um novo usuário."""
+    async def post(self, request):
+        """Realiza o registro de um novo usuário (hash da senha fora do event loop)."""
         name = request.data.get('name')
         email = request.data.get('email')
         password = request.data.get('password')
@@ -65,8 +73,8 @@ class SignUpView(APIView, Authentication):
         if not all([name, email, password]):
             raise AuthenticationFailed('Nome, email e senha são obrigatórios')
         
-        # Chama o método signup da classe Authentication
-        user = self.signup(name, email, password)
+        # Chama o método asignup da classe Authentication
+        user = await self.asignup(name, email, password)
         
         if not user:
             raise AuthenticationFailed('Email já está em uso')
@@ -95,13 +103,22 @@ class UserView(APIView):
         """Retorna os dados do usuário logado."""
         user = request.user
         
-        # Atualiza last_access
-        user.last_access = now()
-        user.save()
+        # Registra o acesso; a gravação é feita em lote (write-behind)
+        LastAccessTracker.touch(user)
+        
+        # last_access entra na ETag com precisão de minutos (ETag fraca)
+        etag = ConditionalGet.make_etag(
+            'me', user.id, user.name, user.email, user.avatar,
+            user.last_access.replace(second=0, microsecond=0).isoformat()
+        )
+        etag = ConditionalGet.for_request(request, etag)
+        not_modified = ConditionalGet.not_modified(request, etag)
+        if not_modified:
+            return not_modified
         
         # Serializa e retorna o usuário
         serializer = UserSerializer(user, context={'request': request})
-        return Response(serializer.data)
+        return ConditionalGet.finalize(Response(serializer.data), etag)
     
     def put(self, request):
         """Atualiza os dados do usuário logado."""
@@ -125,41 +142,26 @@ class UserView(APIView):
         
         # Processa upload do avatar se fornecido
         if avatar_file:
-            # Configura FileSystemStorage
-            fs = FileSystemStorage(
-                location=settings.MEDIA_ROOT,
-                base_url=settings.MEDIA_URL
-            )
-            
             # Valida tipo do arquivo
             if not avatar_file.content_type in ['image/png', 'image/jpeg']:
                 raise ValidationError('Formato de avatar inválido. Use apenas PNG ou JPG')
             
             try:
-                # Salva o novo avatar
-                filename = fs.save(f'avatars/{avatar_file.name}', avatar_file)
-                new_avatar_path = f'/{settings.MEDIA_URL}{filename}'
-                
-                # Remove avatar antigo se não for o default
-                old_avatar = user.avatar
-                if old_avatar and old_avatar != '/media/avatars/default-avatar.png':
-                    old_file_path = settings.MEDIA_ROOT + old_avatar.replace(settings.MEDIA_URL, '')
-                    if os.path.exists(old_file_path):
-                        os.remove(old_file_path)
-                
-                # Atualiza o avatar do usuário
-                user.avatar = new_avatar_path
-                
+                # Salva o novo avatar (nome pelo hash do conteúdo)
+                new_avatar_path = AvatarPipeline.store(avatar_file)
             except Exception as e:
-                # Se houve erro, remove o arquivo salvo
-                if 'filename' in locals():
-                    file_path = fs.path(filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
                 raise ValidationError('Erro ao fazer upload do avatar')
+            
+            # Salva as alterações com o novo avatar; o antigo (e variantes) só
+            # é liberado após o commit. As variantes são geradas depois
+            AvatarPipeline.replace(user, new_avatar_path)
+        else:
+            # Salva as alterações
+            user.save()
         
-        # Salva as alterações
-        user.save()
+        if avatar_file:
+            AvatarPipeline.submit(user.id, user.avatar)
+            user.refresh_from_db()
         
         # Serializa e retorna o usuário atualizado
         serializer = UserSerializer(user, context={'request': request})
@@ -179,9 +181,7 @@ class AvatarView(APIView):
             'initials': user.get_initials(),
             'avatar_url': user.get_avatar_url(request),
             'default_avatar_url': user.get_default_avatar(),
-            'has_custom_avatar': (user.avatar and 
-                                user.avatar != '/media/avatars/default-avatar.png' and
-                                not user.avatar.startswith('https://ui-avatars.com'))
+            'has_custom_avatar': user.has_custom_avatar()
         })
     
     def post(self, request):
@@ -201,61 +201,30 @@ class AvatarView(APIView):
         if avatar_file.size > 5 * 1024 * 1024:
             raise ValidationError('Arquivo muito grande. Máximo 5MB')
         
-        # Configurar storage
-        fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'avatars'))
-        
-        # Gerar nome único
-        file_extension = avatar_file.name.split('.')[-1].lower()
-        filename = f"user_{user.id}_{int(now().timestamp())}.{file_extension}"
-        
         try:
-            # Remover avatar anterior se existir
-            if (user.avatar and 
-                user.avatar != '/media/avatars/default-avatar.png' and
-                not user.avatar.startswith('https://ui-avatars.com')):
-                old_path = user.avatar.replace('/media/', '')
-                old_file_path = os.path.join(settings.MEDIA_ROOT, old_path)
-                if os.path.exists(old_file_path):
-                    os.remove(old_file_path)
-            
-            # Salvar novo arquivo
-            fs.save(filename, avatar_file)
-            new_avatar_path = f'/media/avatars/{filename}'
-            
-            # Atualizar usuário
-            user.avatar = new_avatar_path
-            user.save()
-            
-            return Response({
-                'message': 'Avatar atualizado com sucesso',
-                'avatar_url': user.get_avatar_url(request),
-                'has_custom_avatar': True
-            })
-            
+            # Salvar novo arquivo (nome pelo hash do conteúdo)
+            new_avatar_path = AvatarPipeline.store(avatar_file)
         except Exception as e:
-            # Cleanup em caso de erro
-            if 'filename' in locals():
-                file_path = fs.path(filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
             raise ValidationError('Erro ao fazer upload do avatar')
+        
+        # Atualizar usuário e liberar o avatar anterior (e variantes) após o
+        # commit; as variantes são geradas fora da requisição
+        AvatarPipeline.replace(user, new_avatar_path)
+        AvatarPipeline.submit(user.id, new_avatar_path)
+        user.refresh_from_db()
+        
+        return Response({
+            'message': 'Avatar atualizado com sucesso',
+            'avatar_url': user.get_avatar_url(request),
+            'has_custom_avatar': True
+        })
     
     def delete(self, request):
         """Remove avatar customizado e volta ao padrão."""
         user = request.user
         
-        # Remover arquivo anterior se existir
-        if (user.avatar and 
-            user.avatar != '/media/avatars/default-avatar.png' and
-            not user.avatar.startswith('https://ui-avatars.com')):
-            old_path = user.avatar.replace('/media/', '')
-            old_file_path = os.path.join(settings.MEDIA_ROOT, old_path)
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-        
-        # Resetar para padrão
-        user.avatar = '/media/avatars/default-avatar.png'
-        user.save()
+        # Resetar para padrão, liberando o arquivo anterior (e variantes) após o commit
+        AvatarPipeline.replace(user, '/media/avatars/default-avatar.png')
         
         return Response({
             'message': 'Avatar resetado para padrão',
@@ -264,45 +233,88 @@ class AvatarView(APIView):
         })
 
 
+class InitialsAvatarView(APIView):
+    """View que serve o avatar padrão (iniciais sobre cor) gerado localmente."""
+    
+    # Usado em <img>, que não envia o token
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request, initials, color, size, image_format):
+        """
+        Retorna o avatar em SVG ou PNG.
+        
+        O conteúdo é determinado apenas pela URL, então a resposta pode ficar
+        em cache indefinidamente (``immutable``).
+        """
+        if not InitialsAvatar.is_valid(initials, color, size, image_format):
+            raise ValidationError('Parâmetros de avatar inválidos')
+        
+        path = InitialsAvatar.render(initials, color, size, image_format)
+        
+        response = FileResponse(open(path, 'rb'), content_type=InitialsAvatar.FORMATS[image_format])
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
+@replica_reads
 class UsersListView(APIView, Authentication):
     """View para listar usuários disponíveis para conversa."""
     
+    default_limit = 20
+    max_limit = 50
+    
     def get(self, request):
         """
-        Retorna lista de usuários cadastrados (exceto o usuário atual).
-        Suporte para busca por nome ou email através do parâmetro 'search'.
+        Retorna lista paginada de usuários cadastrados (exceto o usuário atual).
+        
+        Parâmetros:
+            search: Busca por nome ou email, sem diferenciar maiúsculas e acentos
+            limit: Quantidade de usuários por página (máximo ``max_limit``)
+            cursor: Cursor retornado em ``pagination.nextCursor``
         """
-        # Obter parâmetro de busca
         search_query = request.GET.get('search', '').strip()
+        cursor = request.GET.get('cursor')
+        limit = CursorPagination.get_limit(request, self.default_limit, self.max_limit)
         
         # Filtrar usuários exceto o atual
         users = User.objects.exclude(id=request.user.id)
         
-        # Aplicar filtro de busca se fornecido
+        # Aplicar filtro de busca indexada se fornecido
         if search_query:
-            from django.db.models import Q
+            users = UserSearch.filter(users, search_query)
+        
+        # Ordenar por nome (índice users_name_id_idx) e continuar após o cursor
+        users = users.order_by('name', 'id')
+        if cursor:
+            name, user_id = CursorPagination.decode(cursor, 2)
+            if not isinstance(name, str) or not isinstance(user_id, int) or isinstance(user_id, bool):
+                raise ValidationError('Cursor de paginação inválido')
             users = users.filter(
-                Q(name__icontains=search_query) | 
-                Q(email__icontains=search_query)
+                Q(name__gt=name) | Q(name=name, id__gt=user_id)
             )
         
-        # Ordenar por nome
-        users = users.order_by('name')
+        # Busca um item a mais para saber se existe próxima página
+        page = list(users.values(*UserRows.FIELDS)[:limit + 1])
+        has_next = len(page) > limit
+        page = page[:limit]
+        
+        next_cursor = None
+        if has_next:
+            next_cursor = CursorPagination.encode([page[-1]['name'], page[-1]['id']])
         
-        # Serializar usuários
-        serializer = UserSerializer(users, many=True, context={'request': request})
+        # Serializar usuários (caminho rápido, mesmo formato de UserSerializer)
+        data = [UserRows.represent(row, request, settings.AVATAR_LIST_SIZE) for row in page]
         
         return Response({
             'success': True,
             'data': {
-                'data': serializer.data,
+                'data': data,
                 'pagination': {
-                    'page': 1,
-                    'limit': len(serializer.data),
-                    'total': len(serializer.data),
-                    'totalPages': 1,
-                    'hasNext': False,
-                    'hasPrev': False
+                    'limit': limit,
+                    'hasNext': has_next,
+                    'hasPrev': bool(cursor),
+                    'nextCursor': next_cursor
                 }
             }
         })
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from attachments.models import AudioAttachment
+from attachments.utils.audio import AudioMetadataPipeline
+
+
+class Command(BaseCommand):
+    help = 'Calcula duração e forma de onda dos áudios enviados antes do pipeline'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Analisando áudios...')
+        
+        processed_count = 0
+        
+        for attachment_id in AudioAttachment.objects.filter(duration__isnull=True).values_list('id', flat=True).iterator():
+            if AudioMetadataPipeline.process(attachment_id):
+                processed_count += 1
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'{processed_count} áudios processados com sucesso!')
+        )
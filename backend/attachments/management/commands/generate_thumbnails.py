@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from attachments.models import FileAttachment
+from attachments.utils.thumbnails import ThumbnailPipeline
+from core.utils.storage import media_storage
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas e placeholders das imagens enviadas antes do pipeline'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Gerando miniaturas...')
+        
+        generated_count = 0
+        
+        for attachment in FileAttachment.objects.filter(thumbnail='').only('id', 'src', 'content_type').iterator():
+            name = media_storage.name_from_url(attachment.src)
+            if not ThumbnailPipeline.supports(attachment.content_type) or not name or not media_storage.exists(name):
+                continue
+            
+            try:
+                fields = ThumbnailPipeline.save(
+                    attachment.id,
+                    attachment.src,
+                    ThumbnailPipeline.render(
+                        media_storage.path(name),
+                        settings.ATTACHMENT_THUMBNAIL_SIZE,
+                        settings.ATTACHMENT_PLACEHOLDER_SIZE
+                    )
+                )
+                if fields:
+                    generated_count += 1
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'Anexo {attachment.id}: {e}'))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'{generated_count} miniaturas geradas com sucesso!')
+        )
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attachments.models import AttachmentUpload
+
+
+class Command(BaseCommand):
+    help = 'Remove uploads de anexos abandonados (sem envio há ATTACHMENT_UPLOAD_EXPIRATION_HOURS)'
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(hours=settings.ATTACHMENT_UPLOAD_EXPIRATION_HOURS)
+
+        removed_count = 0
+        for upload in AttachmentUpload.objects.filter(updated_at__lt=limit).iterator():
+            upload.delete()
+            removed_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{removed_count} uploads abandonados removidos!')
+        )
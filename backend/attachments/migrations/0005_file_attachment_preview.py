@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-18 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0004_audio_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileattachment',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileattachment',
+            name='placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='fileattachment',
+            name='thumbnail',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='fileattachment',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
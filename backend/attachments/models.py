@@ -1,29 +1,147 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
+from core.utils.storage import media_storage
 
 
 class FileAttachment(models.Model):
-    """Modelo para anexos de arquivos."""
+    """
+    Modelo para anexos de arquivos.
+    
+    Para imagens, dimensões, miniatura e placeholder (data URI de poucos
+    pixels) são gerados após o upload (ver ``ThumbnailPipeline``).
+    """
     
     name = models.CharField(max_length=90)
     extension = models.CharField(max_length=15)
     size = models.FloatField()
     src = models.TextField()
     content_type = models.TextField()
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail = models.TextField(blank=True, default='')
+    placeholder = models.TextField(blank=True, default='')
+    # Quem enviou o arquivo: só ele pode usar o anexo em mensagens
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
     
     class Meta:
         db_table = "file_attachments"
     
     def __str__(self):
         return f"{self.name}.{self.extension}"
+    
+    def delete(self, *args, **kwargs):
+        """Remove o anexo e libera as referências ao arquivo e à miniatura."""
+        src, thumbnail = self.src, self.thumbnail
+        result = super().delete(*args, **kwargs)
+        media_storage.release_url(src)
+        media_storage.release_url(thumbnail)
+        return result
 
 
 class AudioAttachment(models.Model):
-    """Modelo para anexos de áudio."""
+    """
+    Modelo para anexos de áudio.
+    
+    Duração, taxa de amostragem e picos da forma de onda são calculados após
+    o upload (ver ``AudioMetadataPipeline``) e ficam nulos/vazios até lá.
+    """
     
     src = models.TextField()
+    duration = models.FloatField(null=True, blank=True)
+    sample_rate = models.PositiveIntegerField(null=True, blank=True)
+    peaks = models.JSONField(default=list, blank=True)
+    # Quem enviou o áudio: só ele pode usar o anexo em mensagens
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
     
     class Meta:
         db_table = "audio_attachments"
     
     def __str__(self):
         return f"Audio: {self.src}"
+    
+    def delete(self, *args, **kwargs):
+        """Remove o anexo e libera a referência ao arquivo armazenado."""
+        src = self.src
+        result = super().delete(*args, **kwargs)
+        media_storage.release_url(src)
+        return result
+
+
+class StoredFile(models.Model):
+    """
+    Arquivo da storage endereçada por conteúdo (ver ``ContentAddressedStorage``).
+    
+    ``references`` conta quantos registros (avatares, anexos) apontam para o
+    arquivo; ele só é apagado do disco quando a contagem chega a zero.
+    """
+    
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = "stored_files"
+    
+    def __str__(self):
+        return f"{self.name} ({self.references} referências)"
+
+
+class AttachmentUpload(models.Model):
+    """
+    Upload retomável de um anexo em andamento.
+    
+    Os bytes recebidos ficam em ``path()`` (fora de MEDIA_ROOT) até a
+    finalização; ``offset`` é quanto já foi gravado.
+    """
+    
+    CODE_CHOICES = [
+        ('FILE', 'File'),
+        ('AUDIO', 'Audio'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attachment_uploads'
+    )
+    attachment_code = models.CharField(max_length=10, choices=CODE_CHOICES)
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = "attachment_uploads"
+    
+    def __str__(self):
+        return f"Upload {self.name} ({self.offset}/{self.size})"
+    
+    def path(self):
+        """Retorna o caminho do arquivo parcial."""
+        return os.path.join(settings.ATTACHMENT_UPLOAD_DIR, f'{self.id.hex}.part')
+    
+    def delete(self, *args, **kwargs):
+        """Remove o upload e o arquivo parcial."""
+        path = self.path()
+        result = super().delete(*args, **kwargs)
+        if os.path.exists(path):
+            os.remove(path)
+        return result
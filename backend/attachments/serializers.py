@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.conf import settings
+from core.utils.media import MediaSigner
 from .models import FileAttachment, AudioAttachment
 from .utils.format import Format
 
@@ -9,18 +10,22 @@ class FileAttachmentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = FileAttachment
-        fields = "__all__"
+        exclude = ("user",)
     
     def to_representation(self, instance):
-        """Sobrescreve o método para formatar size e concatenar URL ao src."""
+        """Sobrescreve o método para formatar size e assinar/concatenar URL ao src."""
         representation = super().to_representation(instance)
         
         # Converter size usando Format.format_bytes
         representation['size'] = Format.format_bytes(int(instance.size))
         
-        # Concatenar settings.CURRENT_URL com instance.src
+        # Concatenar settings.CURRENT_URL com instance.src (URL assinada, ver MediaSigner)
         if representation['src']:
-            representation['src'] = settings.CURRENT_URL + representation['src']
+            representation['src'] = settings.CURRENT_URL + MediaSigner.sign(representation['src'])
+        
+        # Miniatura (imagens) segue o mesmo formato; vazia até ser gerada
+        if representation['thumbnail']:
+            representation['thumbnail'] = settings.CURRENT_URL + MediaSigner.sign(representation['thumbnail'])
         
         return representation
 
@@ -30,14 +35,14 @@ class AudioAttachmentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = AudioAttachment
-        fields = "__all__"
+        exclude = ("user",)
     
     def to_representation(self, instance):
-        """Sobrescreve o método para concatenar URL ao src."""
+        """Sobrescreve o método para assinar e concatenar URL ao src."""
         representation = super().to_representation(instance)
         
-        # Concatenar settings.CURRENT_URL com instance.src
+        # Concatenar settings.CURRENT_URL com instance.src (URL assinada, ver MediaSigner)
         if representation['src']:
-            representation['src'] = settings.CURRENT_URL + representation['src']
+            representation['src'] = settings.CURRENT_URL + MediaSigner.sign(representation['src'])
         
         return representation
\ No newline at end of file
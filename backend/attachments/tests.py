@@ -1,3 +1,505 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import wave
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from attachments.models import AttachmentUpload, AudioAttachment, FileAttachment, StoredFile
+from attachments.serializers import AudioAttachmentSerializer, FileAttachmentSerializer
+from attachments.utils.audio import AudioMetadataPipeline
+from attachments.utils.exceptions import UploadNotFound
+from attachments.utils.thumbnails import ThumbnailPipeline
+from attachments.utils.uploads import ResumableUpload
+from chats.models import Chat, ChatMessage
+from core.utils.media import MediaSigner
+from core.utils.storage import media_storage
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTest(TestCase):
+    """Testes para a storage endereçada por conteúdo."""
+
+    def test_name_is_content_hash(self):
+        """Testa que o nome vem do SHA-256 e mantém pasta e extensão."""
+        name = media_storage.save('attachments/Relatório Final.PDF', ContentFile(b'conteudo'))
+
+        digest = hashlib.sha256(b'conteudo').hexdigest()
+        self.assertEqual(name, f'attachments/{digest[:2]}/{digest}.pdf')
+        self.assertTrue(media_storage.is_content_addressed(name))
+        with media_storage.open(name) as file:
+            self.assertEqual(file.read(), b'conteudo')
+
+    def test_identical_content_is_deduplicated(self):
+        """Testa que conteúdo idêntico é gravado uma vez com contagem de referências."""
+        first = media_storage.save('attachments/a.txt', ContentFile(b'igual'))
+        second = media_storage.save('attachments/b.txt', ContentFile(b'igual'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(StoredFile.objects.get(name=first).references, 2)
+
+        media_storage.delete(first)
+        self.assertTrue(media_storage.exists(first))
+
+        media_storage.delete(first)
+        self.assertFalse(media_storage.exists(first))
+        self.assertFalse(StoredFile.objects.filter(name=first).exists())
+
+    def test_large_file_streamed_in_chunks(self):
+        """Testa arquivos maiores que um chunk e que não sobram temporários."""
+        content = os.urandom(3 * 64 * 1024 + 17)
+
+        name = media_storage.save('attachments/audio.ogg', ContentFile(content))
+
+        self.assertEqual(StoredFile.objects.get(name=name).size, len(content))
+        self.assertEqual(media_storage.size(name), len(content))
+        directory = os.path.join(media_storage.location, 'attachments')
+        self.assertFalse([entry for entry in os.listdir(directory) if entry.endswith('.upload')])
+
+    def test_legacy_file_deleted_directly(self):
+        """Testa que arquivos anteriores à storage são apagados normalmente."""
+        os.makedirs(os.path.join(media_storage.location, 'avatars'), exist_ok=True)
+        path = os.path.join(media_storage.location, 'avatars', 'antigo.png')
+        with open(path, 'wb') as file:
+            file.write(b'png')
+
+        media_storage.release_url('/media/avatars/antigo.png')
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_attachment_delete_releases_file(self):
+        """Testa que apagar o anexo libera a referência ao arquivo."""
+        name = media_storage.save('attachments/doc.pdf', ContentFile(b'%PDF'))
+        attachment = FileAttachment.objects.create(
+            name='doc', extension='pdf', size=4, src=media_storage.url(name), content_type='application/pdf'
+        )
+
+        attachment.delete()
+
+        self.assertFalse(media_storage.exists(name))
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    ATTACHMENT_UPLOAD_DIR=tempfile.mkdtemp(),
+    ATTACHMENT_UPLOAD_CHUNK_SIZE=1024,
+    AUDIO_PROCESSING_WORKERS=0,
+    ATTACHMENT_THUMBNAIL_WORKERS=0
+)
+class AttachmentUploadViewTest(TestCase):
+    """Testes para o upload retomável de anexos."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email='upload@test.com', password='testpass123', name='Upload User')
+        self.client.force_authenticate(user=self.user)
+
+    def start(self, content, name='relatorio.pdf', attachment_code='FILE'):
+        response = self.client.post('/api/v1/attachments/uploads/', {
+            'name': name, 'size': len(content), 'attachment_code': attachment_code
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def send(self, upload_id, chunk, offset, **headers):
+        return self.client.put(
+            f'/api/v1/attachments/uploads/{upload_id}/', chunk,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def test_chunked_upload_with_resume(self):
+        """Testa envio em partes, retomada pelo offset e criação do anexo."""
+        content = b'%PDF-1.4\n' + os.urandom(5000)
+        upload_id = self.start(content)
+
+        self.assertEqual(self.send(upload_id, content[:3000], 0).data['offset'], 3000)
+
+        # Cliente perdeu a conexão: consulta o offset e continua dali
+        status = self.client.get(f'/api/v1/attachments/uploads/{upload_id}/')
+        self.assertEqual(status.data['offset'], 3000)
+        self.send(upload_id, content[3000:], 3000)
+
+        response = self.client.post(
+            f'/api/v1/attachments/uploads/{upload_id}/complete/',
+            {'checksum': hashlib.sha256(content).hexdigest()}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        attachment = FileAttachment.objects.get(id=response.data['attachment_id'])
+        self.assertEqual((attachment.name, attachment.extension), ('relatorio', 'pdf'))
+        self.assertEqual(attachment.content_type, 'application/pdf')
+        with media_storage.open(media_storage.name_from_url(attachment.src)) as file:
+            self.assertEqual(file.read(), content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+    def test_offset_mismatch_conflict(self):
+        """Testa que envio fora do offset atual retorna 409."""
+        upload_id = self.start(b'x' * 100)
+
+        response = self.send(upload_id, b'x' * 10, 50)
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_upload_too_large(self):
+        """Testa limite no tamanho declarado e nos bytes recebidos."""
+        response = self.client.post('/api/v1/attachments/uploads/', {
+            'name': 'audio.ogg', 'size': 11 * 1024 * 1024, 'attachment_code': 'AUDIO'
+        }, format='json')
+        self.assertEqual(response.status_code, 413)
+
+        upload_id = self.start(b'x' * 10, name='notas.txt')
+        response = self.send(upload_id, b'x' * 4000, 0)
+
+        self.assertEqual(response.status_code, 413)
+        upload = AttachmentUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.offset, 0)
+        self.assertEqual(os.path.getsize(upload.path()), 0)
+
+    def test_chunk_checksum_mismatch(self):
+        """Testa que bloco corrompido é descartado."""
+        upload_id = self.start(b'x' * 10, name='notas.txt')
+
+        response = self.send(upload_id, b'x' * 10, 0, HTTP_X_CHUNK_SHA256=hashlib.sha256(b'y').hexdigest())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AttachmentUpload.objects.get(id=upload_id).offset, 0)
+
+    def test_audio_upload(self):
+        """Testa criação de AudioAttachment e recusa de conteúdo que não é áudio."""
+        content = b'OggS' + os.urandom(200)
+        upload_id = self.start(content, name='voz.ogg', attachment_code='AUDIO')
+        self.send(upload_id, content, 0)
+
+        response = self.client.post(f'/api/v1/attachments/uploads/{upload_id}/complete/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(AudioAttachment.objects.filter(id=response.data['attachment_id']).exists())
+
+        upload_id = self.start(b'%PDF-1.4', name='falso.ogg', attachment_code='AUDIO')
+        self.send(upload_id, b'%PDF-1.4', 0)
+        response = self.client.post(f'/api/v1/attachments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_user_upload_not_found(self):
+        """Testa que o upload de outro usuário não é acessível."""
+        upload_id = self.start(b'x' * 10, name='notas.txt')
+        other = User.objects.create(email='other@test.com', password='testpass123', name='Other')
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(f'/api/v1/attachments/uploads/{upload_id}/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_attachment_owned_by_uploader(self):
+        """Testa que só quem enviou o anexo pode usá-lo em mensagens."""
+        from chats.utils.membership import ChatMembership
+        self.addCleanup(ChatMembership.clear_local)
+
+        content = b'%PDF-1.4\n' + os.urandom(100)
+        upload_id = self.start(content)
+        self.send(upload_id, content, 0)
+        attachment_id = self.client.post(f'/api/v1/attachments/uploads/{upload_id}/complete/').data['attachment_id']
+        self.assertEqual(FileAttachment.objects.get(id=attachment_id).user_id, self.user.id)
+
+        other = User.objects.create(email='other@test.com', password='testpass123', name='Other')
+        third = User.objects.create(email='third@test.com', password='testpass123', name='Third')
+        chat = Chat.objects.create(from_user=other, to_user=third)
+        url = reverse('chat-messages', kwargs={'chat_id': chat.id})
+        message = {'attachment_code': 'FILE', 'attachment_id': attachment_id}
+
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.post(url, message).status_code, 404)
+        self.assertFalse(ChatMessage.objects.filter(chat=chat).exists())
+
+        chat = Chat.objects.create(from_user=self.user, to_user=other)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('chat-messages', kwargs={'chat_id': chat.id}), message)
+        self.assertEqual(response.status_code, 201)
+
+    def test_append_refreshes_updated_at(self):
+        """Testa que cada bloco recebido adia a limpeza do upload parado."""
+        upload_id = self.start(b'x' * 100, name='notas.txt')
+        old = AttachmentUpload.objects.get(id=upload_id).updated_at - timedelta(days=2)
+        AttachmentUpload.objects.filter(id=upload_id).update(updated_at=old)
+
+        self.send(upload_id, b'x' * 10, 0)
+
+        self.assertGreater(AttachmentUpload.objects.get(id=upload_id).updated_at, old)
+
+    def test_complete_twice(self):
+        """Testa que concluir de novo um upload já concluído responde 404."""
+        content = b'x' * 10
+        upload_id = self.start(content, name='notas.txt')
+        self.send(upload_id, content, 0)
+        url = f'/api/v1/attachments/uploads/{upload_id}/complete/'
+
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+        # Requisição concorrente que já tinha carregado o upload antes da primeira conclusão
+        upload_id = self.start(content, name='notas.txt')
+        self.send(upload_id, content, 0)
+        stale = AttachmentUpload.objects.get(id=upload_id)
+        ResumableUpload.finalize(AttachmentUpload.objects.get(id=upload_id))
+        with self.assertRaises(UploadNotFound):
+            ResumableUpload.finalize(stale)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_SENDFILE_BACKEND='')
+class MediaViewTest(TestCase):
+    """Testes para a view de mídia protegida."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(email='owner@test.com', password='testpass123', name='Owner')
+        self.guest = User.objects.create(email='guest@test.com', password='testpass123', name='Guest')
+        self.outsider = User.objects.create(email='outsider@test.com', password='testpass123', name='Outsider')
+
+        self.content = bytes(range(256)) * 40
+        self.name = media_storage.save('attachments/audios/voz.ogg', ContentFile(self.content))
+        self.url = media_storage.url(self.name)
+        audio = AudioAttachment.objects.create(src=self.url)
+
+        chat = Chat.objects.create(from_user=self.owner, to_user=self.guest)
+        ChatMessage.objects.create(chat=chat, from_user=self.owner, attachment_code='AUDIO', attachment_id=audio.id)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_chat_member_access(self):
+        """Testa acesso por participante do chat e 404 para os demais."""
+        self.client.force_authenticate(user=self.guest)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_signed_url_skips_membership(self):
+        """Testa que a URL assinada dá acesso sem autenticação até expirar."""
+        signed = MediaSigner.sign(self.url)
+
+        response = self.client.get(signed)
+        self.assertEqual(response.status_code, 200)
+
+        tampered = signed.replace('signature=', 'signature=0')
+        self.assertEqual(self.client.get(tampered).status_code, 404)
+
+        with patch('core.utils.media.time.time', return_value=time.time() + 3 * settings.MEDIA_SIGNED_URL_TTL):
+            self.assertEqual(self.client.get(signed).status_code, 404)
+
+    def test_range_requests(self):
+        """Testa respostas parciais (206) e intervalo não satisfatível (416)."""
+        signed = MediaSigner.sign(self.url)
+
+        response = self.client.get(signed, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.read(response), self.content[100:200])
+
+        response = self.client.get(signed, HTTP_RANGE='bytes=-10')
+        self.assertEqual(self.read(response), self.content[-10:])
+
+        response = self.client.get(signed, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_sendfile_offload(self):
+        """Testa que com nginx a transferência é delegada via X-Accel-Redirect."""
+        with self.settings(MEDIA_SENDFILE_BACKEND='nginx'):
+            response = self.client.get(MediaSigner.sign(self.url))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_avatars_are_public(self):
+        """Testa que avatares não exigem assinatura e podem ir para caches públicos."""
+        name = media_storage.save('avatars/foto.png', ContentFile(b'png'))
+
+        response = self.client.get(media_storage.url(name))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+
+    def test_public_prefix_traversal(self):
+        """Testa que ``..`` após o prefixo público não expõe arquivos protegidos."""
+        media_storage.save('avatars/foto.png', ContentFile(b'png'))
+
+        for path in (
+            f'avatars/%2e%2e/{self.name}',
+            f'avatars/../{self.name}',
+            f'avatars/x/%2E%2E/%2e%2e/{self.name}',
+            f'avatars/..%2f{self.name}',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(f'{settings.MEDIA_URL}{path}')
+                self.assertEqual(response.status_code, 404)
+
+        self.assertIsNone(MediaSigner.normalize(f'avatars/../{self.name}'))
+        self.assertEqual(MediaSigner.normalize('avatars/./foto.png'), 'avatars/foto.png')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), AUDIO_PEAKS_COUNT=10)
+class AudioMetadataPipelineTest(TestCase):
+    """Testes para os metadados e a forma de onda dos áudios."""
+
+    def make_wav(self, amplitudes, rate=8000, frames_per_step=800):
+        """Gera um WAV de 16 bits mono com um trecho por amplitude."""
+        output = io.BytesIO()
+        with wave.open(output, 'wb') as audio:
+            audio.setnchannels(1)
+            audio.setsampwidth(2)
+            audio.setframerate(rate)
+            for amplitude in amplitudes:
+                sample = int(32767 * amplitude)
+                audio.writeframes(b''.join(
+                    (sample if index % 2 else -sample).to_bytes(2, 'little', signed=True)
+                    for index in range(frames_per_step)
+                ))
+        return output.getvalue()
+
+    def create_audio(self, content, name='voz.wav'):
+        stored = media_storage.save(f'attachments/audios/{name}', ContentFile(content))
+        return AudioAttachment.objects.create(src=media_storage.url(stored))
+
+    def test_wav_metadata_and_peaks(self):
+        """Testa duração, taxa de amostragem e picos de um WAV."""
+        amplitudes = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 1.0]
+        attachment = self.create_audio(self.make_wav(amplitudes))
+
+        AudioMetadataPipeline.process(attachment.id)
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.sample_rate, 8000)
+        self.assertAlmostEqual(attachment.duration, 1.0)
+        self.assertEqual(attachment.peaks, [0, 10, 20, 30, 40, 50, 60, 70, 80, 100])
+
+        data = AudioAttachmentSerializer(attachment).data
+        self.assertEqual(data['duration'], 1.0)
+        self.assertEqual(len(data['peaks']), 10)
+
+    def test_metadata_bumps_message_versions(self):
+        """Testa que os metadados gravados depois do envio geram nova versão do chat."""
+        owner = User.objects.create(name='Owner', email='owner@example.com')
+        other = User.objects.create(name='Other', email='other@example.com')
+        chat = Chat.objects.create(from_user=owner, to_user=other)
+        attachment = self.create_audio(self.make_wav([0.5]))
+        message = ChatMessage.objects.create(chat=chat, from_user=owner, attachment_code='AUDIO', attachment_id=attachment.id)
+
+        AudioMetadataPipeline.process(attachment.id)
+
+        chat.refresh_from_db()
+        message.refresh_from_db()
+        self.assertEqual(chat.version, 1)
+        self.assertEqual(message.seq, chat.version)
+
+    def test_unsupported_audio_is_left_empty(self):
+        """Testa que formato sem decodificador não quebra e fica sem metadados."""
+        attachment = self.create_audio(b'OggS' + os.urandom(64), name='voz.ogg')
+
+        with self.settings(AUDIO_DECODERS=['attachments.utils.audio.WaveDecoder']):
+            self.assertIsNone(AudioMetadataPipeline.process(attachment.id))
+
+        attachment.refresh_from_db()
+        self.assertIsNone(attachment.duration)
+        self.assertEqual(attachment.peaks, [])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), ATTACHMENT_THUMBNAIL_WORKERS=0)
+class ThumbnailPipelineTest(TestCase):
+    """Testes para miniaturas e placeholders de anexos de imagem."""
+
+    def create_image(self, size=(1200, 800), exif=None):
+        output = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(output, 'JPEG', exif=exif or Image.Exif())
+        stored = media_storage.save('attachments/files/foto.jpg', ContentFile(output.getvalue()))
+        src = media_storage.url(stored)
+        return FileAttachment.objects.create(
+            name='foto', extension='jpg', size=len(output.getvalue()), src=src, content_type='image/jpeg'
+        )
+
+    def test_thumbnail_and_placeholder(self):
+        """Testa miniatura, placeholder e dimensões no serializer."""
+        attachment = self.create_image()
+
+        ThumbnailPipeline.submit(attachment.id, attachment.src)
+
+        attachment.refresh_from_db()
+        self.assertEqual((attachment.width, attachment.height), (1200, 800))
+        self.assertTrue(attachment.placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertLess(len(attachment.placeholder), 1024)
+        with media_storage.open(media_storage.name_from_url(attachment.thumbnail)) as file:
+            with Image.open(file) as thumbnail:
+                self.assertEqual(thumbnail.size, (320, 213))
+
+        data = FileAttachmentSerializer(attachment).data
+        self.assertIn('?expires=', data['thumbnail'])
+        self.assertEqual(data['width'], 1200)
+
+    def test_thumbnail_bumps_message_versions(self):
+        """Testa que a miniatura gravada depois do envio gera nova versão do chat."""
+        owner = User.objects.create(name='Owner', email='owner@example.com')
+        other = User.objects.create(name='Other', email='other@example.com')
+        chat = Chat.objects.create(from_user=owner, to_user=other)
+        attachment = self.create_image(size=(64, 64))
+        message = ChatMessage.objects.create(chat=chat, from_user=owner, attachment_code='FILE', attachment_id=attachment.id)
+
+        ThumbnailPipeline.submit(attachment.id, attachment.src)
+
+        chat.refresh_from_db()
+        message.refresh_from_db()
+        self.assertEqual(chat.version, 1)
+        self.assertEqual(message.seq, chat.version)
+
+    def test_exif_rotation_swaps_dimensions(self):
+        """Testa que as dimensões consideram a orientação do EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        attachment = self.create_image(exif=exif)
+
+        fields = ThumbnailPipeline.submit(attachment.id, attachment.src)
+
+        self.assertEqual((fields['width'], fields['height']), (800, 1200))
+
+    def test_process_pool(self):
+        """Testa a geração em processo separado com gravação no callback."""
+        attachment = self.create_image()
+        saved = threading.Event()
+
+        with self.settings(ATTACHMENT_THUMBNAIL_WORKERS=1), \
+                patch.object(ThumbnailPipeline, 'save', side_effect=lambda *args: saved.set()) as save:
+            result = ThumbnailPipeline.submit(attachment.id, attachment.src).result(timeout=30)
+            self.assertTrue(saved.wait(timeout=30))
+
+        self.assertEqual((result['width'], result['height']), (1200, 800))
+        self.assertEqual(save.call_args.args[:2], (attachment.id, attachment.src))
+
+    def test_delete_releases_thumbnail(self):
+        """Testa que apagar o anexo libera a miniatura."""
+        attachment = self.create_image()
+        ThumbnailPipeline.submit(attachment.id, attachment.src)
+        attachment.refresh_from_db()
+        name = media_storage.name_from_url(attachment.thumbnail)
+
+        attachment.delete()
+
+        self.assertFalse(media_storage.exists(name))
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import AttachmentUploadsView, AttachmentUploadView, AttachmentUploadCompleteView
+
+urlpatterns = [
+    path('uploads/', AttachmentUploadsView.as_view(), name='attachment-uploads'),
+    path('uploads/<uuid:upload_id>/', AttachmentUploadView.as_view(), name='attachment-upload'),
+    path('uploads/<uuid:upload_id>/complete/', AttachmentUploadCompleteView.as_view(), name='attachment-upload-complete'),
+]
@@ -0,0 +1,220 @@
+import json
+import logging
+import math
+import shutil
+import subprocess
+import sys
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from core.utils.storage import media_storage
+from .uploads import ResumableUpload
+
+logger = logging.getLogger(__name__)
+
+
+class WaveDecoder:
+    """
+    Decodificador de WAV (PCM 8, 16 ou 32 bits) em Python puro.
+
+    Lê o arquivo em blocos de um pico por vez, então a memória usada não
+    depende da duração do áudio.
+    """
+
+    CONTENT_TYPES = ('audio/wav', 'audio/x-wav', 'audio/wave')
+    TYPECODES = {1: 'B', 2: 'h', 4: 'i'}
+
+    @staticmethod
+    def supports(content_type):
+        return content_type in WaveDecoder.CONTENT_TYPES
+
+    @staticmethod
+    def decode(path, peaks_count):
+        """
+        Args:
+            path (str): Caminho do arquivo
+            peaks_count (int): Quantidade de picos desejada
+
+        Returns:
+            dict: ``duration`` (s), ``sample_rate`` (Hz) e ``peaks`` (0 a 100)
+        """
+        with wave.open(path, 'rb') as audio:
+            width = audio.getsampwidth()
+            rate = audio.getframerate()
+            frames = audio.getnframes()
+
+            metadata = {'duration': frames / rate if rate else None, 'sample_rate': rate, 'peaks': []}
+
+            typecode = WaveDecoder.TYPECODES.get(width)
+            if not typecode or not frames:
+                return metadata
+
+            full_scale = 2 ** (8 * width - 1)
+            bucket = math.ceil(frames / peaks_count)
+
+            for data in iter(lambda: audio.readframes(bucket), b''):
+                samples = array(typecode, data[:len(data) - len(data) % width])
+                if not samples:
+                    break
+                if sys.byteorder == 'big':
+                    samples.byteswap()
+
+                if width == 1:
+                    # PCM de 8 bits é sem sinal, centrado em 128
+                    peak = max(max(samples) - 128, 128 - min(samples))
+                else:
+                    peak = max(max(samples), -min(samples))
+
+                metadata['peaks'].append(min(100, round(peak * 100 / full_scale)))
+
+        return metadata
+
+
+class FfmpegDecoder:
+    """
+    Decodificador para os demais formatos (OGG/Opus, MP3, WebM, M4A...).
+
+    Usa ``ffprobe`` para duração e taxa de amostragem e lê a saída PCM
+    (mono, 8 kHz) do ``ffmpeg`` em blocos. Só é usado se os binários
+    estiverem instalados.
+    """
+
+    PCM_RATE = 8000
+
+    @staticmethod
+    def supports(content_type):
+        return content_type.startswith('audio/') and bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+
+    @staticmethod
+    def decode(path, peaks_count):
+        """Mesmo contrato de ``WaveDecoder.decode``."""
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=sample_rate:format=duration', '-of', 'json', path],
+            capture_output=True, check=True, timeout=30
+        )
+        info = json.loads(probe.stdout or b'{}')
+        streams = info.get('streams') or [{}]
+        duration = float(info.get('format', {}).get('duration') or 0) or None
+        rate = int(streams[0].get('sample_rate') or 0) or None
+
+        metadata = {'duration': duration, 'sample_rate': rate, 'peaks': []}
+        if not duration:
+            return metadata
+
+        bucket = max(1, math.ceil(duration * FfmpegDecoder.PCM_RATE / peaks_count)) * 2
+        process = subprocess.Popen(
+            ['ffmpeg', '-v', 'error', '-i', path, '-ac', '1', '-ar', str(FfmpegDecoder.PCM_RATE), '-f', 's16le', '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            for data in iter(lambda: process.stdout.read(bucket), b''):
+                samples = array('h', data[:len(data) - len(data) % 2])
+                if not samples:
+                    break
+                if sys.byteorder == 'big':
+                    samples.byteswap()
+                peak = max(max(samples), -min(samples))
+                metadata['peaks'].append(min(100, round(peak * 100 / 32768)))
+        finally:
+            process.stdout.close()
+            process.wait(timeout=30)
+
+        return metadata
+
+
+class AudioMetadataPipeline:
+    """
+    Calcula duração, taxa de amostragem e picos da forma de onda dos áudios.
+
+    Roda uma vez, logo após o upload, em um pool de
+    ``AUDIO_PROCESSING_WORKERS`` threads (0 processa na própria requisição).
+    O primeiro decodificador de ``AUDIO_DECODERS`` que suporta o content type
+    é usado; com os dados no ``AudioAttachment``, as listas de mensagens
+    desenham duração e forma de onda sem baixar o áudio.
+    """
+
+    executor = None
+    setup_lock = Lock()
+
+    @classmethod
+    def submit(cls, attachment_id):
+        """Agenda a análise do áudio recém enviado."""
+        if settings.AUDIO_PROCESSING_WORKERS <= 0:
+            return cls.process(attachment_id)
+
+        with cls.setup_lock:
+            if cls.executor is None:
+                cls.executor = ThreadPoolExecutor(
+                    max_workers=settings.AUDIO_PROCESSING_WORKERS,
+                    thread_name_prefix='audio-processing'
+                )
+
+        return cls.executor.submit(cls.run, attachment_id)
+
+    @classmethod
+    def run(cls, attachment_id):
+        """Executa ``process`` em uma thread do pool, registrando falhas."""
+        try:
+            return cls.process(attachment_id)
+        except Exception:
+            logger.exception('Falha ao analisar o áudio %s', attachment_id)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def process(cls, attachment_id):
+        """
+        Analisa o arquivo e grava os metadados no anexo.
+
+        Mensagens já enviadas com o anexo ganham uma nova versão do chat,
+        para que ETags e sincronização entreguem os metadados.
+
+        Returns:
+            dict | None: Metadados gravados ou None se nenhum decodificador
+            suporta o formato (ou a decodificação falhou)
+        """
+        from chats.models import ChatMessage
+        from ..models import AudioAttachment
+
+        src = AudioAttachment.objects.filter(id=attachment_id).values_list('src', flat=True).first()
+        name = media_storage.name_from_url(src)
+        if not name or not media_storage.exists(name):
+            return None
+
+        try:
+            metadata = cls.analyze(media_storage.path(name))
+        except (wave.Error, EOFError, OSError, ValueError, subprocess.SubprocessError):
+            # Arquivo corrompido ou formato não suportado: o anexo fica sem metadados
+            logger.warning('Não foi possível decodificar o áudio %s', attachment_id, exc_info=True)
+            return None
+
+        if metadata is None:
+            return None
+
+        if AudioAttachment.objects.filter(id=attachment_id).update(**metadata):
+            ChatMessage.bump_attachment_versions('AUDIO', attachment_id)
+        return metadata
+
+    @staticmethod
+    def analyze(path):
+        """
+        Decodifica o arquivo com o primeiro decodificador compatível.
+
+        Returns:
+            dict | None: ``duration``, ``sample_rate`` e ``peaks``
+        """
+        content_type = ResumableUpload.content_type(path, path)
+
+        for decoder_path in settings.AUDIO_DECODERS:
+            decoder = import_string(decoder_path)
+            if decoder.supports(content_type):
+                return decoder.decode(path, settings.AUDIO_PEAKS_COUNT)
+
+        return None
@@ -0,0 +1,22 @@
+from rest_framework.exceptions import APIException
+
+
+class UploadNotFound(APIException):
+    """Exception para upload inexistente ou de outro usuário."""
+    status_code = 404
+    default_detail = 'Upload não encontrado'
+    default_code = 'upload_not_found'
+
+
+class UploadTooLarge(APIException):
+    """Exception para arquivo acima do limite de tamanho."""
+    status_code = 413
+    default_detail = 'Arquivo maior que o permitido'
+    default_code = 'upload_too_large'
+
+
+class UploadConflict(APIException):
+    """Exception para envio fora de ordem ou concorrente no mesmo upload."""
+    status_code = 409
+    default_detail = 'Offset do upload não confere'
+    default_code = 'upload_conflict'
\ No newline at end of file
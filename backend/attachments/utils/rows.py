@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from core.utils.media import MediaSigner
+from .format import Format
+
+
+class AttachmentRows:
+    """
+    Versão rápida de ``FileAttachmentSerializer`` e ``AudioAttachmentSerializer``.
+
+    Carrega os anexos de uma lista de mensagens com uma consulta ``values()``
+    por tipo e devolve cada um já no formato dos serializers.
+    """
+
+    FILE_FIELDS = ('id', 'name', 'extension', 'size', 'src', 'content_type', 'width', 'height', 'thumbnail', 'placeholder')
+    AUDIO_FIELDS = ('id', 'src', 'duration', 'sample_rate', 'peaks')
+
+    @staticmethod
+    def querysets(pairs):
+        """
+        Monta as consultas dos anexos pedidos.
+
+        Args:
+            pairs: Iterável de ``(código, id)``
+
+        Returns:
+            list: ``(código, queryset de values())`` por tipo de anexo
+        """
+        from ..models import AudioAttachment, FileAttachment
+
+        wanted = defaultdict(set)
+        for code, attachment_id in pairs:
+            if code in ('FILE', 'AUDIO') and attachment_id:
+                wanted[code].add(attachment_id)
+
+        querysets = []
+        if wanted['FILE']:
+            querysets.append(('FILE', FileAttachment.objects.filter(id__in=wanted['FILE']).values(*AttachmentRows.FILE_FIELDS)))
+        if wanted['AUDIO']:
+            querysets.append(('AUDIO', AudioAttachment.objects.filter(id__in=wanted['AUDIO']).values(*AttachmentRows.AUDIO_FIELDS)))
+
+        return querysets
+
+    @staticmethod
+    def fetch(pairs):
+        """
+        Carrega e serializa os anexos.
+
+        Returns:
+            dict: ``(código, id) -> {'type': código, 'data': ...}``
+        """
+        return {
+            (code, row['id']): AttachmentRows.represent(code, row)
+            for code, queryset in AttachmentRows.querysets(pairs)
+            for row in queryset
+        }
+
+    @staticmethod
+    async def afetch(pairs):
+        """Versão assíncrona de ``fetch``."""
+        return {
+            (code, row['id']): AttachmentRows.represent(code, row)
+            for code, queryset in AttachmentRows.querysets(pairs)
+            async for row in queryset
+        }
+
+    @staticmethod
+    def represent(code, row):
+        """Serializa um anexo no formato de ``ChatMessageSerializer.get_attachment``."""
+        data = dict(row)
+        data['src'] = AttachmentRows.media_url(data['src'])
+
+        if code == 'FILE':
+            data['size'] = Format.format_bytes(int(data['size']))
+            data['thumbnail'] = AttachmentRows.media_url(data['thumbnail'])
+
+        return {'type': code, 'data': data}
+
+    @staticmethod
+    def media_url(src):
+        """Assina e concatena ``CURRENT_URL`` como os serializers de anexo."""
+        return settings.CURRENT_URL + MediaSigner.sign(src) if src else src
@@ -0,0 +1,147 @@
+import base64
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+from core.utils.storage import media_storage
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailPipeline:
+    """
+    Gera miniatura, placeholder e dimensões dos anexos de imagem.
+
+    A decodificação e o redimensionamento (CPU) rodam em um pool de
+    ``ATTACHMENT_THUMBNAIL_WORKERS`` processos, sem disputar o GIL com as
+    requisições; o processo filho só recebe o caminho e devolve bytes. A
+    gravação na storage e no banco acontece no processo principal, no
+    callback do pool. Com ``ATTACHMENT_THUMBNAIL_WORKERS = 0`` tudo roda na
+    própria requisição.
+    """
+
+    executor = None
+    setup_lock = Lock()
+
+    @staticmethod
+    def supports(content_type):
+        """Verifica se o content type é de uma imagem que o Pillow decodifica."""
+        return content_type in ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+
+    @classmethod
+    def submit(cls, attachment_id, src):
+        """
+        Agenda a geração da miniatura de um anexo de imagem.
+
+        Args:
+            attachment_id: ID do FileAttachment
+            src (str): URL pública do arquivo original
+        """
+        path = media_storage.path(media_storage.name_from_url(src))
+        options = (settings.ATTACHMENT_THUMBNAIL_SIZE, settings.ATTACHMENT_PLACEHOLDER_SIZE)
+
+        if settings.ATTACHMENT_THUMBNAIL_WORKERS <= 0:
+            try:
+                return cls.save(attachment_id, src, cls.render(path, *options))
+            except (OSError, ValueError, Image.DecompressionBombError):
+                # Imagem corrompida: o anexo fica sem miniatura
+                logger.warning('Não foi possível gerar miniatura do anexo %s', attachment_id, exc_info=True)
+                return None
+
+        with cls.setup_lock:
+            if cls.executor is None:
+                cls.executor = ProcessPoolExecutor(max_workers=settings.ATTACHMENT_THUMBNAIL_WORKERS)
+
+        future = cls.executor.submit(cls.render, path, *options)
+        future.add_done_callback(partial(cls.finish, attachment_id, src))
+        return future
+
+    @classmethod
+    def finish(cls, attachment_id, src, future):
+        """Callback do pool: grava o resultado, registrando falhas."""
+        try:
+            cls.save(attachment_id, src, future.result())
+        except Exception:
+            logger.exception('Falha ao gerar miniatura do anexo %s', attachment_id)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def render(path, thumbnail_size, placeholder_size):
+        """
+        Decodifica a imagem e gera miniatura e placeholder (roda no processo filho).
+
+        Args:
+            path (str): Caminho do arquivo original
+            thumbnail_size (int): Maior lado da miniatura em pixels
+            placeholder_size (int): Maior lado do placeholder em pixels
+
+        Returns:
+            dict: ``width``, ``height`` (da imagem original, já orientada),
+            ``thumbnail`` (bytes WebP) e ``placeholder`` (data URI JPEG)
+        """
+        with Image.open(path) as image:
+            # Dimensões reais, já considerando a rotação indicada no EXIF
+            width, height = image.size
+            if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                width, height = height, width
+
+            # JPEG: decodifica direto em escala reduzida quando possível
+            image.draft('RGB', (thumbnail_size, thumbnail_size))
+            picture = ImageOps.exif_transpose(image).convert('RGBA')
+
+        picture.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumbnail = io.BytesIO()
+        picture.save(thumbnail, 'WEBP', quality=75, method=4)
+
+        # Placeholder sem transparência: compõe sobre fundo branco
+        tiny = picture.copy()
+        tiny.thumbnail((placeholder_size, placeholder_size), Image.BILINEAR)
+        flattened = Image.new('RGB', tiny.size, (255, 255, 255))
+        flattened.paste(tiny, mask=tiny.getchannel('A'))
+        placeholder = io.BytesIO()
+        flattened.save(placeholder, 'JPEG', quality=40)
+
+        return {
+            'width': width,
+            'height': height,
+            'thumbnail': thumbnail.getvalue(),
+            'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(placeholder.getvalue()).decode(),
+        }
+
+    @staticmethod
+    def save(attachment_id, src, result):
+        """
+        Grava a miniatura na storage e os dados no anexo.
+
+        Se o anexo foi removido durante o processamento, a miniatura é
+        liberada. Mensagens já enviadas com o anexo ganham uma nova versão do
+        chat, para que ETags e sincronização entreguem a miniatura.
+
+        Returns:
+            dict: Campos gravados ou None se o anexo não existe mais
+        """
+        from chats.models import ChatMessage
+        from ..models import FileAttachment
+
+        stored = media_storage.save('attachments/thumbnails/thumbnail.webp', ContentFile(result['thumbnail']))
+        fields = {
+            'width': result['width'],
+            'height': result['height'],
+            'thumbnail': media_storage.url(stored),
+            'placeholder': result['placeholder'],
+        }
+
+        if not FileAttachment.objects.filter(id=attachment_id, src=src).update(**fields):
+            media_storage.delete(stored)
+            return None
+
+        ChatMessage.bump_attachment_versions('FILE', attachment_id)
+        return fields
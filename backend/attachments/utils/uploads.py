@@ -0,0 +1,275 @@
+import fcntl
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.utils.exceptions import ValidationError
+from core.utils.storage import media_storage
+from .exceptions import UploadConflict, UploadNotFound, UploadTooLarge
+
+
+class ResumableUpload:
+    """
+    Upload de anexos em blocos, retomável e sem carregar o arquivo em memória.
+
+    Fluxo: ``create`` registra o upload com nome e tamanho declarados;
+    ``append`` recebe o corpo da requisição a partir do ``offset`` atual,
+    copiando em blocos de ``ATTACHMENT_UPLOAD_CHUNK_SIZE`` direto para o
+    arquivo parcial (o limite de tamanho é conferido enquanto os bytes
+    chegam); ``finalize`` confere o SHA-256, move o arquivo para a storage
+    endereçada por conteúdo e cria o anexo.
+    """
+
+    # Assinaturas (bytes iniciais) dos formatos mais comuns
+    SIGNATURES = [
+        (0, b'%PDF-', 'application/pdf'),
+        (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+        (0, b'\xff\xd8\xff', 'image/jpeg'),
+        (0, b'GIF8', 'image/gif'),
+        (0, b'OggS', 'audio/ogg'),
+        (0, b'ID3', 'audio/mpeg'),
+        (0, b'\xff\xfb', 'audio/mpeg'),
+        (0, b'fLaC', 'audio/flac'),
+        (0, b'\x1aE\xdf\xa3', 'audio/webm'),
+        (0, b'PK\x03\x04', 'application/zip'),
+        (8, b'WAVE', 'audio/wav'),
+        (8, b'WEBP', 'image/webp'),
+        (4, b'ftyp', 'audio/mp4'),
+    ]
+
+    @staticmethod
+    def max_size(attachment_code):
+        """Retorna o tamanho máximo (bytes) para o tipo de anexo."""
+        if attachment_code == 'AUDIO':
+            return settings.ATTACHMENT_MAX_AUDIO_SIZE
+        return settings.ATTACHMENT_MAX_FILE_SIZE
+
+    @staticmethod
+    def create(user, attachment_code, name, size, content_type=''):
+        """
+        Registra um novo upload.
+
+        Args:
+            user: Usuário dono do upload
+            attachment_code (str): 'FILE' ou 'AUDIO'
+            name (str): Nome original do arquivo
+            size (int): Tamanho total declarado em bytes
+            content_type (str): Tipo informado pelo cliente
+
+        Returns:
+            AttachmentUpload: Upload criado com offset 0
+
+        Raises:
+            ValidationError: Se os dados forem inválidos
+            UploadTooLarge: Se o tamanho passar do limite
+        """
+        from ..models import AttachmentUpload
+
+        if attachment_code not in ('FILE', 'AUDIO'):
+            raise ValidationError('Código de anexo inválido. Use FILE ou AUDIO')
+
+        name = os.path.basename(str(name or '')).strip()
+        if not name:
+            raise ValidationError('Nome do arquivo é obrigatório')
+
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise ValidationError('Tamanho do arquivo inválido')
+
+        if size <= 0:
+            raise ValidationError('Tamanho do arquivo inválido')
+
+        if size > ResumableUpload.max_size(attachment_code):
+            raise UploadTooLarge()
+
+        upload = AttachmentUpload.objects.create(
+            user=user,
+            attachment_code=attachment_code,
+            name=name[:255],
+            content_type=str(content_type or '')[:100],
+            size=size
+        )
+
+        os.makedirs(settings.ATTACHMENT_UPLOAD_DIR, exist_ok=True)
+        open(upload.path(), 'wb').close()
+
+        return upload
+
+    @staticmethod
+    def append(upload, stream, offset, checksum=None):
+        """
+        Grava o corpo recebido a partir do offset atual do upload.
+
+        O arquivo parcial fica travado durante a gravação, então envios
+        concorrentes do mesmo upload falham com 409 em vez de intercalar
+        bytes. Em qualquer erro o arquivo volta ao offset anterior.
+
+        Args:
+            upload: AttachmentUpload
+            stream: Objeto com ``read(n)`` (corpo da requisição) ou None
+            offset (int): Offset informado pelo cliente
+            checksum (str): SHA-256 (hex) do bloco enviado, opcional
+
+        Returns:
+            int: Novo offset
+
+        Raises:
+            UploadConflict: Se o offset não confere ou há outro envio em andamento
+            UploadTooLarge: Se os bytes passarem do tamanho declarado
+            ValidationError: Se o checksum do bloco não conferir
+        """
+        chunk_size = settings.ATTACHMENT_UPLOAD_CHUNK_SIZE
+
+        with open(upload.path(), 'r+b') as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadConflict('Outro envio deste upload está em andamento')
+
+            upload.refresh_from_db(fields=['offset'])
+            start = upload.offset
+            if offset != start:
+                raise UploadConflict(f'Offset esperado: {start}')
+
+            file.seek(start)
+            file.truncate()
+
+            hasher = hashlib.sha256() if checksum else None
+            remaining = upload.size - start
+            received = 0
+
+            try:
+                while stream is not None:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+
+                    received += len(chunk)
+                    if received > remaining:
+                        raise UploadTooLarge()
+
+                    file.write(chunk)
+                    if hasher:
+                        hasher.update(chunk)
+
+                if hasher and hasher.hexdigest() != checksum.lower():
+                    raise ValidationError('Checksum do bloco não confere')
+            except BaseException:
+                file.truncate(start)
+                raise
+
+            # Ainda com a trava: o próximo envio já enxerga o novo offset.
+            # updated_at entra no mesmo UPDATE (update() ignora auto_now), senão
+            # o purge_stale_uploads apagaria uploads em andamento
+            type(upload).objects.filter(id=upload.id).update(
+                offset=F('offset') + received,
+                updated_at=timezone.now()
+            )
+
+        upload.offset = start + received
+        return upload.offset
+
+    @staticmethod
+    def finalize(upload, checksum=None):
+        """
+        Conclui o upload e cria o anexo do dono do upload.
+
+        A linha do upload fica travada até o fim: uma segunda conclusão
+        simultânea espera e recebe 404, em vez de tentar mover um arquivo
+        que já saiu do diretório de uploads.
+
+        Args:
+            upload: AttachmentUpload com todos os bytes recebidos
+            checksum (str): SHA-256 (hex) do arquivo completo, opcional
+
+        Returns:
+            FileAttachment | AudioAttachment: Anexo criado
+
+        Raises:
+            ValidationError: Se o upload estiver incompleto, o checksum não
+                conferir ou o conteúdo não for do tipo esperado
+            UploadNotFound: Se o upload já foi concluído ou cancelado
+        """
+        from ..models import AttachmentUpload
+
+        with transaction.atomic():
+            locked = AttachmentUpload.objects.select_for_update().filter(id=upload.id).first()
+            if locked is None or not os.path.exists(locked.path()):
+                raise UploadNotFound()
+
+            attachment = ResumableUpload.create_attachment(locked, checksum)
+
+        # Após o commit: as threads dos pipelines já enxergam o anexo
+        if locked.attachment_code == 'AUDIO':
+            from .audio import AudioMetadataPipeline
+            AudioMetadataPipeline.submit(attachment.id)
+        else:
+            from .thumbnails import ThumbnailPipeline
+            if ThumbnailPipeline.supports(attachment.content_type):
+                ThumbnailPipeline.submit(attachment.id, attachment.src)
+
+        return attachment
+
+    @staticmethod
+    def create_attachment(upload, checksum=None):
+        """Move o arquivo para a storage, cria o anexo e remove o upload (já travado)."""
+        from ..models import AudioAttachment, FileAttachment
+
+        path = upload.path()
+        if upload.offset != upload.size or os.path.getsize(path) != upload.size:
+            raise ValidationError('Upload incompleto')
+
+        digest = media_storage.file_digest(path)
+        if checksum and digest != checksum.lower():
+            raise ValidationError('Checksum do arquivo não confere')
+
+        base, extension = os.path.splitext(upload.name)
+        extension = extension.lstrip('.').lower()
+        content_type = ResumableUpload.content_type(path, upload.name, upload.content_type)
+
+        if upload.attachment_code == 'AUDIO' and not content_type.startswith('audio/'):
+            raise ValidationError('O arquivo enviado não é um áudio')
+
+        folder = 'audios' if upload.attachment_code == 'AUDIO' else 'files'
+        stored = media_storage.adopt(path, f'attachments/{folder}/{upload.name}', digest)
+        src = media_storage.url(stored)
+
+        if upload.attachment_code == 'AUDIO':
+            attachment = AudioAttachment.objects.create(src=src, user_id=upload.user_id)
+        else:
+            attachment = FileAttachment.objects.create(
+                user_id=upload.user_id,
+                name=(base or upload.name)[:90],
+                extension=extension[:15],
+                size=upload.size,
+                src=src,
+                content_type=content_type
+            )
+
+        upload.delete()
+
+        return attachment
+
+    @staticmethod
+    def content_type(path, name, declared=''):
+        """
+        Determina o content type pelo conteúdo, depois pela extensão.
+
+        Returns:
+            str: Content type (``application/octet-stream`` se desconhecido)
+        """
+        with open(path, 'rb') as file:
+            head = file.read(16)
+
+        for position, signature, sniffed in ResumableUpload.SIGNATURES:
+            if head[position:position + len(signature)] == signature:
+                return sniffed
+
+        guessed, encoding = mimetypes.guess_type(name)
+        return guessed or declared or 'application/octet-stream'
@@ -1,3 +1,188 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from chats.models import ArchivedChatMessage, ChatMessage
+from core.utils.exceptions import ValidationError
+from core.utils.media import MediaResponse, MediaSigner
+from core.utils.storage import media_storage
+from .models import AttachmentUpload, AudioAttachment, FileAttachment
+from .serializers import AudioAttachmentSerializer, FileAttachmentSerializer
+from .utils.exceptions import UploadNotFound
+from .utils.uploads import ResumableUpload
+
+
+class AttachmentUploadBaseView(APIView):
+    """Métodos comuns às views de upload de anexos."""
+
+    def get_upload(self, request, upload_id):
+        """
+        Busca um upload do usuário logado.
+
+        Raises:
+            UploadNotFound: Se o upload não existe ou é de outro usuário
+        """
+        upload = AttachmentUpload.objects.filter(id=upload_id, user_id=request.user.id).first()
+        if not upload:
+            raise UploadNotFound()
+        return upload
+
+    @staticmethod
+    def upload_response(upload, status=200):
+        """Estado atual do upload (usado também para retomar o envio)."""
+        return Response({
+            'id': str(upload.id),
+            'name': upload.name,
+            'attachment_code': upload.attachment_code,
+            'offset': upload.offset,
+            'size': upload.size,
+            'chunk_size': settings.ATTACHMENT_UPLOAD_CHUNK_SIZE
+        }, status=status, headers={'Upload-Offset': str(upload.offset)})
+
+
+class AttachmentUploadsView(AttachmentUploadBaseView):
+    """View para iniciar uploads retomáveis de anexos."""
+
+    def post(self, request):
+        """Cria o upload a partir do nome, tamanho e tipo de anexo."""
+        upload = ResumableUpload.create(
+            request.user,
+            request.data.get('attachment_code', 'FILE'),
+            request.data.get('name'),
+            request.data.get('size'),
+            request.data.get('content_type', '')
+        )
+
+        return self.upload_response(upload, status=201)
+
+
+class AttachmentUploadView(AttachmentUploadBaseView):
+    """View para enviar, consultar e cancelar um upload."""
+
+    def get(self, request, upload_id):
+        """Retorna o offset atual para retomar o envio."""
+        return self.upload_response(self.get_upload(request, upload_id))
+
+    def put(self, request, upload_id):
+        """
+        Grava o corpo da requisição (bytes crus) a partir de ``Upload-Offset``.
+
+        O corpo é lido em blocos de ``request.stream``; ``request.data`` nunca
+        é acessado para não carregar o arquivo inteiro em memória.
+        """
+        upload = self.get_upload(request, upload_id)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            raise ValidationError('Cabeçalho Upload-Offset é obrigatório')
+
+        ResumableUpload.append(upload, request.stream, offset, request.headers.get('X-Chunk-SHA256'))
+
+        return self.upload_response(upload)
+
+    def delete(self, request, upload_id):
+        """Cancela o upload e remove os bytes recebidos."""
+        self.get_upload(request, upload_id).delete()
+        return Response(status=204)
+
+
+class AttachmentUploadCompleteView(AttachmentUploadBaseView):
+    """View para concluir um upload e criar o anexo."""
+
+    def post(self, request, upload_id):
+        """Confere o arquivo recebido e cria o FileAttachment ou AudioAttachment."""
+        upload = self.get_upload(request, upload_id)
+        attachment_code = upload.attachment_code
+
+        attachment = ResumableUpload.finalize(upload, request.data.get('checksum'))
+
+        if attachment_code == 'AUDIO':
+            data = AudioAttachmentSerializer(attachment).data
+        else:
+            data = FileAttachmentSerializer(attachment).data
+
+        return Response({
+            'attachment_code': attachment_code,
+            'attachment_id': attachment.id,
+            'attachment': data
+        }, status=201)
+
+
+class MediaView(APIView):
+    """
+    View que serve os arquivos de MEDIA_ROOT.
+
+    Prefixos de ``MEDIA_PUBLIC_PREFIXES`` (avatares) são servidos a todos.
+    Os demais arquivos exigem uma URL assinada válida (gerada pelos
+    serializers de anexo, ver ``MediaSigner``) ou um usuário autenticado
+    que participe de um chat com mensagem apontando para o arquivo. Sem
+    acesso, a resposta é 404 para não revelar quais arquivos existem.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, name):
+        """Retorna o arquivo (com suporte a Range) se o acesso for permitido."""
+        name = MediaSigner.normalize(name)
+        if name is None:
+            raise Http404()
+
+        public = MediaSigner.is_public(name)
+
+        if not public and not MediaSigner.verify(
+            name, request.query_params.get('expires'), request.query_params.get('signature')
+        ) and not self.user_can_access_media(request.user, name):
+            raise Http404()
+
+        try:
+            return MediaResponse.build(request, name, public=public)
+        except SuspiciousFileOperation:
+            raise Http404()
+
+    @staticmethod
+    def user_can_access_media(user, name):
+        """
+        Verifica se o usuário participa de algum chat com mensagem usando o arquivo.
+
+        Como arquivos idênticos são deduplicados, basta um dos anexos que
+        apontam para o arquivo (ou para a miniatura) estar em um chat do usuário.
+        """
+        if not user or not user.is_authenticated:
+            return False
+
+        url = media_storage.url(name)
+        sources = [url, settings.CURRENT_URL + url]
+
+        attachments = Q()
+        file_ids = list(FileAttachment.objects.filter(
+            Q(src__in=sources) | Q(thumbnail__in=sources)
+        ).values_list('id', flat=True))
+        if file_ids:
+            attachments |= Q(attachment_code='FILE', attachment_id__in=file_ids)
+        audio_ids = list(AudioAttachment.objects.filter(src__in=sources).values_list('id', flat=True))
+        if audio_ids:
+            attachments |= Q(attachment_code='AUDIO', attachment_id__in=audio_ids)
+
+        if not attachments:
+            return False
+
+        participant = Q(chat__from_user_id=user.id) | Q(chat__to_user_id=user.id)
+        if ChatMessage.objects.filter(
+            attachments,
+            participant,
+            deleted_at__isnull=True,
+            chat__deleted_at__isnull=True
+        ).exists():
+            return True
+
+        # Mensagens antigas ficam no arquivo (comando archive_messages)
+        return ArchivedChatMessage.objects.filter(
+            attachments,
+            participant,
+            chat__deleted_at__isnull=True
+        ).exists()
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chats.utils.archive import MessageArchive
+
+
+class Command(BaseCommand):
+    help = 'Move mensagens antigas de chat_messages para chat_messages_archive, em lotes por chat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+                            help='Arquiva mensagens criadas há mais de N dias')
+        parser.add_argument('--batch-size', type=int, default=settings.CHAT_ARCHIVE_BATCH_SIZE,
+                            help='Mensagens movidas por transação')
+        parser.add_argument('--sleep', type=float, default=settings.CHAT_ARCHIVE_BATCH_SLEEP,
+                            help='Pausa em segundos entre lotes')
+        parser.add_argument('--chat', type=int, help='Arquiva apenas este chat')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        chat_ids = [options['chat']] if options['chat'] else list(MessageArchive.chat_ids(cutoff))
+
+        self.stdout.write(f'Arquivando mensagens anteriores a {cutoff:%Y-%m-%d %H:%M} de {len(chat_ids)} chats...')
+
+        started = time.monotonic()
+        archived_count = 0
+        for chat_id in chat_ids:
+            while True:
+                moved = MessageArchive.archive_batch(chat_id, cutoff, options['batch_size'])
+                archived_count += moved
+                if moved < options['batch_size']:
+                    break
+                # Intervalo entre lotes para não disputar o banco com o tráfego
+                time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'{archived_count} mensagens arquivadas em {elapsed:.1f}s!')
+        )
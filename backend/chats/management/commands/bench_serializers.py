@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from accounts.serializers import UserSerializer
+from accounts.utils.rows import UserRows
+from attachments.models import FileAttachment
+from chats.models import Chat, ChatMessage
+from chats.serializers import ChatMessageSerializer
+from chats.utils.rows import MessageRows
+
+
+class Command(BaseCommand):
+    help = 'Compara linhas/s dos serializers do DRF com os serializers rápidos das listagens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Mensagens na listagem')
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções por serializer (vale a melhor)')
+
+    def handle(self, *args, **options):
+        # Dados temporários: tudo é desfeito ao final
+        with transaction.atomic():
+            request, messages, users = self.create_data(options['rows'])
+
+            results = [
+                ('Mensagens', options['rows'],
+                 lambda: ChatMessageSerializer(messages, many=True, context={'request': request}).data,
+                 lambda: MessageRows.serialize(messages, request)),
+                ('Usuários', len(users),
+                 lambda: UserSerializer(User.objects.filter(id__in=users), many=True, context={'request': request}).data,
+                 lambda: [UserRows.represent(row, request) for row in User.objects.filter(id__in=users).values(*UserRows.FIELDS)]),
+            ]
+
+            for label, total, drf, rows in results:
+                drf_time = self.measure(drf, options['repeat'])
+                rows_time = self.measure(rows, options['repeat'])
+                self.stdout.write(
+                    f'{label}: DRF {total / drf_time:,.0f} linhas/s, '
+                    f'rápido {total / rows_time:,.0f} linhas/s ({drf_time / rows_time:.1f}x)'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído'))
+
+    def create_data(self, total):
+        """Cria um chat com ``total`` mensagens (1 a cada 10 com anexo)."""
+        users = [
+            User.objects.create(name=f'Bench {index}', email=f'bench-serializers-{index}@example.com')
+            for index in range(50)
+        ]
+        chat = Chat.objects.create(from_user=users[0], to_user=users[1])
+        attachment = FileAttachment.objects.create(
+            name='doc', extension='pdf', size=2048, src='/media/attachments/doc.pdf', content_type='application/pdf'
+        )
+
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                chat=chat,
+                from_user=users[index % 2],
+                body=f'Mensagem {index}',
+                attachment_code='FILE' if index % 10 == 0 else None,
+                attachment_id=attachment.id if index % 10 == 0 else None
+            )
+            for index in range(total)
+        ])
+
+        request = APIRequestFactory().get('/')
+        request.user = users[0]
+
+        messages = ChatMessage.objects.filter(chat=chat).select_related('from_user').order_by('created_at')
+        return request, messages, [user.id for user in users]
+
+    @staticmethod
+    def measure(function, repeat):
+        """Retorna o menor tempo (s) entre ``repeat`` execuções."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chats.utils.retention import DeletedRowsPurge
+
+
+class Command(BaseCommand):
+    help = 'Remove definitivamente chats e mensagens deletados (soft delete) há mais de CHAT_PURGE_AFTER_DAYS dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_PURGE_AFTER_DAYS,
+                            help='Remove linhas deletadas há mais de N dias')
+        parser.add_argument('--batch-size', type=int, default=settings.CHAT_PURGE_BATCH_SIZE,
+                            help='Tamanho da faixa de IDs de cada DELETE')
+        parser.add_argument('--sleep', type=float, default=settings.CHAT_PURGE_BATCH_SLEEP,
+                            help='Pausa em segundos entre faixas com remoções')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f'Removendo registros deletados antes de {cutoff:%Y-%m-%d %H:%M}...')
+
+        for name, model, condition in DeletedRowsPurge.phases(cutoff):
+            started = time.monotonic()
+            deleted_count = 0
+            attachments_count = 0
+
+            for batch in DeletedRowsPurge.purge(model, condition, options['batch_size'], options['sleep']):
+                deleted_count += batch['deleted']
+                attachments_count += batch['attachments']
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f'  {name}: {deleted_count} removidos (até o ID {batch["last_id"]})')
+
+            elapsed = time.monotonic() - started
+            rate = deleted_count / elapsed if elapsed else 0
+            summary = f'{name}: {deleted_count} removidos em {elapsed:.1f}s ({rate:.0f}/s)'
+            if attachments_count:
+                summary += f', {attachments_count} anexos órfãos'
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.18 on 2026-10-18 23:13
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def fill_last_message_at(apps, schema_editor):
+    """Preenche last_message_at com a data da última mensagem (ou da criação do chat)."""
+    Chat = apps.get_model('chats', 'Chat')
+    ChatMessage = apps.get_model('chats', 'ChatMessage')
+
+    last_message = ChatMessage.objects.filter(
+        chat_id=OuterRef('pk')
+    ).values('chat_id').annotate(last=Max('created_at')).values('last')
+
+    Chat.objects.update(
+        last_message_at=Coalesce(Subquery(last_message), F('created_at'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_chatmessage_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['from_user', 'last_message_at', 'id'], name='chats_from_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['to_user', 'last_message_at', 'id'], name='chats_to_activity_idx'),
+        ),
+        migrations.RunPython(fill_last_message_at, migrations.RunPython.noop),
+    ]
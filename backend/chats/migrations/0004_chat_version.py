@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_chat_last_message_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.18 on 2026-10-18 23:58
+
+import chats.utils.fields
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chats', '0005_sync_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedChatMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('body', chats.utils.fields.CompressedTextField(null=True)),
+                ('attachment_code', models.CharField(choices=[('FILE', 'FILE'), ('AUDIO', 'AUDIO')], max_length=10, null=True)),
+                ('attachment_id', models.IntegerField(null=True)),
+                ('viewed_at', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'chat_messages_archive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', 'created_at', 'id'], name='chat_messages_chat_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedchatmessage',
+            name='chat',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='chats.chat'),
+        ),
+        migrations.AddField(
+            model_name='archivedchatmessage',
+            name='from_user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedchatmessage',
+            index=models.Index(fields=['chat', 'created_at', 'id'], name='chat_archive_chat_created_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def dedupe_chats(apps, schema_editor):
+    """
+    Junta os chats ativos duplicados de um mesmo par e preenche a chave do par.
+
+    Em cada par fica o chat mais antigo (menor ID): as mensagens (quentes e
+    arquivadas) dos duplicados passam para ele, com uma nova versão do chat
+    para os clientes sincronizarem, e os duplicados recebem soft delete.
+    """
+    Chat = apps.get_model('chats', 'Chat')
+    ChatMessage = apps.get_model('chats', 'ChatMessage')
+    ArchivedChatMessage = apps.get_model('chats', 'ArchivedChatMessage')
+
+    survivors = {}
+    duplicates = {}
+    active = Chat.objects.filter(deleted_at__isnull=True).order_by('id')
+    for chat_id, from_user_id, to_user_id in active.values_list('id', 'from_user_id', 'to_user_id').iterator():
+        pair = (min(from_user_id, to_user_id), max(from_user_id, to_user_id))
+        if pair in survivors:
+            duplicates.setdefault(survivors[pair], []).append(chat_id)
+        else:
+            survivors[pair] = chat_id
+
+    now = timezone.now()
+    for survivor_id, duplicate_ids in duplicates.items():
+        group = Chat.objects.filter(id__in=[survivor_id, *duplicate_ids])
+        aggregated = group.aggregate(version=Max('version'), last_message_at=Max('last_message_at'))
+        version = aggregated['version'] + 1
+
+        ChatMessage.objects.filter(chat_id__in=duplicate_ids).update(chat_id=survivor_id, seq=version)
+        ArchivedChatMessage.objects.filter(chat_id__in=duplicate_ids).update(chat_id=survivor_id)
+        Chat.objects.filter(id=survivor_id).update(version=version, last_message_at=aggregated['last_message_at'])
+        Chat.objects.filter(id__in=duplicate_ids).update(deleted_at=now, version=version)
+
+    for (low, high), chat_id in survivors.items():
+        Chat.objects.filter(id=chat_id).update(low_user_id=low, high_user_id=high)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_message_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='low_user_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='high_user_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(dedupe_chats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='chat',
+            constraint=models.UniqueConstraint(fields=('low_user_id', 'high_user_id'), name='chats_participants_uniq'),
+        ),
+    ]
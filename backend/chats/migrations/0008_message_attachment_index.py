@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0007_chat_participants_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['attachment_id', 'attachment_code'], name='chat_messages_attachment_idx'),
+        ),
+    ]
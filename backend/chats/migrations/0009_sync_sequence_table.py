@@ -0,0 +1,41 @@
+# Generated by Django 4.2.18 on 2026-10-19 02:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_sync_seq(apps, schema_editor):
+    """Copia a sequência de alterações de ``User.sync_seq`` para a nova tabela."""
+    User = apps.get_model('accounts', 'User')
+    SyncSequence = apps.get_model('chats', 'SyncSequence')
+
+    SyncSequence.objects.bulk_create(
+        [
+            SyncSequence(user_id=user_id, value=value)
+            for user_id, value in User.objects.filter(sync_seq__gt=0).values_list('id', 'sync_seq').iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_sync_seq'),
+        ('chats', '0008_message_attachment_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'chat_sync_sequences',
+            },
+        ),
+        migrations.RunPython(copy_sync_seq, migrations.RunPython.noop),
+    ]
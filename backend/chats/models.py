@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from accounts.models import User
+from .utils.fields import CompressedTextField
 
 
 class Chat(models.Model):
@@ -18,12 +20,166 @@ class Chat(models.Model):
     viewed_at = models.DateTimeField(null=True)
     deleted_at = models.DateTimeField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    last_message_at = models.DateTimeField(default=timezone.now)
+    version = models.PositiveBigIntegerField(default=0)
+    # Chave canônica do par de participantes (menor e maior ID). Só chats
+    # não deletados têm a chave, então o soft delete libera o par para um
+    # novo chat
+    low_user_id = models.BigIntegerField(null=True)
+    high_user_id = models.BigIntegerField(null=True)
     
     class Meta:
         db_table = "chats"
+        constraints = [
+            models.UniqueConstraint(fields=['low_user_id', 'high_user_id'], name='chats_participants_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['from_user', 'last_message_at', 'id'], name='chats_from_activity_idx'),
+            models.Index(fields=['to_user', 'last_message_at', 'id'], name='chats_to_activity_idx'),
+            models.Index(fields=['from_user', 'version'], name='chats_from_version_idx'),
+            models.Index(fields=['to_user', 'version'], name='chats_to_version_idx'),
+        ]
     
     def __str__(self):
         return f"Chat entre {self.from_user.name} e {self.to_user.name}"
+    
+    def save(self, *args, **kwargs):
+        if self.deleted_at is None:
+            self.low_user_id, self.high_user_id = Chat.pair_key(self.from_user_id, self.to_user_id)
+        else:
+            self.low_user_id = self.high_user_id = None
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def pair_key(user_id, other_user_id):
+        """Retorna a chave canônica ``(menor ID, maior ID)`` do par de usuários."""
+        return min(user_id, other_user_id), max(user_id, other_user_id)
+    
+    @staticmethod
+    def released_pair():
+        """Campos que liberam a chave do par (usar junto com o soft delete)."""
+        return {'low_user_id': None, 'high_user_id': None}
+    
+    @staticmethod
+    def get_or_create_between(from_user, to_user, **defaults):
+        """
+        Retorna o chat ativo entre dois usuários, criando-o se não existir.
+        
+        A busca é uma única consulta pelo índice único do par. Se duas
+        requisições criam o mesmo chat ao mesmo tempo, a constraint rejeita
+        o segundo INSERT e o chat já criado é retornado.
+        
+        Args:
+            from_user: Usuário que cria o chat
+            to_user: Usuário destinatário
+            **defaults: Campos do chat na criação
+            
+        Returns:
+            tuple: (Chat, True se foi criado)
+        """
+        low, high = Chat.pair_key(from_user.id, to_user.id)
+        existing = Chat.objects.select_related('from_user', 'to_user')
+        
+        chat = existing.filter(low_user_id=low, high_user_id=high).first()
+        if chat:
+            return chat, False
+        
+        try:
+            with transaction.atomic():
+                chat = Chat.objects.create(from_user=from_user, to_user=to_user, **defaults)
+                # Primeira versão: o chat novo aparece na sincronização dos dois usuários
+                chat.version = Chat.bump_version(chat.id)
+                return chat, True
+        except IntegrityError:
+            # Outra requisição criou o chat entre a busca e o INSERT
+            return existing.get(low_user_id=low, high_user_id=high), False
+    
+    @staticmethod
+    def bump_version(chat_id, **changes):
+        """
+        Gera uma nova versão do chat (e aplica outras alterações no mesmo UPDATE).
+        
+        A versão é a sequência de alterações do chat: muda sempre que o chat
+        ou suas mensagens mudam, é gravada em ``ChatMessage.seq`` das
+        mensagens alteradas e serve de base para as ETags e para a
+        sincronização incremental. O valor é maior que a versão atual e que
+        a sequência de alterações dos dois participantes (``SyncSequence``),
+        e passa a ser a sequência de ambos: cada usuário tem uma sequência
+        crescente que cobre todos os seus chats, e a sincronização lê só os
+        chats com ``version`` maior que o cursor.
+        
+        Chame dentro de ``transaction.atomic`` junto com a alteração da
+        mensagem: as linhas do chat e das sequências dos participantes ficam
+        travadas até o commit (sempre nessa ordem), então versão e mensagem
+        ficam visíveis juntas e as versões de um usuário são confirmadas na
+        ordem em que são geradas. A tabela de usuários não é tocada.
+        
+        Args:
+            chat_id: ID do chat
+            **changes: Outros campos a atualizar no mesmo UPDATE
+            
+        Returns:
+            int: Nova versão do chat (None se o chat não existe)
+        """
+        with transaction.atomic():
+            row = Chat.objects.select_for_update().filter(id=chat_id).values_list(
+                'from_user_id', 'to_user_id', 'version'
+            ).first()
+            if row is None:
+                return None
+            
+            from_user_id, to_user_id, version = row
+            sequences = SyncSequence.lock(from_user_id, to_user_id)
+            version = max([version, *sequences]) + 1
+            
+            SyncSequence.objects.filter(user_id__in=(from_user_id, to_user_id)).update(value=version)
+            Chat.objects.filter(id=chat_id).update(version=version, **changes)
+            return version
+
+
+class SyncSequence(models.Model):
+    """
+    Sequência de alterações dos chats de um usuário (cursor da sincronização).
+    
+    Fica fora da tabela de usuários para que ``user.save()`` nunca grave um
+    valor desatualizado e para que enviar, ler ou editar mensagens não
+    trave nem reescreva as linhas dos usuários. Só é alterada por
+    ``Chat.bump_version`` via ``update()``.
+    """
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    value = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        db_table = "chat_sync_sequences"
+    
+    @staticmethod
+    def current(user_id):
+        """Retorna a sequência atual do usuário (0 se ele ainda não tem alterações)."""
+        return SyncSequence.objects.filter(user_id=user_id).values_list('value', flat=True).first() or 0
+    
+    @staticmethod
+    def lock(*user_ids):
+        """
+        Trava as sequências dos usuários (em ordem de ID), criando as que faltam.
+        
+        Chame dentro de ``transaction.atomic``.
+        
+        Returns:
+            list: Valores atuais das sequências
+        """
+        user_ids = sorted(set(user_ids))
+        locked = SyncSequence.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+        
+        values = dict(locked.values_list('user_id', 'value'))
+        if len(values) < len(user_ids):
+            SyncSequence.objects.bulk_create(
+                [SyncSequence(user_id=user_id) for user_id in user_ids if user_id not in values],
+                ignore_conflicts=True
+            )
+            values = dict(locked.values_list('user_id', 'value'))
+        
+        return list(values.values())
 
 
 class ChatMessage(models.Model):
@@ -45,14 +201,82 @@ class ChatMessage(models.Model):
     deleted_at = models.DateTimeField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    seq = models.PositiveBigIntegerField(default=0)
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE)
     from_user = models.ForeignKey(User, on_delete=models.CASCADE)
     
     class Meta:
         db_table = "chat_messages"
+        indexes = [
+            models.Index(fields=['chat', 'seq'], name='chat_messages_chat_seq_idx'),
+            models.Index(fields=['chat', 'created_at', 'id'], name='chat_messages_chat_created_idx'),
+            models.Index(fields=['attachment_id', 'attachment_code'], name='chat_messages_attachment_idx'),
+        ]
     
     def __str__(self):
         if self.body:
             return f"Mensagem de {self.from_user.name}: {self.body[:50]}..."
         else:
             return f"Anexo {self.attachment_code} de {self.from_user.name}"
+    
+    @staticmethod
+    def bump_attachment_versions(attachment_code, attachment_id):
+        """
+        Gera uma nova versão das mensagens que usam o anexo.
+        
+        Para dados do anexo gravados depois do envio da mensagem (metadados
+        de áudio, miniaturas): cada chat recebe uma nova versão, gravada em
+        ``seq`` das suas mensagens com o anexo, então as ETags das listagens
+        mudam e a sincronização incremental devolve as mensagens de novo.
+        
+        Args:
+            attachment_code (str): FILE ou AUDIO
+            attachment_id: ID do anexo
+            
+        Returns:
+            int: Quantidade de mensagens atualizadas
+        """
+        messages = ChatMessage.objects.filter(
+            attachment_code=attachment_code,
+            attachment_id=attachment_id,
+            deleted_at__isnull=True
+        )
+        
+        updated = 0
+        for chat_id in set(messages.values_list('chat_id', flat=True)):
+            with transaction.atomic():
+                seq = Chat.bump_version(chat_id)
+                updated += messages.filter(chat_id=chat_id).update(seq=seq)
+        
+        return updated
+
+
+class ArchivedChatMessage(models.Model):
+    """
+    Mensagem antiga movida de ``chat_messages`` pelo comando ``archive_messages``.
+    
+    Mantém o ID e os campos lidos pela listagem (mesmos nomes de
+    ``ChatMessage``, então ``MessageRows`` serializa as duas tabelas), com o
+    corpo comprimido. Só mensagens não deletadas são arquivadas.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    body = CompressedTextField(null=True)
+    attachment_code = models.CharField(
+        max_length=10, 
+        null=True, 
+        choices=ChatMessage.ATTACHMENT_CHOICES
+    )
+    attachment_id = models.IntegerField(null=True)
+    viewed_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name='archived_messages')
+    from_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        db_table = "chat_messages_archive"
+        indexes = [
+            models.Index(fields=['chat', 'created_at', 'id'], name='chat_archive_chat_created_idx'),
+        ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from accounts.serializers import UserSerializer
 from attachments.models import FileAttachment, AudioAttachment
@@ -6,7 +7,12 @@ from .models import Chat, ChatMessage
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
-    """Serializer para mensagens de chat."""
+    """
+    Serializer para mensagens de chat.
+    
+    Se o contexto trouxer ``attachments`` (dict ``(código, id) -> anexo``,
+    ver ``SerializerPrefetch``), os anexos são lidos dele em vez do banco.
+    """
     
     from_user = serializers.SerializerMethodField()
     attachment = serializers.SerializerMethodField()
@@ -19,7 +25,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
     def get_from_user(self, obj):
         """Retorna o usuário remetente serializado."""
         request = self.context.get('request')
-        return UserSerializer(obj.from_user, context={'request': request}).data
+        return UserSerializer(obj.from_user, context={'request': request, 'avatar_size': settings.AVATAR_LIST_SIZE}).data
     
     def get_isEdited(self, obj):
         """Verifica se a mensagem foi editada comparando created_at com updated_at."""
@@ -34,6 +40,10 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         if not obj.attachment_code or not obj.attachment_id:
             return None
         
+        attachments = self.context.get('attachments')
+        if attachments is not None:
+            return self.represent_attachment(obj.attachment_code, attachments.get((obj.attachment_code, obj.attachment_id)))
+        
         try:
             if obj.attachment_code == "FILE":
                 attachment = FileAttachment.objects.get(id=obj.attachment_id)
@@ -51,10 +61,28 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             return None
         
         return None
+    
+    def represent_attachment(self, attachment_code, attachment):
+        """Serializa um anexo já carregado conforme o tipo."""
+        if attachment is None:
+            return None
+        
+        if attachment_code == "FILE":
+            return {"type": "FILE", "data": FileAttachmentSerializer(attachment).data}
+        elif attachment_code == "AUDIO":
+            return {"type": "AUDIO", "data": AudioAttachmentSerializer(attachment).data}
+        
+        return None
 
 
 class ChatSerializer(serializers.ModelSerializer):
-    """Serializer para chats."""
+    """
+    Serializer para chats.
+    
+    Se o contexto trouxer ``unseen_counts`` e ``last_messages`` (dicts por ID
+    do chat, ver ``SerializerPrefetch``), esses campos são lidos dele em vez
+    de uma consulta por chat.
+    """
     
     user = serializers.SerializerMethodField()
     unseen_count = serializers.SerializerMethodField()
@@ -71,14 +99,14 @@ class ChatSerializer(serializers.ModelSerializer):
         
         if current_user:
             # Se o usuário logado é o from_user, retorna o to_user
-            if obj.from_user == current_user:
-                return UserSerializer(obj.to_user, context={'request': request}).data
+            if obj.from_user_id == current_user.id:
+                return UserSerializer(obj.to_user, context={'request': request, 'avatar_size': settings.AVATAR_LIST_SIZE}).data
             # Caso contrário, retorna o from_user
             else:
-                return UserSerializer(obj.from_user, context={'request': request}).data
+                return UserSerializer(obj.from_user, context={'request': request, 'avatar_size': settings.AVATAR_LIST_SIZE}).data
         
         # Fallback: retorna o to_user se não houver contexto de request
-        return UserSerializer(obj.to_user, context={'request': request}).data
+        return UserSerializer(obj.to_user, context={'request': request, 'avatar_size': settings.AVATAR_LIST_SIZE}).data
     
     def get_unseen_count(self, obj):
         """Retorna a quantidade de mensagens não vistas no chat para o usuário logado."""
@@ -87,21 +115,31 @@ class ChatSerializer(serializers.ModelSerializer):
         if not current_user:
             return 0
         
+        unseen_counts = self.context.get('unseen_counts')
+        if unseen_counts is not None:
+            return unseen_counts.get(obj.id, 0)
+        
         # Conta mensagens não vistas que não são do próprio usuário
         return ChatMessage.objects.filter(
             chat=obj,
             viewed_at__isnull=True,
             deleted_at__isnull=True
-        ).exclude(from_user=current_user).count()
+        ).exclude(from_user_id=current_user.id).count()
     
     def get_last_message(self, obj):
         """Retorna a última mensagem do chat."""
-        last_message = ChatMessage.objects.filter(
-            chat=obj,
-            deleted_at__isnull=True
-        ).order_by('-created_at').first()
+        last_messages = self.context.get('last_messages')
+        if last_messages is not None:
+            last_message = last_messages.get(obj.id)
+            context = {'attachments': self.context.get('attachments', {})}
+        else:
+            last_message = ChatMessage.objects.filter(
+                chat=obj,
+                deleted_at__isnull=True
+            ).order_by('-created_at').first()
+            context = {}
         
         if last_message:
-            return ChatMessageSerializer(last_message).data
+            return ChatMessageSerializer(last_message, context=context).data
         
         return None
\ No newline at end of file
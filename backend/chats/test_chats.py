@@ -1,6 +1,12 @@
+import asyncio
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.urls import reverse
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory, force_authenticate
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
@@ -9,6 +15,10 @@ from unittest.mock import patch, MagicMock
 from accounts.models import User
 from chats.models import Chat, ChatMessage
 from chats.serializers import ChatSerializer, ChatMessageSerializer
+from chats.views import (
+    ChatsView, ChatView, ChatMessagesView, ChatMessageView,
+    AsyncChatsView, AsyncChatView, AsyncChatMessagesView, AsyncChatMessageView
+)
 from attachments.models import FileAttachment, AudioAttachment
 
 
@@ -46,22 +56,34 @@ class ChatModelTest(TestCase):
         expected = f"Chat entre {self.user1.name} e {self.user2.name}"
         self.assertEqual(str(chat), expected)
     
-    def test_chat_creation_allows_duplicates(self):
-        """Testa que múltiplos chats podem ser criados (sem constraint de unicidade)."""
-        # Criar primeiro chat
-        chat1 = Chat.objects.create(
+    def test_chat_pair_is_unique(self):
+        """Testa que só existe um chat ativo por par de usuários (em qualquer ordem)."""
+        chat = Chat.objects.create(
             from_user=self.user1,
             to_user=self.user2
         )
+        self.assertEqual((chat.low_user_id, chat.high_user_id), Chat.pair_key(self.user2.id, self.user1.id))
+        
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Chat.objects.create(from_user=self.user2, to_user=self.user1)
         
-        # Criar segundo chat (deveria permitir)
-        chat2 = Chat.objects.create(
+        found, created = Chat.get_or_create_between(self.user2, self.user1)
+        self.assertFalse(created)
+        self.assertEqual(found.id, chat.id)
+    
+    def test_deleted_chat_releases_pair(self):
+        """Testa que o soft delete libera o par para um novo chat."""
+        chat = Chat.objects.create(
             from_user=self.user1,
-            to_user=self.user2
+            to_user=self.user2,
+            deleted_at=timezone.now()
         )
+        self.assertIsNone(chat.low_user_id)
         
-        self.assertNotEqual(chat1.id, chat2.id)
-        self.assertEqual(Chat.objects.count(), 2)
+        new_chat, created = Chat.get_or_create_between(self.user1, self.user2)
+        self.assertTrue(created)
+        self.assertNotEqual(new_chat.id, chat.id)
 
 
 class ChatMessageModelTest(TestCase):
@@ -337,7 +359,10 @@ class ChatMessageSerializerTest(TestCase):
         
         self.assertIsNotNone(data['attachment'])
         self.assertEqual(data['attachment']['type'], 'AUDIO')
-        self.assertEqual(data['attachment']['data']['src'], 'http://127.0.0.1:8000/media/uploads/test.mp3')
+        # Anexos são servidos por URL assinada e de curta duração
+        src = data['attachment']['data']['src']
+        self.assertTrue(src.startswith('http://127.0.0.1:8000/media/uploads/test.mp3?expires='))
+        self.assertIn('&signature=', src)
 
 
 class ChatsViewTest(APITestCase):
@@ -455,6 +480,17 @@ class ChatsViewTest(APITestCase):
         # Deve retornar o chat existente
         self.assertIn('id', response.data)
     
+    def test_create_chat_after_delete(self):
+        """Testa que um chat deletado não impede criar outro com o mesmo usuário."""
+        chat = Chat.objects.create(from_user=self.user2, to_user=self.user1)
+        self.client.delete(reverse('chat-detail', kwargs={'pk': chat.id}))
+        
+        response = self.client.post(self.url, {'email': self.user2.email})
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(response.data['id'], chat.id)
+        self.assertEqual(Chat.objects.filter(deleted_at__isnull=True).count(), 1)
+    
     def test_unauthorized_access(self):
         """Testa acesso não autorizado."""
         self.client.credentials()  # Remove autenticação
@@ -539,4 +575,354 @@ class ChatDetailViewTest(APITestCase):
         
         response = self.client.delete(url)
         
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ChatsPaginationTest(APITestCase):
+    """Testes para a paginação por atividade da listagem de chats."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('chats')
+        self.user = User.objects.create(name='Owner', email='owner@example.com')
+        
+        base = timezone.now()
+        self.chats = []
+        for index in range(5):
+            other = User.objects.create(name=f'Other {index}', email=f'other{index}@example.com')
+            # Alterna os lados da conversa para cobrir os dois índices
+            if index % 2:
+                chat = Chat.objects.create(from_user=other, to_user=self.user)
+            else:
+                chat = Chat.objects.create(from_user=self.user, to_user=other)
+            Chat.objects.filter(id=chat.id).update(last_message_at=base - timedelta(minutes=index))
+            self.chats.append(chat)
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    
+    def test_first_page_ordered_by_activity(self):
+        """Testa que a primeira página traz os chats mais recentes."""
+        response = self.client.get(self.url, {'limit': 2})
+        data = response.data['data']
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([chat['id'] for chat in data['data']], [self.chats[0].id, self.chats[1].id])
+        self.assertEqual(data['total'], 5)
+        self.assertTrue(data['has_next'])
+        # Chaves antigas mantidas para o frontend
+        self.assertEqual((data['page'], data['pages']), (1, 1))
+    
+    def test_malformed_cursor(self):
+        """Testa que cursores com valores inválidos retornam 400."""
+        from core.utils.pagination import CursorPagination
+        
+        now = timezone.now().isoformat()
+        for values in ([now, 'abc'], [now, None], [now, True], ['2024-13-45T10:00:00', 1], ['ontem', 1]):
+            with self.subTest(values=values):
+                response = self.client.get(self.url, {'cursor': CursorPagination.encode(values)})
+                
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_normalized_shape(self):
+        """Testa que ``shape=normalized`` traz o dict de usuários na página."""
+        response = self.client.get(self.url, {'limit': 2, 'shape': 'normalized'})
+        data = response.data['data']
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {chat['user_id'] for chat in data['data']},
+            {self.chats[0].to_user_id, self.chats[1].from_user_id}
+        )
+        self.assertEqual(set(data['users']), {chat['user_id'] for chat in data['data']})
+        self.assertNotIn('users', self.client.get(self.url, {'limit': 2}).data['data'])
+    
+    def test_cursor_walks_all_chats(self):
+        """Testa que o cursor percorre todos os chats sem repetição."""
+        ids = []
+        params = {'limit': 2}
+        
+        while True:
+            data = self.client.get(self.url, params).data['data']
+            ids += [chat['id'] for chat in data['data']]
+            if not data['has_next']:
+                break
+            params['cursor'] = data['next_cursor']
+        
+        self.assertEqual(ids, [chat.id for chat in self.chats])
+    
+    def test_new_message_moves_chat_to_top(self):
+        """Testa que enviar mensagem atualiza a atividade do chat."""
+        last_chat = self.chats[-1]
+        url = reverse('chat-messages', kwargs={'chat_id': last_chat.id})
+        
+        self.client.post(url, {'body': 'Olá'})
+        response = self.client.get(self.url, {'limit': 1})
+        
+        self.assertEqual(response.data['data']['data'][0]['id'], last_chat.id)
+    
+    def test_count_invalidated_on_delete(self):
+        """Testa que a contagem em cache é invalidada ao deletar um chat."""
+        self.client.get(self.url)
+        self.client.delete(reverse('chat-detail', kwargs={'pk': self.chats[0].id}))
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.data['data']['total'], 4)
+
+    
+    def test_chats_not_modified(self):
+        """Testa 304 na listagem de chats quando nada mudou."""
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_chats_etag_changes_on_message(self):
+        """Testa que uma nova mensagem invalida a ETag da listagem de chats."""
+        etag = self.client.get(self.url)['ETag']
+        
+        ChatMessage.objects.create(chat=self.chats[2], from_user=self.user, body='Olá')
+        Chat.bump_version(self.chats[2].id)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_chats_etag_changes_with_participant_profile(self):
+        """Testa que mudar o perfil de um participante invalida a ETag."""
+        etag = self.client.get(self.url)['ETag']
+        
+        User.objects.filter(id=self.chats[0].to_user_id).update(name='Novo Nome')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['data'][0]['user']['name'], 'Novo Nome')
+    
+    def test_chats_not_modified_reuses_page_queries(self):
+        """Testa que o 304 só consulta a página (contagem em cache, sem agregados)."""
+        import tempfile
+        from django.test import override_settings
+        
+        # Cache compartilhado: o usuário autenticado vem do snapshot
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp()
+        }}
+        with override_settings(CACHES=shared):
+            etag = self.client.get(self.url)['ETag']
+            
+            # Uma consulta por lado da conversa
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_chats_etag_changes_with_signing_window(self):
+        """Testa que a ETag muda quando as URLs assinadas de mídia mudam."""
+        boundary = 1000 * settings.MEDIA_SIGNED_URL_TTL
+        
+        with patch('core.utils.media.time') as clock:
+            clock.time.return_value = boundary - 1
+            etag = self.client.get(self.url)['ETag']
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+            
+            clock.time.return_value = boundary
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AsyncChatsViewsTest(APITestCase):
+    """Testes de paridade entre as views síncronas e assíncronas de chats."""
+    
+    def setUp(self):
+        cache.clear()
+        # Os IDs dos chats são reaproveitados entre os testes
+        from chats.utils.membership import ChatMembership
+        ChatMembership.clear_local()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(name='Owner', email='owner@example.com')
+        self.other = User.objects.create(name='Other', email='other@example.com')
+        self.chat = Chat.objects.create(from_user=self.user, to_user=self.other)
+        
+        file_attachment = FileAttachment.objects.create(
+            name='doc', extension='pdf', size=1024, src='/media/files/doc.pdf', content_type='application/pdf'
+        )
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user, body='Olá')
+        self.message = ChatMessage.objects.create(
+            chat=self.chat, from_user=self.other, body='Segue', attachment_code='FILE', attachment_id=file_attachment.id
+        )
+    
+    def call(self, view_class, path='/', **kwargs):
+        """Executa a view (síncrona ou assíncrona) e retorna a resposta renderizada."""
+        request = self.factory.get(path)
+        force_authenticate(request, user=self.user)
+        response = view_class.as_view()(request, **kwargs)
+        
+        if asyncio.iscoroutine(response):
+            async def wait():
+                return await response
+            response = async_to_sync(wait)()
+        
+        return response
+    
+    def test_chats_list_parity(self):
+        """Testa que a listagem assíncrona de chats é igual à síncrona."""
+        sync_response = self.call(ChatsView)
+        async_response = self.call(AsyncChatsView)
+        
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.data, sync_response.data)
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+        self.assertEqual(async_response.data['data']['data'][0]['unseen_count'], 1)
+    
+    def test_chat_detail_parity(self):
+        """Testa que o detalhe assíncrono do chat é igual ao síncrono."""
+        sync_response = self.call(ChatView, pk=self.chat.id)
+        async_response = self.call(AsyncChatView, pk=self.chat.id)
+        
+        self.assertEqual(async_response.data, sync_response.data)
+        self.assertEqual(async_response.data['last_message']['attachment']['type'], 'FILE')
+    
+    def test_messages_parity(self):
+        """Testa que a listagem assíncrona de mensagens é igual à síncrona."""
+        async_response = self.call(AsyncChatMessagesView, chat_id=self.chat.id)
+        sync_response = self.call(ChatMessagesView, chat_id=self.chat.id)
+        
+        self.assertEqual(async_response.data, sync_response.data)
+        self.assertIsNotNone(ChatMessage.objects.get(id=self.message.id).viewed_at)
+    
+    def test_message_detail_parity(self):
+        """Testa que o detalhe assíncrono da mensagem é igual ao síncrono."""
+        kwargs = {'chat_id': self.chat.id, 'message_id': self.message.id}
+        
+        sync_response = self.call(ChatMessageView, **kwargs)
+        async_response = self.call(AsyncChatMessageView, **kwargs)
+        
+        self.assertEqual(async_response.data, sync_response.data)
+    
+    def test_chat_of_other_user_not_found(self):
+        """Testa que chats de outros usuários retornam 404 na view assíncrona."""
+        stranger = User.objects.create(name='Stranger', email='stranger@example.com')
+        chat = Chat.objects.create(from_user=self.other, to_user=stranger)
+        
+        self.assertEqual(self.call(AsyncChatView, pk=chat.id).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.call(AsyncChatMessagesView, chat_id=chat.id).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RowSerializersParityTest(TestCase):
+    """Testes de paridade entre os serializers rápidos (linhas) e os do DRF."""
+    
+    def setUp(self):
+        self.user = User.objects.create(name='Maria Silva', email='maria@example.com')
+        self.other = User.objects.create(
+            name='joão', email='joao@example.com', avatar='/media/avatars/ab/original.png',
+            avatar_variants={
+                '48': {'webp': '/media/avatars/48.webp', 'jpeg': '/media/avatars/48.jpg'},
+                '512': {'webp': '/media/avatars/512.webp', 'jpeg': '/media/avatars/512.jpg'},
+            }
+        )
+        self.legacy = User.objects.create(name='', email='legacy@example.com', avatar='/media/avatars/legacy.png')
+        
+        self.chat = Chat.objects.create(from_user=self.user, to_user=self.other)
+        self.legacy_chat = Chat.objects.create(from_user=self.legacy, to_user=self.user, viewed_at=timezone.now())
+        Chat.objects.create(from_user=self.other, to_user=self.legacy)
+        
+        file_attachment = FileAttachment.objects.create(
+            name='foto', extension='jpg', size=1536, src='/media/attachments/files/foto.jpg',
+            content_type='image/jpeg', width=800, height=600, thumbnail='/media/attachments/thumbnails/t.webp',
+            placeholder='data:image/jpeg;base64,AAAA'
+        )
+        audio_attachment = AudioAttachment.objects.create(
+            src='/media/attachments/audios/voz.ogg', duration=2.5, sample_rate=48000, peaks=[1, 50, 100]
+        )
+        
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user, body='Olá')
+        edited = ChatMessage.objects.create(chat=self.chat, from_user=self.other, body='Editada')
+        ChatMessage.objects.filter(id=edited.id).update(updated_at=edited.created_at + timedelta(seconds=30))
+        ChatMessage.objects.create(
+            chat=self.chat, from_user=self.other, attachment_code='FILE', attachment_id=file_attachment.id,
+            viewed_at=timezone.now()
+        )
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user, attachment_code='AUDIO', attachment_id=audio_attachment.id)
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user, attachment_code='FILE', attachment_id=999999)
+        ChatMessage.objects.create(chat=self.legacy_chat, from_user=self.legacy, body='Oi')
+        
+        self.request = APIRequestFactory().get('/')
+        self.request.user = self.user
+    
+    def render(self, data):
+        """Renderiza como na resposta: as linhas trazem datetime, os serializers texto."""
+        from core.utils.renderers import ORJSONRenderer
+        
+        return ORJSONRenderer().render(data)
+    
+    def test_messages_parity(self):
+        """Testa mensagens com edição, anexos, anexo inexistente e remetentes variados."""
+        from chats.utils.rows import MessageRows
+        
+        messages = ChatMessage.objects.filter(chat=self.chat).select_related('from_user').order_by('created_at')
+        
+        expected = ChatMessageSerializer(messages, many=True, context={'request': self.request}).data
+        
+        self.assertEqual(self.render(MessageRows.serialize(messages, self.request)), self.render(expected))
+        self.assertTrue(expected[1]['isEdited'])
+        self.assertEqual(expected[2]['attachment']['data']['size'], '1.5 KB')
+    
+    def test_chats_parity(self):
+        """Testa chats com contagem de não vistas, última mensagem e os dois lados."""
+        from chats.utils.rows import ChatRows
+        
+        chats = list(Chat.objects.filter(id__in=[self.chat.id, self.legacy_chat.id]).select_related('from_user', 'to_user'))
+        
+        expected = ChatSerializer(chats, many=True, context={'request': self.request}).data
+        
+        self.assertEqual(self.render(ChatRows.serialize(chats, self.request)), self.render(expected))
+    
+    def test_messages_normalized(self):
+        """Testa o formato normalizado: remetente por ID e dict de usuários."""
+        from chats.utils.rows import MessageRows
+        
+        messages = ChatMessage.objects.filter(chat=self.chat).select_related('from_user').order_by('created_at')
+        nested = MessageRows.serialize(messages, self.request)
+        
+        users = {}
+        normalized = MessageRows.serialize(messages, self.request, users)
+        
+        self.assertEqual(set(users), {self.user.id, self.other.id})
+        for message, expected in zip(normalized, nested):
+            from_user = expected.pop('from_user')
+            self.assertEqual(users[message.pop('from_user_id')], from_user)
+            self.assertEqual(message, expected)
+    
+    def test_chats_normalized(self):
+        """Testa chats normalizados: participantes e remetentes no mesmo dict."""
+        from chats.utils.rows import ChatRows
+        
+        chats = list(Chat.objects.filter(id__in=[self.chat.id, self.legacy_chat.id]).select_related('from_user', 'to_user'))
+        
+        users = {}
+        data = ChatRows.serialize(chats, self.request, users)
+        
+        self.assertEqual(set(users), {self.user.id, self.other.id, self.legacy.id})
+        by_id = {chat['id']: chat for chat in data}
+        self.assertEqual(by_id[self.chat.id]['user_id'], self.other.id)
+        self.assertNotIn('user', by_id[self.chat.id])
+        self.assertEqual(by_id[self.legacy_chat.id]['last_message']['from_user_id'], self.legacy.id)
+        self.assertEqual(users[self.other.id]['email'], 'joao@example.com')
+    
+    def test_users_parity(self):
+        """Testa usuários com avatar padrão, variantes e avatar legado."""
+        from accounts.serializers import UserSerializer
+        from accounts.utils.rows import UserRows
+        
+        for user in User.objects.order_by('id'):
+            for size in (None, 48, 128):
+                context = {'request': self.request, 'avatar_size': size}
+                with self.subTest(user=user.email, size=size):
+                    self.assertEqual(
+                        self.render(UserRows.represent(UserRows.row(user), self.request, size)),
+                        self.render(UserSerializer(user, context=context).data)
+                    )
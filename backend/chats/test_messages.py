@@ -9,6 +9,7 @@ from unittest.mock import patch, MagicMock
 
 from accounts.models import User
 from chats.models import Chat, ChatMessage
+from core.utils.pagination import CursorPagination
 from attachments.models import FileAttachment, AudioAttachment
 
 
@@ -672,4 +673,646 @@ class SocketIntegrationTest(APITestCase):
         mock_socket.emit_to_chat.assert_called_once()
         call_args = mock_socket.emit_to_chat.call_args
         
-        self.assertEqual(call_args[0][1], 'message_read')  # event
\ No newline at end of file
+        self.assertEqual(call_args[0][1], 'message_read')  # event
+
+
+class ConditionalMessagesTest(APITestCase):
+    """Testes para GET condicional (ETag) da listagem de mensagens."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        self.url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        
+        refresh = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    
+    def test_not_modified(self):
+        """Testa 304 quando nada mudou no chat."""
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user1, body='Olá')
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_new_message_changes_etag(self):
+        """Testa que uma nova mensagem invalida a ETag."""
+        etag = self.client.get(self.url)['ETag']
+        
+        self.client.post(self.url, {'body': 'Nova mensagem'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+    
+    def test_etag_describes_marked_messages(self):
+        """Testa que a ETag é calculada depois de marcar as mensagens como recebidas."""
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body='Oi')
+        response = self.client.get(self.url)
+        
+        self.assertIsNotNone(response.data['data'][0]['viewed_at'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_read_receipt_changes_etag(self):
+        """Testa que o outro participante marcar mensagens como recebidas invalida a ETag."""
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user1, body='Oi')
+        etag = self.client.get(self.url)['ETag']
+        
+        other = APIClient()
+        other.force_authenticate(user=self.user2)
+        other.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['data'][0]['viewed_at'])
+    
+    def test_etag_changes_with_signing_window(self):
+        """Testa que a ETag muda quando as URLs assinadas dos anexos mudam."""
+        from django.conf import settings
+        
+        boundary = 1000 * settings.MEDIA_SIGNED_URL_TTL
+        
+        with patch('core.utils.media.time') as clock:
+            clock.time.return_value = boundary - 1
+            etag = self.client.get(self.url)['ETag']
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+            
+            clock.time.return_value = boundary
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ChatSyncViewTest(APITestCase):
+    """Testes para a sincronização incremental de chats."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('chats-sync')
+        
+        # Os IDs dos chats são reaproveitados entre os testes
+        from chats.utils.membership import ChatMembership
+        ChatMembership.clear_local()
+        
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.user3 = User.objects.create(name='User Three', email='user3@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        self.messages_url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        
+        refresh = RefreshToken.for_user(self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    
+    def sync(self, cursor=None):
+        data = {'cursor': cursor} if cursor else {}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+    
+    def test_bootstrap_returns_only_cursor(self):
+        """Testa que a primeira sincronização devolve só o cursor."""
+        ChatMessage.objects.create(chat=self.chat, from_user=self.user1, body='Antiga')
+        
+        data = self.sync()
+        
+        self.assertEqual(data['messages'], [])
+        self.assertTrue(data['cursor'])
+    
+    def test_nothing_changed(self):
+        """Testa sincronização sem alterações."""
+        cursor = self.sync()['cursor']
+        
+        data = self.sync(cursor)
+        
+        self.assertEqual(data['chats'], [])
+        self.assertEqual(data['messages'], [])
+        self.assertEqual(data['cursor'], cursor)
+    
+    def test_created_edited_and_deleted_messages(self):
+        """Testa que criação, edição e exclusão aparecem na sincronização."""
+        kept = self.client.post(self.messages_url, {'body': 'Primeira'}).data
+        removed = self.client.post(self.messages_url, {'body': 'Segunda'}).data
+        cursor = self.sync()['cursor']
+        
+        created = self.client.post(self.messages_url, {'body': 'Terceira'}).data
+        self.client.put(
+            reverse('chat-message', kwargs={'chat_id': self.chat.id, 'message_id': kept['id']}),
+            {'body': 'Primeira editada'}
+        )
+        self.client.delete(
+            reverse('chat-message', kwargs={'chat_id': self.chat.id, 'message_id': removed['id']})
+        )
+        
+        data = self.sync(cursor)
+        
+        self.assertEqual(
+            sorted(message['id'] for message in data['messages']),
+            sorted([kept['id'], created['id']])
+        )
+        self.assertEqual(data['deleted_messages'], [{'id': removed['id'], 'chat_id': self.chat.id}])
+        self.assertEqual([chat['id'] for chat in data['chats']], [self.chat.id])
+    
+    def test_read_state_change(self):
+        """Testa que a confirmação de leitura aparece na sincronização."""
+        message = ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body='Oi')
+        cursor = self.sync()['cursor']
+        
+        self.client.get(self.messages_url)
+        data = self.sync(cursor)
+        
+        self.assertEqual(data['messages'][0]['id'], message.id)
+        self.assertIsNotNone(data['messages'][0]['viewed_at'])
+    
+    def test_new_and_deleted_chats(self):
+        """Testa chats criados e removidos desde o cursor."""
+        cursor = self.sync()['cursor']
+        
+        new_chat = self.client.post(reverse('chats'), {'email': self.user3.email}).data
+        self.client.delete(reverse('chat-detail', kwargs={'pk': self.chat.id}))
+        data = self.sync(cursor)
+        
+        self.assertEqual([chat['id'] for chat in data['chats']], [new_chat['id']])
+        self.assertEqual(data['deleted_chats'], [self.chat.id])
+    
+    def test_cost_independent_of_chat_count(self):
+        """Testa que a sincronização não lê chats sem alterações nem consulta mensagens por chat."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        for index in range(5):
+            other = User.objects.create(name=f'Other {index}', email=f'other{index}@example.com')
+            chat = Chat.objects.create(from_user=self.user1, to_user=other)
+            ChatMessage.objects.create(chat=chat, from_user=other, body='Antiga')
+        
+        def sync_queries(chat_ids):
+            cursor = self.sync()['cursor']
+            for chat_id in chat_ids:
+                url = reverse('chat-messages', kwargs={'chat_id': chat_id})
+                self.client.post(url, {'body': 'Nova'})
+            with CaptureQueriesContext(connection) as queries:
+                data = self.sync(cursor)
+            self.assertEqual(sorted(chat['id'] for chat in data['chats']), sorted(chat_ids))
+            self.assertEqual(len(data['messages']), len(chat_ids))
+            return len(queries)
+        
+        chat_ids = list(Chat.objects.filter(from_user=self.user1).values_list('id', flat=True))
+        self.assertEqual(sync_queries(chat_ids[:1]), sync_queries(chat_ids[:4]))
+        
+        # Nada mudou: só a sequência do usuário é lida
+        cursor = self.sync()['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            self.sync(cursor)
+        self.assertFalse(any('chats' in query['sql'] for query in queries.captured_queries))
+    
+    def test_user_save_keeps_sequence(self):
+        """Testa que salvar o usuário não devolve a sequência a um valor antigo."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        stale = User.objects.get(id=self.user1.id)
+        self.client.post(self.messages_url, {'body': 'Primeira'})
+        self.client.post(self.messages_url, {'body': 'Segunda'})
+        cursor = self.sync()['cursor']
+        
+        # Instância carregada antes das alterações (ex: UserView.put, avatar)
+        stale.name = 'Renomeado'
+        stale.save()
+        
+        # Novas mensagens não travam nem gravam as linhas dos usuários
+        with CaptureQueriesContext(connection) as queries:
+            created = self.client.post(self.messages_url, {'body': 'Terceira'}).data
+        self.assertFalse(any(
+            query['sql'].lstrip().upper().startswith('UPDATE') and '"users"' in query['sql']
+            for query in queries.captured_queries
+        ))
+        
+        data = self.sync(cursor)
+        self.assertEqual([message['id'] for message in data['messages']], [created['id']])
+    
+    def test_invalid_cursor(self):
+        """Testa cursor inválido."""
+        for cursor in ('xyz', CursorPagination.encode([1, 2]), CursorPagination.encode(['1'])):
+            response = self.client.post(self.url, {'cursor': cursor}, format='json')
+            
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ORJSONRendererTest(APITestCase):
+    """Testes para o renderer orjson e o modo compacto."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        self.message = ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body='Olá, ção')
+        self.url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        self.client.force_authenticate(user=self.user1)
+    
+    def test_same_output_as_drf_renderer(self):
+        """Testa que a saída é idêntica à do JSONRenderer do DRF, inclusive tipos nativos."""
+        import uuid
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from core.utils.renderers import ORJSONRenderer
+        
+        data = {
+            'when': timezone.now(),
+            'id': uuid.uuid4(),
+            'price': Decimal('1.50'),
+            'text': 'ação',
+            1: [None, True, 2.5],
+        }
+        
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+    
+    def test_compact_mode(self):
+        """Testa o modo compacto: sem nulls e datas em epoch (ms)."""
+        import json
+        
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json; compact=1')
+        
+        message = json.loads(response.content)['data'][0]
+        self.assertNotIn('attachment', message)
+        self.assertEqual(message['created_at'], int(self.message.created_at.timestamp() * 1000))
+        self.assertIsInstance(message['from_user']['last_access'], int)
+        self.assertEqual(message['body'], 'Olá, ção')
+        self.assertIn('Accept', response['Vary'])
+    
+    def test_compact_rows_carry_datetimes(self):
+        """Testa que as linhas chegam ao modo compacto com datetime, sem parse de texto."""
+        from datetime import datetime
+        from rest_framework.test import APIRequestFactory
+        from chats.utils.rows import MessageRows
+        from core.utils.renderers import ORJSONRenderer
+        
+        request = APIRequestFactory().get('/')
+        request.user = self.user1
+        message, = MessageRows.serialize(ChatMessage.objects.filter(id=self.message.id), request)
+        self.assertIsInstance(message['created_at'], datetime)
+        
+        with patch.object(ORJSONRenderer, 'TIMESTAMP_KEY_PATTERN') as pattern:
+            compact = ORJSONRenderer.compact(message)
+        
+        # O padrão só é consultado para textos; as datas já vêm em datetime
+        searched = {call.args[0] for call in pattern.search.call_args_list}
+        self.assertFalse(searched & {'created_at', 'last_access'})
+        self.assertEqual(compact['created_at'], int(self.message.created_at.timestamp() * 1000))
+    
+    def test_etag_varies_by_compact_mode(self):
+        """Testa que o modo compacto tem ETag própria e que o 304 mantém o Vary."""
+        compact = 'application/json; compact=1'
+        
+        standard_etag = self.client.get(self.url)['ETag']
+        compact_etag = self.client.get(self.url, HTTP_ACCEPT=compact)['ETag']
+        self.assertNotEqual(standard_etag, compact_etag)
+        
+        response = self.client.get(self.url, HTTP_ACCEPT=compact, HTTP_IF_NONE_MATCH=standard_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        response = self.client.get(self.url, HTTP_ACCEPT=compact, HTTP_IF_NONE_MATCH=compact_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('Accept', response['Vary'])
+
+
+class CompressionMiddlewareTest(APITestCase):
+    """Testes para a compressão das respostas da API."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        for index in range(30):
+            ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body=f'Mensagem {index}')
+        self.url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        self.client.force_authenticate(user=self.user1)
+    
+    def test_gzip_when_accepted(self):
+        """Testa que a listagem é comprimida com gzip e o corpo descomprimido é o original."""
+        import json
+        import zlib
+        
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(zlib.decompress(response.content, 31)), json.loads(plain.content))
+    
+    @override_settings(COMPRESSION_MIN_SIZE=1024 * 1024)
+    def test_below_threshold_not_compressed(self):
+        """Testa que respostas menores que o limite não são comprimidas."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    @override_settings(COMPRESSION_ROUTES=['chat-messages:0'])
+    def test_route_level_zero_disables(self):
+        """Testa que nível 0 na rota desliga a compressão."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_streaming_and_media_types(self):
+        """Testa stream comprimido por pedaço e mídia já comprimida intacta."""
+        import zlib
+        from django.http import HttpResponse, StreamingHttpResponse
+        from django.test import RequestFactory
+        from core.middleware import CompressionMiddleware
+        
+        request = RequestFactory().get('/api/v1/export/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'{"linha": %d}\n' % index for index in range(100)]
+        
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(iter(chunks), content_type='application/json'))
+        response = middleware(request)
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(b''.join(response.streaming_content), 31), b''.join(chunks))
+        
+        image = HttpResponse(b'\x89PNG' * 1000, content_type='image/png')
+        self.assertIs(CompressionMiddleware(lambda request: image)(request), image)
+        self.assertFalse(image.has_header('Content-Encoding'))
+    
+    def test_negotiate(self):
+        """Testa a escolha da codificação pelo Accept-Encoding."""
+        from core.middleware import CompressionMiddleware
+        
+        self.assertEqual(CompressionMiddleware.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(CompressionMiddleware.negotiate('*'), CompressionMiddleware.ENCODINGS[0])
+        self.assertIsNone(CompressionMiddleware.negotiate('identity'))
+        self.assertIsNone(CompressionMiddleware.negotiate('gzip;q=0, br;q=0'))
+        self.assertIsNone(CompressionMiddleware.negotiate(''))
+
+
+class MessageArchiveTest(APITestCase):
+    """Testes para o arquivamento de mensagens antigas e a paginação no arquivo."""
+    
+    def setUp(self):
+        from datetime import timedelta
+        
+        self.client = APIClient()
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        self.url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        self.client.force_authenticate(user=self.user1)
+        
+        old = timezone.now() - timedelta(days=400)
+        self.old_messages = []
+        for index in range(4):
+            message = ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body=f'Antiga {index} ' + 'texto ' * 20)
+            ChatMessage.objects.filter(id=message.id).update(created_at=old + timedelta(minutes=index))
+            self.old_messages.append(message.id)
+        
+        deleted = ChatMessage.objects.create(chat=self.chat, from_user=self.user2, body='Deletada', deleted_at=timezone.now())
+        ChatMessage.objects.filter(id=deleted.id).update(created_at=old)
+        
+        self.recent_messages = [
+            ChatMessage.objects.create(chat=self.chat, from_user=self.user1, body=f'Recente {index}').id
+            for index in range(2)
+        ]
+    
+    def archive(self):
+        from django.core.management import call_command
+        from io import StringIO
+        
+        call_command('archive_messages', days=180, batch_size=3, sleep=0, stdout=StringIO())
+    
+    def test_archive_moves_old_messages(self):
+        """Testa que só mensagens antigas e não deletadas vão para o arquivo."""
+        from chats.models import ArchivedChatMessage
+        
+        version = self.chat.version
+        self.archive()
+        
+        self.assertEqual(
+            sorted(ArchivedChatMessage.objects.values_list('id', flat=True)), self.old_messages
+        )
+        self.assertEqual(ChatMessage.objects.filter(chat=self.chat).count(), 3)
+        self.assertTrue(ArchivedChatMessage.objects.get(id=self.old_messages[0]).body.startswith('Antiga 0'))
+        
+        # Um lote de 3 e outro de 1: cada lote gera uma nova versão do chat
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.version, version + 2)
+    
+    @override_settings(CHAT_ARCHIVE_COMPRESSION=6)
+    def test_archived_body_compressed(self):
+        """Testa que o corpo arquivado é gravado comprimido."""
+        from django.db import connection
+        
+        self.archive()
+        
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT body FROM chat_messages_archive WHERE id = %s', [self.old_messages[0]])
+            raw = bytes(cursor.fetchone()[0])
+        
+        self.assertEqual(raw[:1], b'z')
+        self.assertLess(len(raw), len(('Antiga 0 ' + 'texto ' * 20).encode()))
+    
+    def test_pagination_continues_into_archive(self):
+        """Testa que a listagem continua para trás no arquivo pelo cursor."""
+        self.archive()
+        
+        response = self.client.get(self.url)
+        self.assertEqual([message['id'] for message in response.data['data']], self.recent_messages)
+        self.assertTrue(response.data['has_next'])
+        
+        response = self.client.get(self.url, {'before': response.data['next_cursor'], 'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([message['id'] for message in response.data['data']], self.old_messages[1:])
+        self.assertTrue(response.data['data'][0]['body'].startswith('Antiga 1'))
+        self.assertTrue(response.data['has_next'])
+        
+        response = self.client.get(self.url, {'before': response.data['next_cursor'], 'limit': 3})
+        self.assertEqual([message['id'] for message in response.data['data']], self.old_messages[:1])
+        self.assertFalse(response.data['has_next'])
+    
+    def test_no_archive_no_cursor(self):
+        """Testa que sem mensagens arquivadas a listagem não traz cursor."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(len(response.data['data']), 6)
+        self.assertIsNone(response.data['next_cursor'])
+        
+        response = self.client.get(self.url, {'before': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PurgeDeletedTest(TestCase):
+    """Testes para a remoção definitiva de chats e mensagens deletados."""
+    
+    def setUp(self):
+        from datetime import timedelta
+        from chats.models import ArchivedChatMessage
+        
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        old = timezone.now() - timedelta(days=60)
+        
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        self.orphan = FileAttachment.objects.create(name='a', extension='txt', size=1, src='/media/a.txt', content_type='text/plain')
+        self.shared = FileAttachment.objects.create(name='b', extension='txt', size=1, src='/media/b.txt', content_type='text/plain')
+        
+        self.old_deleted = ChatMessage.objects.create(
+            chat=self.chat, from_user=self.user1, attachment_code='FILE', attachment_id=self.orphan.id, deleted_at=old
+        )
+        self.shared_deleted = ChatMessage.objects.create(
+            chat=self.chat, from_user=self.user1, attachment_code='FILE', attachment_id=self.shared.id, deleted_at=old
+        )
+        self.shared_kept = ChatMessage.objects.create(
+            chat=self.chat, from_user=self.user2, attachment_code='FILE', attachment_id=self.shared.id
+        )
+        self.recent_deleted = ChatMessage.objects.create(chat=self.chat, from_user=self.user1, body='x', deleted_at=timezone.now())
+        
+        self.deleted_chat = Chat.objects.create(from_user=self.user1, to_user=self.user2, deleted_at=old)
+        self.audio = AudioAttachment.objects.create(src='/media/voz.ogg')
+        ChatMessage.objects.create(chat=self.deleted_chat, from_user=self.user1, body='Olá')
+        ArchivedChatMessage.objects.create(
+            id=999, chat=self.deleted_chat, from_user=self.user2, attachment_code='AUDIO', attachment_id=self.audio.id,
+            created_at=old, updated_at=old
+        )
+        
+        self.recent_chat = Chat.objects.create(from_user=self.user2, to_user=self.user1, deleted_at=timezone.now())
+    
+    def test_purge(self):
+        """Testa a remoção por idade, em cascata manual e dos anexos órfãos."""
+        from io import StringIO
+        from django.core.management import call_command
+        from chats.models import ArchivedChatMessage
+        
+        out = StringIO()
+        call_command('purge_deleted', days=30, batch_size=2, sleep=0, stdout=out)
+        
+        self.assertEqual(
+            set(ChatMessage.objects.values_list('id', flat=True)), {self.shared_kept.id, self.recent_deleted.id}
+        )
+        self.assertEqual(set(Chat.objects.values_list('id', flat=True)), {self.chat.id, self.recent_chat.id})
+        self.assertFalse(ArchivedChatMessage.objects.exists())
+        
+        # Só o anexo que ninguém mais usa é removido
+        self.assertFalse(FileAttachment.objects.filter(id=self.orphan.id).exists())
+        self.assertTrue(FileAttachment.objects.filter(id=self.shared.id).exists())
+        self.assertFalse(AudioAttachment.objects.filter(id=self.audio.id).exists())
+        
+        self.assertIn('mensagens: 3 removidos', out.getvalue())
+        self.assertIn('chats: 1 removidos', out.getvalue())
+
+
+class ChatMembershipTest(APITestCase):
+    """Testes para o cache de participantes dos chats."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from chats.utils.membership import ChatMembership
+        
+        cache.clear()
+        ChatMembership.clear_local()
+        
+        self.user1 = User.objects.create(name='User One', email='user1@example.com')
+        self.user2 = User.objects.create(name='User Two', email='user2@example.com')
+        self.user3 = User.objects.create(name='User Three', email='user3@example.com')
+        self.chat = Chat.objects.create(from_user=self.user1, to_user=self.user2)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+    
+    def tearDown(self):
+        from chats.utils.membership import ChatMembership
+        
+        # Os IDs dos chats são reaproveitados entre os testes
+        ChatMembership.clear_local()
+    
+    def test_cached_lookup(self):
+        """Testa que só a primeira verificação consulta o banco."""
+        from chats.utils.membership import ChatMembership
+        
+        with self.assertNumQueries(1):
+            self.assertTrue(ChatMembership.is_member(self.chat.id, self.user1.id))
+        with self.assertNumQueries(0):
+            self.assertTrue(ChatMembership.is_member(str(self.chat.id), self.user2.id))
+            self.assertFalse(ChatMembership.is_member(self.chat.id, self.user3.id))
+        
+        # Com o cache em memória do processo não há segundo nível
+        ChatMembership.clear_local()
+        with self.assertNumQueries(1):
+            self.assertTrue(ChatMembership.is_member(self.chat.id, self.user2.id))
+        
+        self.assertFalse(ChatMembership.is_member(999999, self.user1.id))
+        self.assertFalse(ChatMembership.is_member('abc', self.user1.id))
+    
+    def test_shared_cache(self):
+        """Testa o segundo nível com um cache compartilhado entre processos."""
+        from chats.utils.membership import ChatMembership
+        
+        shared = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': tempfile.mkdtemp()
+            }
+        }
+        with override_settings(CACHES=shared):
+            ChatMembership.is_member(self.chat.id, self.user1.id)
+            
+            # Sem o LRU, o cache compartilhado evita a consulta
+            ChatMembership.clear_local()
+            with self.assertNumQueries(0):
+                self.assertTrue(ChatMembership.is_member(self.chat.id, self.user2.id))
+            
+            # invalidate() remove a entrada vista pelos outros processos
+            Chat.objects.filter(id=self.chat.id).update(deleted_at=timezone.now())
+            ChatMembership.invalidate(self.chat.id)
+            self.assertFalse(ChatMembership.is_member(self.chat.id, self.user1.id))
+    
+    def test_invalidate_with_process_local_cache(self):
+        """Testa que outro processo com o LRU frio não vê como ativo o chat deletado."""
+        from django.core.cache.backends.locmem import LocMemCache
+        from chats.utils.membership import ChatMembership
+        
+        # Este processo já consultou o chat
+        self.assertTrue(ChatMembership.is_member(self.chat.id, self.user1.id))
+        
+        # Outro processo, com o próprio LocMemCache, faz o soft delete
+        Chat.objects.filter(id=self.chat.id).update(deleted_at=timezone.now())
+        with patch('chats.utils.membership.cache', LocMemCache('other-process', {})):
+            ChatMembership.invalidate(self.chat.id)
+        
+        # Com a entrada do LRU expirada, o chat volta a ser lido do banco
+        ChatMembership.clear_local()
+        self.assertFalse(ChatMembership.is_member(self.chat.id, self.user1.id))
+    
+    @override_settings(CHAT_MEMBERSHIP_CACHE_SIZE=1, CHAT_MEMBERSHIP_SHARED_CACHE=False)
+    def test_lru_eviction(self):
+        """Testa que o LRU mantém só as entradas mais recentes."""
+        from chats.utils.membership import ChatMembership
+        
+        other = Chat.objects.create(from_user=self.user3, to_user=self.user1)
+        ChatMembership.get(self.chat.id)
+        ChatMembership.get(other.id)
+        
+        self.assertEqual(list(ChatMembership.local), [other.id])
+        with self.assertNumQueries(1):
+            ChatMembership.get(self.chat.id)
+    
+    def test_delete_invalidates(self):
+        """Testa que o soft delete do chat invalida o cache."""
+        url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.client.delete(reverse('chat-detail', kwargs={'pk': self.chat.id}))
+        
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url, {'body': 'Olá'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,8 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from .views import ChatsView, ChatView, ChatMessagesView, ChatMessageView
+from .views import ChatsView, ChatView, ChatMessagesView, ChatMessageView, ChatSyncView
+from .views import AsyncChatsView, AsyncChatView, AsyncChatMessagesView, AsyncChatMessageView
+
+# Sob ASGI as versões assíncronas não ocupam uma thread por requisição
+if settings.CHATS_ASYNC_VIEWS:
+    ChatsView, ChatView = AsyncChatsView, AsyncChatView
+    ChatMessagesView, ChatMessageView = AsyncChatMessagesView, AsyncChatMessageView
 
 urlpatterns = [
     path('', ChatsView.as_view(), name='chats'),
+    path('sync/', ChatSyncView.as_view(), name='chats-sync'),
     path('<int:pk>/', ChatView.as_view(), name='chat-detail'),
     path('<int:chat_id>/messages/', ChatMessagesView.as_view(), name='chat-messages'),
     path('<int:chat_id>/messages/<int:message_id>/', ChatMessageView.as_view(), name='chat-message'),
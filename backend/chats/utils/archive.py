@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from core.utils.exceptions import ValidationError
+from core.utils.pagination import CursorPagination
+from ..models import ArchivedChatMessage, Chat, ChatMessage
+from .rows import MessageRows
+
+
+class MessageArchive:
+    """
+    Arquivamento de mensagens antigas em ``chat_messages_archive``.
+
+    O comando ``archive_messages`` move, chat a chat e em lotes limitados,
+    as mensagens não deletadas mais antigas que o corte. Cada lote é uma
+    transação curta (INSERT no arquivo, DELETE na tabela quente e nova
+    versão do chat, que invalida as ETags). A listagem de mensagens continua
+    a paginação para trás lendo as duas tabelas (``older_rows``).
+    """
+
+    # Campos copiados de ChatMessage (o ID é preservado)
+    FIELDS = ('id', 'body', 'attachment_code', 'attachment_id', 'viewed_at', 'created_at', 'updated_at', 'chat_id', 'from_user_id')
+
+    @staticmethod
+    def old_messages(cutoff):
+        """Retorna as mensagens não deletadas criadas antes do corte."""
+        return ChatMessage.objects.filter(created_at__lt=cutoff, deleted_at__isnull=True)
+
+    @staticmethod
+    def chat_ids(cutoff):
+        """Retorna os IDs dos chats com mensagens a arquivar."""
+        return MessageArchive.old_messages(cutoff).values_list('chat_id', flat=True).distinct().order_by('chat_id')
+
+    @staticmethod
+    def archive_batch(chat_id, cutoff, batch_size):
+        """
+        Move um lote de mensagens antigas de um chat para o arquivo.
+
+        Args:
+            chat_id: ID do chat
+            cutoff (datetime): Mensagens criadas antes deste momento são arquivadas
+            batch_size (int): Máximo de mensagens no lote
+
+        Returns:
+            int: Mensagens arquivadas (0 quando o chat não tem mais o que arquivar)
+        """
+        with transaction.atomic():
+            rows = list(
+                MessageArchive.old_messages(cutoff).filter(chat_id=chat_id)
+                .order_by('created_at', 'id')
+                .values(*MessageArchive.FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+
+            ArchivedChatMessage.objects.bulk_create([ArchivedChatMessage(**row) for row in rows])
+            ChatMessage.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            Chat.bump_version(chat_id)
+
+        return len(rows)
+
+    @staticmethod
+    def boundary_querysets(chat_id):
+        """Consultas da mensagem arquivada mais nova e da quente mais antiga do chat."""
+        newest_archived = ArchivedChatMessage.objects.filter(chat_id=chat_id).order_by('-created_at', '-id')
+        oldest_hot = ChatMessage.objects.filter(chat_id=chat_id, deleted_at__isnull=True).order_by('created_at', 'id')
+        return newest_archived.values_list('created_at', 'id'), oldest_hot.values_list('created_at', 'id')
+
+    @staticmethod
+    def boundary_cursor(newest_archived, oldest_hot):
+        """Cursor que continua a listagem da tabela quente no arquivo."""
+        if newest_archived is None:
+            return None
+        if oldest_hot is None:
+            # Chat só com mensagens arquivadas: a página inclui a mais nova
+            return MessageArchive.encode_cursor(newest_archived[0], newest_archived[1] + 1)
+        return MessageArchive.encode_cursor(*oldest_hot)
+
+    @staticmethod
+    def archive_cursor(chat_id):
+        """
+        Retorna o cursor da primeira página do arquivo ou None se não há arquivo.
+
+        Returns:
+            str | None: Valor de ``next_cursor`` da listagem padrão
+        """
+        newest_archived, oldest_hot = MessageArchive.boundary_querysets(chat_id)
+        newest_archived = newest_archived.first()
+        return MessageArchive.boundary_cursor(newest_archived, oldest_hot.first() if newest_archived else None)
+
+    @staticmethod
+    async def aarchive_cursor(chat_id):
+        """Versão assíncrona de ``archive_cursor``."""
+        newest_archived, oldest_hot = MessageArchive.boundary_querysets(chat_id)
+        newest_archived = await newest_archived.afirst()
+        return MessageArchive.boundary_cursor(newest_archived, await oldest_hot.afirst() if newest_archived else None)
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Converte o cursor ``before`` em ``(created_at, id)``.
+
+        Raises:
+            ValidationError: Se o cursor for inválido
+        """
+        created_at, message_id = CursorPagination.decode(cursor, 2)
+        created_at = parse_datetime(str(created_at))
+        if created_at is None or not isinstance(message_id, int):
+            raise ValidationError('Cursor de paginação inválido')
+        return created_at, message_id
+
+    @staticmethod
+    def encode_cursor(created_at, message_id):
+        """Cursor para buscar as mensagens anteriores a ``(created_at, id)``."""
+        return CursorPagination.encode([created_at.isoformat(), message_id])
+
+    @staticmethod
+    def older_querysets(chat_id, before, limit):
+        """
+        Monta as consultas (quente e arquivo) das mensagens anteriores ao cursor.
+
+        Cada uma lê no máximo ``limit + 1`` linhas pelo índice
+        (chat, created_at, id), da mais nova para a mais antiga.
+        """
+        created_at, message_id = before
+        older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+
+        hot = ChatMessage.objects.filter(older, chat_id=chat_id, deleted_at__isnull=True)
+        archived = ArchivedChatMessage.objects.filter(older, chat_id=chat_id)
+
+        return [
+            MessageRows.values(queryset.order_by('-created_at', '-id'))[:limit + 1]
+            for queryset in (hot, archived)
+        ]
+
+    @staticmethod
+    def merge(rows, limit):
+        """
+        Junta as linhas das duas tabelas e corta a página.
+
+        Returns:
+            tuple: (linhas em ordem cronológica, cursor da página anterior ou None)
+        """
+        # Posições 6 e 0 de MessageRows.FIELDS: created_at e id
+        rows = sorted(rows, key=lambda row: (row[6], row[0]), reverse=True)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = MessageArchive.encode_cursor(rows[-1][6], rows[-1][0])
+
+        rows.reverse()
+        return rows, next_cursor
+
+    @staticmethod
+    def older_rows(chat_id, before, limit):
+        """
+        Retorna a página de mensagens anteriores ao cursor, das duas tabelas.
+
+        Returns:
+            tuple: (linhas de ``MessageRows.values``, cursor da página anterior ou None)
+        """
+        rows = []
+        for queryset in MessageArchive.older_querysets(chat_id, before, limit):
+            rows += list(queryset)
+        return MessageArchive.merge(rows, limit)
+
+    @staticmethod
+    async def aolder_rows(chat_id, before, limit):
+        """Versão assíncrona de ``older_rows``."""
+        rows = []
+        for queryset in MessageArchive.older_querysets(chat_id, before, limit):
+            rows += [row async for row in queryset]
+        return MessageArchive.merge(rows, limit)
@@ -0,0 +1,44 @@
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Texto gravado comprimido com zlib (coluna binária).
+
+    O primeiro byte indica o formato (``z`` comprimido, ``r`` cru), então o
+    nível ``CHAT_ARCHIVE_COMPRESSION`` pode mudar (ou ser 0, sem compressão)
+    sem afetar o que já foi gravado. Na leitura (inclusive em ``values()``)
+    o valor volta como ``str``.
+    """
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return super().get_prep_value(value)
+
+        raw = value.encode()
+        level = settings.CHAT_ARCHIVE_COMPRESSION
+        if level > 0:
+            compressed = zlib.compress(raw, level)
+            # Textos curtos podem crescer com o cabeçalho do zlib
+            if len(compressed) < len(raw):
+                return b'z' + compressed
+        return b'r' + raw
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+
+        value = bytes(value)
+        if value[:1] == b'z':
+            return zlib.decompress(value[1:]).decode()
+        return value[1:].decode()
+
+    def to_python(self, value):
+        if isinstance(value, str) or value is None:
+            return value
+        return self.from_db_value(value, None, None)
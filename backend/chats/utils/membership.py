@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.utils.cache import SharedCache
+
+from ..models import Chat
+
+
+class ChatMembership:
+    """
+    Cache dos participantes de cada chat para as verificações de acesso.
+
+    Guarda ``(from_user_id, to_user_id, deleted)`` em dois níveis: um LRU
+    em memória do processo (``CHAT_MEMBERSHIP_CACHE_SIZE`` entradas, cada
+    uma válida por ``CHAT_MEMBERSHIP_LOCAL_TTL`` segundos) e, se
+    ``CHAT_MEMBERSHIP_SHARED_CACHE`` estiver ligado e o cache do Django for
+    compartilhado entre os processos (Redis), esse cache. Com o cache em
+    memória do processo (``LocMemCache``) o segundo nível fica desligado,
+    já que ``invalidate`` não alcançaria os outros processos. Os
+    participantes de um chat nunca mudam; só o soft delete altera a
+    entrada, e ``invalidate`` é chamado junto com ele. Nos outros processos
+    o LRU pode manter o chat deletado como ativo por no máximo
+    ``CHAT_MEMBERSHIP_LOCAL_TTL`` segundos.
+
+    Chats inexistentes não são guardados (o ID pode ser criado depois).
+    """
+
+    local = OrderedDict()
+    lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(chat_id):
+        """Retorna a chave do chat no cache compartilhado."""
+        return f'chat:members:{chat_id}'
+
+    @staticmethod
+    def use_shared_cache():
+        """Verifica se o segundo nível (cache compartilhado) está ativo."""
+        return settings.CHAT_MEMBERSHIP_SHARED_CACHE and SharedCache.available()
+
+    @staticmethod
+    def normalize_id(chat_id):
+        """Converte o ID recebido (URL, evento do socket) para int ou None."""
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def get_local(chat_id):
+        """Busca o chat no LRU do processo (None se ausente ou expirado)."""
+        with ChatMembership.lock:
+            entry = ChatMembership.local.get(chat_id)
+            if entry is None:
+                return None
+
+            expires_at, membership = entry
+            if expires_at < time.monotonic():
+                del ChatMembership.local[chat_id]
+                return None
+
+            ChatMembership.local.move_to_end(chat_id)
+            return membership
+
+    @staticmethod
+    def set_local(chat_id, membership):
+        """Guarda o chat no LRU do processo, removendo os menos usados."""
+        size = settings.CHAT_MEMBERSHIP_CACHE_SIZE
+        if size <= 0:
+            return
+
+        with ChatMembership.lock:
+            ChatMembership.local[chat_id] = (time.monotonic() + settings.CHAT_MEMBERSHIP_LOCAL_TTL, membership)
+            ChatMembership.local.move_to_end(chat_id)
+            while len(ChatMembership.local) > size:
+                ChatMembership.local.popitem(last=False)
+
+    @staticmethod
+    def queryset(chat_id):
+        """Consulta dos participantes e do soft delete do chat."""
+        return Chat.objects.filter(id=chat_id).values_list('from_user_id', 'to_user_id', 'deleted_at')
+
+    @staticmethod
+    def from_row(row):
+        """Converte a linha do banco em ``(from_user_id, to_user_id, deleted)``."""
+        from_user_id, to_user_id, deleted_at = row
+        return from_user_id, to_user_id, deleted_at is not None
+
+    @staticmethod
+    def get(chat_id):
+        """
+        Retorna os participantes do chat.
+
+        Args:
+            chat_id: ID do chat
+
+        Returns:
+            tuple | None: ``(from_user_id, to_user_id, deleted)`` ou None se o
+            chat não existe
+        """
+        chat_id = ChatMembership.normalize_id(chat_id)
+        if chat_id is None:
+            return None
+
+        membership = ChatMembership.get_local(chat_id)
+        if membership is not None:
+            return membership
+
+        shared = ChatMembership.use_shared_cache()
+        if shared:
+            membership = cache.get(ChatMembership.cache_key(chat_id))
+
+        if membership is None:
+            row = ChatMembership.queryset(chat_id).first()
+            if row is None:
+                return None
+            membership = ChatMembership.from_row(row)
+            if shared:
+                cache.set(ChatMembership.cache_key(chat_id), membership, settings.CHAT_MEMBERSHIP_CACHE_TIMEOUT)
+
+        membership = tuple(membership)
+        ChatMembership.set_local(chat_id, membership)
+        return membership
+
+    @staticmethod
+    async def aget(chat_id):
+        """Versão assíncrona de ``get``."""
+        chat_id = ChatMembership.normalize_id(chat_id)
+        if chat_id is None:
+            return None
+
+        membership = ChatMembership.get_local(chat_id)
+        if membership is not None:
+            return membership
+
+        shared = ChatMembership.use_shared_cache()
+        if shared:
+            membership = await cache.aget(ChatMembership.cache_key(chat_id))
+
+        if membership is None:
+            row = await ChatMembership.queryset(chat_id).afirst()
+            if row is None:
+                return None
+            membership = ChatMembership.from_row(row)
+            if shared:
+                await cache.aset(ChatMembership.cache_key(chat_id), membership, settings.CHAT_MEMBERSHIP_CACHE_TIMEOUT)
+
+        membership = tuple(membership)
+        ChatMembership.set_local(chat_id, membership)
+        return membership
+
+    @staticmethod
+    def allows(membership, user_id):
+        """Verifica se o chat está ativo e o usuário participa dele."""
+        if membership is None:
+            return False
+
+        from_user_id, to_user_id, deleted = membership
+        return not deleted and user_id in (from_user_id, to_user_id)
+
+    @staticmethod
+    def is_member(chat_id, user_id):
+        """
+        Verifica se o usuário participa do chat (não deletado).
+
+        Args:
+            chat_id: ID do chat
+            user_id: ID do usuário
+
+        Returns:
+            bool: True se o usuário pode acessar o chat
+        """
+        return ChatMembership.allows(ChatMembership.get(chat_id), user_id)
+
+    @staticmethod
+    async def ais_member(chat_id, user_id):
+        """Versão assíncrona de ``is_member``."""
+        return ChatMembership.allows(await ChatMembership.aget(chat_id), user_id)
+
+    @staticmethod
+    def invalidate(chat_id):
+        """Remove o chat dos dois níveis (chamar junto com o soft delete)."""
+        chat_id = ChatMembership.normalize_id(chat_id)
+        with ChatMembership.lock:
+            ChatMembership.local.pop(chat_id, None)
+        cache.delete(ChatMembership.cache_key(chat_id))
+
+    @staticmethod
+    def clear_local():
+        """Esvazia o LRU do processo."""
+        with ChatMembership.lock:
+            ChatMembership.local.clear()
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from django.db.models import Count, OuterRef, Subquery
+from attachments.models import FileAttachment, AudioAttachment
+from ..models import Chat, ChatMessage
+
+
+class SerializerPrefetch:
+    """
+    Carrega com o ORM assíncrono os dados que os serializers de chat buscariam
+    objeto a objeto.
+
+    ``ChatSerializer`` e ``ChatMessageSerializer`` fazem uma consulta por chat
+    (contagem de não vistas, última mensagem) e por anexo. Os métodos daqui
+    trazem tudo em poucas consultas e devolvem um ``context``; com ele a
+    serialização roda só em memória e pode ser feita direto no event loop.
+    """
+
+    attachment_models = {
+        'FILE': FileAttachment,
+        'AUDIO': AudioAttachment,
+    }
+
+    @staticmethod
+    async def chats(chats, user_id):
+        """
+        Monta o contexto de serialização de uma lista de chats.
+
+        Args:
+            chats: Chats a serializar
+            user_id: ID do usuário logado
+
+        Returns:
+            dict: ``unseen_counts``, ``last_messages`` e ``attachments``
+        """
+        ids = [chat.id for chat in chats]
+        context = {'unseen_counts': {}, 'last_messages': {}, 'attachments': {}}
+
+        if not ids:
+            return context
+
+        async for row in SerializerPrefetch.unseen_counts_queryset(ids, user_id):
+            context['unseen_counts'][row['chat_id']] = row['total']
+
+        last_ids = [
+            row['last_id']
+            async for row in SerializerPrefetch.last_message_ids_queryset(ids)
+            if row['last_id'] is not None
+        ]
+
+        messages = [
+            message
+            async for message in ChatMessage.objects.filter(id__in=last_ids).select_related('from_user')
+        ]
+
+        context['last_messages'] = {message.chat_id: message for message in messages}
+        context['attachments'] = await SerializerPrefetch.attachments(messages)
+        return context
+
+    @staticmethod
+    def unseen_counts_queryset(chat_ids, user_id):
+        """Contagem de mensagens não vistas (de outros usuários) por chat."""
+        return ChatMessage.objects.filter(
+            chat_id__in=chat_ids,
+            viewed_at__isnull=True,
+            deleted_at__isnull=True
+        ).exclude(
+            from_user_id=user_id
+        ).values('chat_id').annotate(total=Count('id')).order_by()
+
+    @staticmethod
+    def last_message_ids_queryset(chat_ids):
+        """ID da última mensagem não deletada de cada chat (``last_id``)."""
+        latest = ChatMessage.objects.filter(
+            chat_id=OuterRef('pk'),
+            deleted_at__isnull=True
+        ).order_by('-created_at').values('id')[:1]
+
+        return Chat.objects.filter(id__in=chat_ids).annotate(last_id=Subquery(latest)).values('last_id')
+
+    @staticmethod
+    async def messages(messages):
+        """
+        Monta o contexto de serialização de uma lista de mensagens.
+
+        As mensagens devem vir com ``select_related('from_user')``.
+
+        Returns:
+            dict: ``attachments``
+        """
+        return {'attachments': await SerializerPrefetch.attachments(messages)}
+
+    @staticmethod
+    async def attachments(messages):
+        """
+        Carrega os anexos das mensagens com uma consulta por tipo.
+
+        Returns:
+            dict: ``(código, id) -> anexo``
+        """
+        wanted = defaultdict(set)
+        for message in messages:
+            if message.attachment_code in SerializerPrefetch.attachment_models and message.attachment_id:
+                wanted[message.attachment_code].add(message.attachment_id)
+
+        attachments = {}
+        for code, ids in wanted.items():
+            async for attachment in SerializerPrefetch.attachment_models[code].objects.filter(id__in=ids):
+                attachments[(code, attachment.id)] = attachment
+
+        return attachments
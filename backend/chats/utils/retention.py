@@ -0,0 +1,116 @@
+import time
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from attachments.models import AudioAttachment, FileAttachment
+from ..models import ArchivedChatMessage, Chat, ChatMessage
+
+
+class DeletedRowsPurge:
+    """
+    Remoção definitiva de chats e mensagens com soft delete antigo.
+
+    Cada tabela é percorrida em faixas de chave primária de ``batch_size``
+    IDs (``id >= início AND id < fim``), sempre pelo índice da PK. Cada
+    faixa é um DELETE curto em sua própria transação, com uma pausa entre
+    as faixas que removeram linhas, então nenhum lock fica preso por muito
+    tempo. Mensagens (inclusive as arquivadas) de chats removidos saem antes
+    do chat, para o CASCADE não apagar tudo em um único comando. Anexos que
+    ficaram sem mensagem são removidos junto com seus arquivos.
+    """
+
+    attachment_models = {
+        'FILE': FileAttachment,
+        'AUDIO': AudioAttachment,
+    }
+
+    @staticmethod
+    def phases(cutoff):
+        """
+        Tabelas e condições de remoção, na ordem de execução.
+
+        Returns:
+            list: ``(nome, model, condição)``
+        """
+        deleted_chat = Q(chat__deleted_at__lt=cutoff)
+        return [
+            ('mensagens', ChatMessage, Q(deleted_at__lt=cutoff) | deleted_chat),
+            ('mensagens arquivadas', ArchivedChatMessage, deleted_chat),
+            ('chats', Chat, Q(deleted_at__lt=cutoff)),
+        ]
+
+    @staticmethod
+    def id_ranges(model, batch_size):
+        """Faixas ``(início, fim)`` de IDs que cobrem a tabela (MIN/MAX pela PK)."""
+        bounds = model.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return
+
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            yield start, start + batch_size
+
+    @staticmethod
+    def purge(model, condition, batch_size, sleep=0.0):
+        """
+        Remove as linhas da condição faixa a faixa.
+
+        Args:
+            model: Model da tabela
+            condition (Q): Linhas a remover
+            batch_size (int): Tamanho da faixa de IDs
+            sleep (float): Pausa em segundos após cada faixa com remoções
+
+        Yields:
+            dict: ``deleted`` (linhas), ``attachments`` (anexos órfãos removidos)
+            e ``last_id`` (fim da faixa) de cada faixa com remoções
+        """
+        has_attachments = model is not Chat
+
+        for start, end in DeletedRowsPurge.id_ranges(model, batch_size):
+            with transaction.atomic():
+                rows = model.objects.filter(condition, id__gte=start, id__lt=end)
+                if has_attachments:
+                    rows = list(rows.values_list('id', 'attachment_code', 'attachment_id'))
+                    ids = [row[0] for row in rows]
+                else:
+                    ids = list(rows.values_list('id', flat=True))
+
+                if not ids:
+                    continue
+
+                model.objects.filter(id__in=ids).delete()
+
+            attachments = DeletedRowsPurge.remove_orphans([row[1:] for row in rows]) if has_attachments else 0
+            yield {'deleted': len(ids), 'attachments': attachments, 'last_id': end - 1}
+
+            if sleep:
+                time.sleep(sleep)
+
+    @staticmethod
+    def remove_orphans(pairs):
+        """
+        Remove os anexos que não são mais usados por nenhuma mensagem.
+
+        Args:
+            pairs: ``(código, id)`` dos anexos das mensagens removidas
+
+        Returns:
+            int: Anexos removidos (arquivos liberados pela storage)
+        """
+        removed = 0
+        for code, attachment_id in set(pairs):
+            model = DeletedRowsPurge.attachment_models.get(code)
+            if model is None or not attachment_id:
+                continue
+
+            in_use = Q(attachment_code=code, attachment_id=attachment_id)
+            if ChatMessage.objects.filter(in_use).exists() or ArchivedChatMessage.objects.filter(in_use).exists():
+                continue
+
+            # delete() da instância libera o arquivo (e a miniatura) na storage
+            for attachment in model.objects.filter(id=attachment_id):
+                attachment.delete()
+                removed += 1
+
+        return removed
@@ -0,0 +1,195 @@
+from django.conf import settings
+
+from accounts.utils.rows import DATETIME, UserRows
+from attachments.utils.rows import AttachmentRows
+from ..models import ChatMessage
+from .prefetch import SerializerPrefetch
+
+
+class MessageRows:
+    """
+    Versão rápida de ``ChatMessageSerializer`` para listagens.
+
+    Trabalha sobre as tuplas de ``values_list`` (mensagem e remetente em uma
+    consulta, anexos em uma consulta por tipo) e monta o mesmo JSON do
+    serializer sem instanciar models nem campos do DRF; cada remetente é
+    serializado uma única vez por listagem. Os testes de paridade comparam a
+    saída com a dos serializers.
+    """
+
+    FIELDS = ('id', 'body', 'attachment_code', 'attachment_id', 'chat_id', 'viewed_at', 'created_at', 'updated_at')
+    USER_FIELDS = tuple(f'from_user__{field}' for field in UserRows.FIELDS)
+
+    @staticmethod
+    def values(queryset):
+        """Aplica ao QuerySet de mensagens o ``values_list`` usado por ``represent``."""
+        return queryset.values_list(*MessageRows.FIELDS, *MessageRows.USER_FIELDS)
+
+    @staticmethod
+    def attachment_pairs(rows):
+        """Retorna os ``(código, id)`` de anexo das linhas."""
+        return [(row[2], row[3]) for row in rows]
+
+    @staticmethod
+    def represent(rows, attachments, request=None, users=None):
+        """
+        Args:
+            rows: Tuplas de ``MessageRows.values``
+            attachments (dict): Retorno de ``AttachmentRows.fetch``
+            request: Request repassado ao serializer do remetente
+            users (dict): Formato normalizado: cada mensagem traz só
+                ``from_user_id`` e os remetentes são gravados neste dict (por ID)
+
+        Returns:
+            list: Mesmo formato de ``ChatMessageSerializer(..., many=True).data``,
+            com as datas em ``datetime``
+        """
+        normalized = users is not None
+        users = users if normalized else {}
+        datetime = DATETIME.enforce_timezone
+        data = []
+
+        for row in rows:
+            message_id, body, attachment_code, attachment_id, chat_id, viewed_at, created_at, updated_at = row[:8]
+
+            user_id = row[8]
+            from_user = users.get(user_id)
+            if from_user is None:
+                from_user = users[user_id] = UserRows.represent(
+                    dict(zip(UserRows.FIELDS, row[8:])), request, settings.AVATAR_LIST_SIZE
+                )
+
+            message = {
+                'id': message_id,
+                'body': body,
+                'attachment': attachments.get((attachment_code, attachment_id)) if attachment_code and attachment_id else None,
+                'chat': chat_id,
+            }
+            if normalized:
+                message['from_user_id'] = user_id
+            else:
+                message['from_user'] = from_user
+
+            message['viewed_at'] = datetime(viewed_at) if viewed_at is not None else None
+            message['created_at'] = datetime(created_at) if created_at is not None else None
+            message['updated_at'] = datetime(updated_at) if updated_at is not None else None
+            message['isEdited'] = bool(updated_at and created_at) and (updated_at - created_at).total_seconds() > 5
+            data.append(message)
+
+        return data
+
+    @staticmethod
+    def serialize(queryset, request=None, users=None):
+        """Executa a consulta e serializa as mensagens (duas ou três consultas no total)."""
+        return MessageRows.serialize_rows(list(MessageRows.values(queryset)), request, users)
+
+    @staticmethod
+    async def aserialize(queryset, request=None, users=None):
+        """Versão assíncrona de ``serialize``."""
+        return await MessageRows.aserialize_rows([row async for row in MessageRows.values(queryset)], request, users)
+
+    @staticmethod
+    def serialize_rows(rows, request=None, users=None):
+        """Serializa linhas já lidas de ``MessageRows.values``, carregando os anexos."""
+        return MessageRows.represent(rows, AttachmentRows.fetch(MessageRows.attachment_pairs(rows)), request, users)
+
+    @staticmethod
+    async def aserialize_rows(rows, request=None, users=None):
+        """Versão assíncrona de ``serialize_rows``."""
+        return MessageRows.represent(rows, await AttachmentRows.afetch(MessageRows.attachment_pairs(rows)), request, users)
+
+
+class ChatRows:
+    """
+    Versão rápida de ``ChatSerializer`` para a listagem de chats.
+
+    Recebe os chats da página (com ``select_related`` dos dois usuários) e
+    carrega contagens de não vistas e últimas mensagens de todos os chats de
+    uma vez.
+
+    Com ``users`` (formato normalizado, ``?shape=normalized``) cada usuário
+    aparece uma vez no dict da resposta e as linhas levam só o ID.
+    """
+
+    @staticmethod
+    def serialize(chats, request, users=None):
+        """
+        Args:
+            chats: Chats da página
+            request: Request (``request.user`` é o usuário logado)
+            users (dict): Formato normalizado (ver ``MessageRows.represent``):
+                os chats trazem ``user_id`` e as mensagens ``from_user_id``
+
+        Returns:
+            list: Mesmo formato de ``ChatSerializer(..., many=True).data``,
+            com as datas em ``datetime``
+        """
+        ids = [chat.id for chat in chats]
+        if not ids:
+            return []
+
+        unseen_counts = {
+            row['chat_id']: row['total']
+            for row in SerializerPrefetch.unseen_counts_queryset(ids, request.user.id)
+        }
+        last_ids = [
+            row['last_id'] for row in SerializerPrefetch.last_message_ids_queryset(ids)
+            if row['last_id'] is not None
+        ]
+
+        # ChatSerializer serializa a última mensagem sem request; no formato
+        # normalizado o dict de usuários é único, então todos usam o request
+        last_messages = MessageRows.serialize(
+            ChatMessage.objects.filter(id__in=last_ids), request if users is not None else None, users
+        ) if last_ids else []
+        return ChatRows.represent(chats, request, unseen_counts, last_messages, users)
+
+    @staticmethod
+    async def aserialize(chats, request, users=None):
+        """Versão assíncrona de ``serialize``."""
+        ids = [chat.id for chat in chats]
+        if not ids:
+            return []
+
+        unseen_counts = {
+            row['chat_id']: row['total']
+            async for row in SerializerPrefetch.unseen_counts_queryset(ids, request.user.id)
+        }
+        last_ids = [
+            row['last_id'] async for row in SerializerPrefetch.last_message_ids_queryset(ids)
+            if row['last_id'] is not None
+        ]
+
+        last_messages = await MessageRows.aserialize(
+            ChatMessage.objects.filter(id__in=last_ids), request if users is not None else None, users
+        ) if last_ids else []
+        return ChatRows.represent(chats, request, unseen_counts, last_messages, users)
+
+    @staticmethod
+    def represent(chats, request, unseen_counts, last_messages, users=None):
+        """Monta o JSON dos chats a partir dos dados já carregados."""
+        datetime = DATETIME.enforce_timezone
+        last_messages = {message['chat']: message for message in last_messages}
+        user_id = request.user.id
+        data = []
+
+        for chat in chats:
+            other = chat.to_user if chat.from_user_id == user_id else chat.from_user
+            item = {
+                'id': chat.id,
+                'last_message': last_messages.get(chat.id),
+                'unseen_count': unseen_counts.get(chat.id, 0),
+            }
+
+            if users is not None:
+                item['user_id'] = other.id
+                if other.id not in users:
+                    users[other.id] = UserRows.represent(UserRows.row(other), request, settings.AVATAR_LIST_SIZE)
+            else:
+                item['user'] = UserRows.represent(UserRows.row(other), request, settings.AVATAR_LIST_SIZE)
+
+            item['viewed_at'] = datetime(chat.viewed_at) if chat.viewed_at is not None else None
+            item['created_at'] = datetime(chat.created_at) if chat.created_at is not None else None
+            data.append(item)
+
+        return data
@@ -1,5 +1,9 @@
-from .chats import ChatsView, ChatView
-from .chat_messages import ChatMessagesView
-from .chat_message import ChatMessageView
+from .chats import ChatsView, ChatView, AsyncChatsView, AsyncChatView
+from .chat_messages import ChatMessagesView, AsyncChatMessagesView
+from .chat_message import ChatMessageView, AsyncChatMessageView
+from .sync import ChatSyncView
 
-__all__ = ['ChatsView', 'ChatView', 'ChatMessagesView', 'ChatMessageView']
\ No newline at end of file
+__all__ = [
+    'ChatsView', 'ChatView', 'ChatMessagesView', 'ChatMessageView', 'ChatSyncView',
+    'AsyncChatsView', 'AsyncChatView', 'AsyncChatMessagesView', 'AsyncChatMessageView',
+]
\ No newline at end of file
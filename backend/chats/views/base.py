@@ -1,16 +1,28 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db import models
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from django.db.models import Q
+from accounts.authentication import CachedJWTAuthentication
 from accounts.models import User
+from core.utils.conditional import ConditionalGet
+from core.utils.exceptions import ValidationError
+from core.utils.media import MediaSigner
+from core.utils.pagination import CursorPagination
+from core.utils.views import AsyncAPIView
 from ..models import Chat, ChatMessage
 from ..serializers import ChatSerializer
 from ..utils.exceptions import UserNotFound, ChatNotFound
+from ..utils.membership import ChatMembership
 
 
 class BaseView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     """Classe base para views do app chats com métodos utilitários reutilizáveis."""
     
@@ -35,32 +47,183 @@ class BaseView(APIView):
                 raise UserNotFound()
             return None
     
-    def check_if_chat_exists_for_user(self, user_id, to_user):
+    def get_user_chats_page(self, user_id, limit, cursor=None):
         """
-        Verifica se já existe chat entre dois usuários.
+        Retorna uma página de chats do usuário ordenada por atividade.
+        
+        Cada lado da conversa (from_user / to_user) é lido pelo seu próprio
+        índice de atividade com LIMIT, e os dois resultados são intercalados
+        em memória, evitando ordenar todos os chats do usuário a cada página.
+        
+        Args:
+            user_id: ID do usuário logado
+            limit (int): Quantidade de chats por página
+            cursor (str): Cursor retornado pela página anterior
+            
+        Returns:
+            tuple: (lista de chats, cursor da próxima página ou None)
+        """
+        chats = {}
+        for queryset in self.get_chats_page_querysets(user_id, limit, cursor):
+            for chat in queryset:
+                chats[chat.id] = chat
+        
+        return self.merge_chats_page(chats.values(), limit)
+    
+    def get_chats_page_querysets(self, user_id, limit, cursor=None):
+        """
+        Monta as consultas de cada lado da conversa para uma página de chats.
+        
+        Args:
+            user_id: ID do usuário logado
+            limit (int): Quantidade de chats por página
+            cursor (str): Cursor retornado pela página anterior
+            
+        Returns:
+            list: QuerySets (com LIMIT) de chats onde o usuário é from_user e to_user
+        """
+        after = None
+        if cursor:
+            last_message_at, chat_id = CursorPagination.decode(cursor, 2)
+            try:
+                last_message_at = parse_datetime(str(last_message_at))
+            except ValueError:
+                last_message_at = None
+            if last_message_at is None or not isinstance(chat_id, int) or isinstance(chat_id, bool):
+                raise ValidationError('Cursor de paginação inválido')
+            after = (
+                Q(last_message_at__lt=last_message_at) |
+                Q(last_message_at=last_message_at, id__lt=chat_id)
+            )
+        
+        querysets = []
+        for side in (Q(from_user_id=user_id), Q(to_user_id=user_id)):
+            queryset = Chat.objects.filter(side, deleted_at__isnull=True)
+            if after is not None:
+                queryset = queryset.filter(after)
+            queryset = queryset.select_related('from_user', 'to_user').order_by('-last_message_at', '-id')
+            querysets.append(queryset[:limit + 1])
+        
+        return querysets
+    
+    def merge_chats_page(self, chats, limit):
+        """
+        Intercala os chats dos dois lados e corta a página.
+        
+        Args:
+            chats: Chats lidos pelas consultas de ``get_chats_page_querysets``
+            limit (int): Quantidade de chats por página
+            
+        Returns:
+            tuple: (lista de chats, cursor da próxima página ou None)
+        """
+        page = sorted(chats, key=lambda chat: (chat.last_message_at, chat.id), reverse=True)
+        
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = CursorPagination.encode([page[-1].last_message_at.isoformat(), page[-1].id])
+        
+        return page, next_cursor
+    
+    def get_chats_count(self, user_id):
+        """
+        Retorna a quantidade de chats ativos do usuário usando cache.
         
         Args:
             user_id: ID do usuário logado
-            to_user: Instância do usuário destinatário
             
         Returns:
-            dict: ChatSerializer.data se chat existir, None caso contrário
+            int: Quantidade de chats não deletados
         """
-        # Busca chat onde user_id é from_user e to_user é to_user OU vice-versa
-        from django.db.models import Q
-        existing_chat = Chat.objects.filter(
+        key = self.chats_count_key(user_id)
+        count = cache.get(key)
+        
+        if count is None:
+            count = self.get_active_chats(user_id).count()
+            cache.set(key, count, settings.CHATS_COUNT_CACHE_TIMEOUT)
+        
+        return count
+    
+    def chats_count_key(self, user_id):
+        """Retorna a chave de cache da contagem de chats do usuário."""
+        return f'chats:count:{user_id}'
+    
+    def get_active_chats(self, user_id):
+        """Retorna o QuerySet dos chats não deletados do usuário."""
+        return Chat.objects.filter(
+            Q(from_user_id=user_id) | Q(to_user_id=user_id),
             deleted_at__isnull=True
-        ).filter(
-            (Q(from_user_id=user_id) & Q(to_user=to_user)) |
-            (Q(from_user=to_user) & Q(to_user_id=user_id))
-        ).first()
+        )
+    
+    def invalidate_chats_count(self, *user_ids):
+        """Invalida a contagem de chats em cache dos usuários informados."""
+        cache.delete_many([self.chats_count_key(user_id) for user_id in user_ids])
+    
+    def build_chats_etag(self, user_id, chats, total, next_cursor):
+        """
+        Calcula a ETag de uma página da listagem de chats.
         
-        if existing_chat:
-            # Usar context para identificar usuário logado no serializer
-            serializer = ChatSerializer(existing_chat, context={'request': type('obj', (object,), {'user': User.objects.get(id=user_id)})()})
-            return serializer.data
+        Usa só o que a página já carregou, sem consultas extras nem
+        serialização: versão e atividade de cada chat (mudam com qualquer
+        mensagem), os dados de perfil dos participantes embutidos em cada
+        chat, a contagem em cache e o cursor seguinte. A janela de assinatura
+        das mídias faz a ETag mudar quando as URLs assinadas embutidas mudam.
         
-        return None
+        Args:
+            user_id: ID do usuário logado
+            chats: Chats da página (com ``from_user`` / ``to_user`` carregados)
+            total (int): Contagem de chats do usuário
+            next_cursor (str): Cursor da próxima página ou None
+            
+        Returns:
+            str: ETag fraca
+        """
+        parts = ['chats', user_id, total, next_cursor, MediaSigner.window()]
+        for chat in chats:
+            parts += [
+                chat.id, chat.version, chat.last_message_at,
+                chat.from_user.name, chat.from_user.email, chat.from_user.avatar,
+                chat.to_user.name, chat.to_user.email, chat.to_user.avatar
+            ]
+        
+        return ConditionalGet.make_etag(*parts)
+    
+    def get_messages_etag(self, chat_id):
+        """
+        Calcula a ETag da listagem de mensagens de um chat.
+        
+        Combina a versão do chat com os dados de perfil dos participantes,
+        que aparecem embutidos em cada mensagem, e com a janela de
+        assinatura das URLs dos anexos.
+        
+        Args:
+            chat_id: ID do chat
+            
+        Returns:
+            str: ETag fraca
+        """
+        chat = self.get_messages_etag_queryset().get(id=chat_id)
+        
+        return self.build_messages_etag(chat)
+    
+    def get_messages_etag_queryset(self):
+        """Retorna o QuerySet com as colunas usadas na ETag das mensagens."""
+        return Chat.objects.select_related('from_user', 'to_user').only(
+            'version',
+            'from_user__name', 'from_user__email', 'from_user__avatar',
+            'to_user__name', 'to_user__email', 'to_user__avatar'
+        )
+    
+    def build_messages_etag(self, chat):
+        """Monta a ETag das mensagens a partir do chat carregado."""
+        chat_id = chat.id
+        return ConditionalGet.make_etag(
+            'messages', chat_id, chat.version,
+            chat.from_user.name, chat.from_user.email, chat.from_user.avatar,
+            chat.to_user.name, chat.to_user.email, chat.to_user.avatar,
+            MediaSigner.window()
+        )
     
     def chat_belongs_to_user(self, chat_id, user_id):
         """
@@ -81,20 +244,50 @@ class BaseView(APIView):
                 id=chat_id,
                 deleted_at__isnull=True
             )
-            
-            # Verifica se o usuário participa do chat
-            if chat.from_user_id == user_id or chat.to_user_id == user_id:
-                return chat
-            else:
-                raise ChatNotFound()
-                
         except Chat.DoesNotExist:
             raise ChatNotFound()
+        
+        return self.check_chat_owner(chat, user_id)
+    
+    def check_chat_owner(self, chat, user_id):
+        """
+        Retorna o chat se o usuário participa dele.
+        
+        Raises:
+            ChatNotFound: Se o chat não pertencer ao usuário
+        """
+        if chat.from_user_id == user_id or chat.to_user_id == user_id:
+            return chat
+        
+        raise ChatNotFound()
+    
+    def get_users_map(self, request):
+        """
+        Retorna o dict de usuários do formato normalizado, se pedido.
+        
+        Com ``?shape=normalized`` as listagens trazem ``user_id`` /
+        ``from_user_id`` nas linhas e cada usuário uma única vez no dict
+        ``users`` da resposta; sem o parâmetro o formato aninhado continua.
+        
+        Returns:
+            dict: Dict vazio a ser preenchido ou None no formato aninhado
+        """
+        return {} if request.GET.get('shape') == 'normalized' else None
+    
+    def chat_access_denied(self):
+        """Resposta padrão para chat inexistente ou de outro usuário."""
+        return Response(
+            {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
+            status=404
+        )
     
     def user_can_access_chat(self, chat_id, user_id):
         """
         Verifica se usuário pode acessar o chat (retorna boolean).
         
+        Usa o cache de participantes (``ChatMembership``), sem consultar o
+        chat no banco a cada requisição.
+        
         Args:
             chat_id: ID do chat
             user_id: ID do usuário logado
@@ -102,11 +295,7 @@ class BaseView(APIView):
         Returns:
             bool: True se usuário pode acessar, False caso contrário
         """
-        try:
-            self.chat_belongs_to_user(chat_id, user_id)
-            return True
-        except ChatNotFound:
-            return False
+        return ChatMembership.is_member(chat_id, user_id)
     
     def mark_messages_as_received(self, chat_id, user_id):
         """
@@ -116,11 +305,101 @@ class BaseView(APIView):
             chat_id: ID do chat
             user_id: ID do usuário que está visualizando
         """
-        # Atualiza mensagens não vistas que não são do próprio usuário
-        ChatMessage.objects.filter(
+        unseen = self.get_unseen_messages(chat_id, user_id)
+        
+        # Só gera uma nova versão do chat se houver algo a marcar
+        if not unseen.exists():
+            return
+        
+        self.stamp_messages_as_received(chat_id, unseen)
+    
+    def get_unseen_messages(self, chat_id, user_id):
+        """
+        Retorna as mensagens não vistas do chat que não são do próprio usuário.
+        
+        Lidas do primário mesmo em views com ``replica_reads``: a consulta
+        decide a escrita, e uma réplica atrasada deixaria mensagens sem marcar.
+        """
+        return ChatMessage.objects.using('default').filter(
             chat_id=chat_id,
             viewed_at__isnull=True,
             deleted_at__isnull=True
         ).exclude(
             from_user_id=user_id
-        ).update(viewed_at=timezone.now())
\ No newline at end of file
+        )
+    
+    def stamp_messages_as_received(self, chat_id, unseen):
+        """Marca as mensagens como vistas com uma nova versão do chat."""
+        with transaction.atomic():
+            seq = Chat.bump_version(chat_id)
+            unseen.update(viewed_at=timezone.now(), seq=seq)
+
+
+class AsyncBaseView(AsyncAPIView, BaseView):
+    """
+    Versão assíncrona de BaseView.
+    
+    Os métodos ``a*`` usam o ORM assíncrono (``aget``, ``acount``,
+    ``async for``) sobre as mesmas consultas de BaseView. Operações que
+    precisam de transação (``transaction.atomic`` não é suportado no ORM
+    assíncrono) rodam pela versão síncrona em ``sync_to_async``.
+    """
+    
+    async def aget_user_chats_page(self, user_id, limit, cursor=None):
+        """Versão assíncrona de ``get_user_chats_page``."""
+        chats = {}
+        for queryset in self.get_chats_page_querysets(user_id, limit, cursor):
+            async for chat in queryset:
+                chats[chat.id] = chat
+        
+        return self.merge_chats_page(chats.values(), limit)
+    
+    async def aget_chats_count(self, user_id):
+        """Versão assíncrona de ``get_chats_count``."""
+        key = self.chats_count_key(user_id)
+        count = await cache.aget(key)
+        
+        if count is None:
+            count = await self.get_active_chats(user_id).acount()
+            await cache.aset(key, count, settings.CHATS_COUNT_CACHE_TIMEOUT)
+        
+        return count
+    
+    async def aget_messages_etag(self, chat_id):
+        """Versão assíncrona de ``get_messages_etag``."""
+        chat = await self.get_messages_etag_queryset().aget(id=chat_id)
+        
+        return self.build_messages_etag(chat)
+    
+    async def achat_belongs_to_user(self, chat_id, user_id):
+        """
+        Versão assíncrona de ``chat_belongs_to_user``.
+        
+        Os participantes já vêm carregados, já que acessos preguiçosos a
+        ForeignKey não são permitidos em contexto assíncrono.
+        
+        Raises:
+            ChatNotFound: Se chat não existir ou não pertencer ao usuário
+        """
+        try:
+            chat = await Chat.objects.select_related('from_user', 'to_user').aget(
+                id=chat_id,
+                deleted_at__isnull=True
+            )
+        except Chat.DoesNotExist:
+            raise ChatNotFound()
+        
+        return self.check_chat_owner(chat, user_id)
+    
+    async def auser_can_access_chat(self, chat_id, user_id):
+        """Versão assíncrona de ``user_can_access_chat``."""
+        return await ChatMembership.ais_member(chat_id, user_id)
+    
+    async def amark_messages_as_received(self, chat_id, user_id):
+        """Versão assíncrona de ``mark_messages_as_received``."""
+        unseen = self.get_unseen_messages(chat_id, user_id)
+        
+        if not await unseen.aexists():
+            return
+        
+        await sync_to_async(self.stamp_messages_as_received)(chat_id, unseen)
@@ -1,10 +1,13 @@
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q
 from core.temp_socket import socket
-from .base import BaseView
+from asgiref.sync import sync_to_async
+from .base import AsyncBaseView, BaseView
 from ..models import Chat, ChatMessage
 from ..serializers import ChatMessageSerializer
+from ..utils.prefetch import SerializerPrefetch
 
 
 class ChatMessageView(BaseView):
@@ -24,28 +27,33 @@ class ChatMessageView(BaseView):
         """
         # Verificar se chat existe e pertence ao usuário
         if not self.user_can_access_chat(chat_id, request.user.id):
-            return Response(
-                {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                status=404
-            )
+            return self.chat_access_denied()
         
         # Buscar mensagem
         try:
-            message = ChatMessage.objects.get(
-                id=message_id,
-                chat_id=chat_id,
-                deleted_at__isnull=True
-            )
+            message = self.get_chat_message(chat_id, message_id)
         except ChatMessage.DoesNotExist:
-            return Response(
-                {'error': 'Mensagem não encontrada'}, 
-                status=404
-            )
+            return self.message_not_found()
         
         # Serializar e retornar
         serializer = ChatMessageSerializer(message, context={'request': request})
         return Response(serializer.data)
     
+    def get_chat_message(self, chat_id, message_id):
+        """Retorna a mensagem não deletada do chat (DoesNotExist se não houver)."""
+        return ChatMessage.objects.select_related('from_user').get(
+            id=message_id,
+            chat_id=chat_id,
+            deleted_at__isnull=True
+        )
+    
+    def message_not_found(self):
+        """Resposta padrão para mensagem inexistente."""
+        return Response(
+            {'error': 'Mensagem não encontrada'}, 
+            status=404
+        )
+    
     def put(self, request, chat_id, message_id):
         """
         Atualiza uma mensagem específica (apenas o body).
@@ -60,17 +68,14 @@ class ChatMessageView(BaseView):
         """
         # Verificar se chat existe e pertence ao usuário
         if not self.user_can_access_chat(chat_id, request.user.id):
-            return Response(
-                {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                status=404
-            )
+            return self.chat_access_denied()
         
         # Buscar mensagem
         try:
             message = ChatMessage.objects.get(
                 id=message_id,
                 chat_id=chat_id,
-                from_user=request.user,  # Só pode editar suas próprias mensagens
+                from_user_id=request.user.id,  # Só pode editar suas próprias mensagens
                 deleted_at__isnull=True
             )
         except ChatMessage.DoesNotExist:
@@ -88,8 +93,10 @@ class ChatMessageView(BaseView):
             )
         
         # Atualizar mensagem
-        message.body = new_body
-        message.save()
+        with transaction.atomic():
+            message.body = new_body
+            message.seq = Chat.bump_version(chat_id)
+            message.save()
         
         # Serializar mensagem atualizada
         serializer = ChatMessageSerializer(message, context={'request': request})
@@ -121,10 +128,7 @@ class ChatMessageView(BaseView):
         """
         # Verificar se chat existe e pertence ao usuário
         if not self.user_can_access_chat(chat_id, request.user.id):
-            return Response(
-                {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                status=404
-            )
+            return self.chat_access_denied()
         
         # Buscar mensagem
         try:
@@ -140,15 +144,17 @@ class ChatMessageView(BaseView):
             )
         
         # Só pode marcar como lida se não for o remetente
-        if message.from_user.id == request.user.id:
+        if message.from_user_id == request.user.id:
             return Response(
                 {'error': 'Você não pode marcar suas próprias mensagens como lidas'}, 
                 status=400
             )
         
         # Marcar como lida
-        message.viewed_at = timezone.now()
-        message.save()
+        with transaction.atomic():
+            message.viewed_at = timezone.now()
+            message.seq = Chat.bump_version(chat_id)
+            message.save()
         
         # Serializar mensagem atualizada
         serializer = ChatMessageSerializer(message, context={'request': request})
@@ -177,17 +183,14 @@ class ChatMessageView(BaseView):
         """
         # Verificar se chat existe e pertence ao usuário
         if not self.user_can_access_chat(chat_id, request.user.id):
-            return Response(
-                {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                status=404
-            )
+            return self.chat_access_denied()
         
         # Buscar mensagem
         try:
             message = ChatMessage.objects.get(
                 id=message_id,
                 chat_id=chat_id,
-                from_user=request.user,  # Só pode deletar suas próprias mensagens
+                from_user_id=request.user.id,  # Só pode deletar suas próprias mensagens
                 deleted_at__isnull=True
             )
         except ChatMessage.DoesNotExist:
@@ -197,8 +200,10 @@ class ChatMessageView(BaseView):
             )
         
         # Soft delete
-        message.deleted_at = timezone.now()
-        message.save()
+        with transaction.atomic():
+            message.deleted_at = timezone.now()
+            message.seq = Chat.bump_version(chat_id)
+            message.save()
         
         # Determinar usuário destinatário para socket
         chat = message.chat
@@ -214,4 +219,53 @@ class ChatMessageView(BaseView):
         return Response(
             {'message': 'Mensagem deletada com sucesso'}, 
             status=200
-        )
\ No newline at end of file
+        )
+
+
+class AsyncChatMessageView(AsyncBaseView, ChatMessageView):
+    """
+    Versão assíncrona de ChatMessageView.
+    
+    Edição, leitura e exclusão atualizam a versão do chat dentro de uma
+    transação e por isso reaproveitam os handlers síncronos.
+    """
+    
+    async def get(self, request, chat_id, message_id):
+        """
+        Retorna uma mensagem específica de um chat.
+        
+        Args:
+            request: Request object
+            chat_id (int): ID do chat
+            message_id (int): ID da mensagem
+            
+        Returns:
+            Response: Mensagem serializada ou erro
+        """
+        if not await self.auser_can_access_chat(chat_id, request.user.id):
+            return self.chat_access_denied()
+        
+        try:
+            message = await ChatMessage.objects.select_related('from_user').aget(
+                id=message_id,
+                chat_id=chat_id,
+                deleted_at__isnull=True
+            )
+        except ChatMessage.DoesNotExist:
+            return self.message_not_found()
+        
+        context = await SerializerPrefetch.messages([message])
+        serializer = ChatMessageSerializer(message, context={'request': request, **context})
+        return Response(serializer.data)
+    
+    async def put(self, request, chat_id, message_id):
+        """Atualiza o body de uma mensagem (via ``ChatMessageView.put``)."""
+        return await sync_to_async(super().put)(request, chat_id, message_id)
+    
+    async def patch(self, request, chat_id, message_id):
+        """Marca uma mensagem como lida (via ``ChatMessageView.patch``)."""
+        return await sync_to_async(super().patch)(request, chat_id, message_id)
+    
+    async def delete(self, request, chat_id, message_id):
+        """Soft delete de uma mensagem (via ``ChatMessageView.delete``)."""
+        return await sync_to_async(super().delete)(request, chat_id, message_id)
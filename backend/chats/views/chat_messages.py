@@ -1,20 +1,40 @@
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q
 from core.temp_socket import socket
+from core.utils.conditional import ConditionalGet
+from core.utils.pagination import CursorPagination
+from core.utils.replicas import replica_reads
 from attachments.models import FileAttachment, AudioAttachment
-from .base import BaseView
+from asgiref.sync import sync_to_async
+from .base import AsyncBaseView, BaseView
 from ..models import Chat, ChatMessage
 from ..serializers import ChatMessageSerializer
+from ..utils.archive import MessageArchive
+from ..utils.rows import MessageRows
 
 
+@replica_reads
 class ChatMessagesView(BaseView):
     """View para listar e criar mensagens de um chat."""
     
+    # Páginas de mensagens antigas (parâmetro before)
+    default_limit = 50
+    max_limit = 100
+    
     def get(self, request, chat_id):
         """
         Retorna lista de mensagens de um chat específico.
         
+        Com ``?shape=normalized`` as mensagens trazem ``from_user_id`` e os
+        remetentes vêm uma única vez em ``users``.
+        
+        Sem parâmetros retorna as mensagens da tabela quente; se o chat tem
+        mensagens arquivadas, ``next_cursor`` continua a listagem para trás:
+        ``?before=<next_cursor>&limit=N`` traz as ``N`` mensagens anteriores
+        (da tabela quente e do arquivo) e o cursor da página seguinte.
+        
         Args:
             chat_id: ID do chat
             
@@ -23,31 +43,60 @@ class ChatMessagesView(BaseView):
         """
         # Verificar se chat existe e pertence ao usuário
         if not self.user_can_access_chat(chat_id, request.user.id):
-            return Response(
-                {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                status=404
-            )
-        
-        # Buscar mensagens do chat (não deletadas)
-        messages = ChatMessage.objects.filter(
+            return self.chat_access_denied()
+        
+        before = request.GET.get('before')
+        if before:
+            before = MessageArchive.decode_cursor(before)
+        else:
+            # Marcar mensagens como recebidas pelo usuário logado antes da
+            # ETag, que assim descreve a listagem devolvida
+            self.mark_messages_as_received(chat_id, request.user.id)
+        
+        # Responder 304 se o cliente já tem a versão atual das mensagens
+        etag = ConditionalGet.for_request(request, self.get_messages_etag(chat_id))
+        not_modified = ConditionalGet.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        
+        users = self.get_users_map(request)
+        
+        if before:
+            # Páginas antigas: só leitura, sem marcar mensagens como vistas
+            limit = CursorPagination.get_limit(request, self.default_limit, self.max_limit)
+            rows, next_cursor = MessageArchive.older_rows(chat_id, before, limit)
+            data = MessageRows.serialize_rows(rows, request, users)
+        else:
+            # Buscar e serializar as mensagens do chat (não deletadas) a partir das linhas
+            data = MessageRows.serialize(self.get_chat_messages(chat_id), request, users)
+            next_cursor = MessageArchive.archive_cursor(chat_id)
+        
+        response = self.messages_response(data, users, next_cursor)
+        return ConditionalGet.finalize(response, etag)
+    
+    def get_chat_messages(self, chat_id):
+        """Retorna as mensagens não deletadas do chat em ordem de criação."""
+        return ChatMessage.objects.filter(
             chat_id=chat_id,
             deleted_at__isnull=True
-        ).order_by('created_at')
-        
-        # Serializar mensagens
-        serializer = ChatMessageSerializer(messages, many=True, context={'request': request})
-        
-        # Marcar mensagens como recebidas pelo usuário logado
-        self.mark_messages_as_received(chat_id, request.user.id)
-        
+        ).select_related('from_user').order_by('created_at')
+    
+    def messages_response(self, data, users=None, next_cursor=None):
+        """Monta a resposta da listagem de mensagens."""
         # Retornar em formato paginado para compatibilidade com o frontend
-        return Response({
-            'data': serializer.data,
-            'total': len(serializer.data),
+        payload = {
+            'data': data,
+            'total': len(data),
             'page': 1,
             'pages': 1,
-            'per_page': 50
-        })
+            'per_page': 50,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }
+        if users is not None:
+            payload['users'] = users
+        
+        return Response(payload)
     
     def post(self, request, chat_id):
         """
@@ -78,33 +127,29 @@ class ChatMessagesView(BaseView):
                 status=400
             )
         
-        # Validar se attachment_id existe se attachment_code for fornecido
+        # Validar se attachment_id existe e foi enviado pelo usuário logado
+        # (anexos de outros usuários também respondem 404)
         if attachment_code and attachment_id:
+            model = FileAttachment if attachment_code == 'FILE' else AudioAttachment
             try:
-                if attachment_code == 'FILE':
-                    FileAttachment.objects.get(id=attachment_id)
-                elif attachment_code == 'AUDIO':
-                    AudioAttachment.objects.get(id=attachment_id)
-            except (FileAttachment.DoesNotExist, AudioAttachment.DoesNotExist):
+                owned = model.objects.filter(id=attachment_id, user_id=request.user.id).exists()
+            except (TypeError, ValueError):
+                owned = False
+            if not owned:
                 return Response(
                     {'error': 'Anexo não encontrado'}, 
                     status=404
                 )
         
-        # Obter chat de forma segura
+        # Verificar acesso pelo cache de participantes antes de carregar o chat
+        if not self.user_can_access_chat(chat_id, request.user.id):
+            return self.chat_access_denied()
+        
+        # Participantes já carregados para o destinatário e o evento do chat
         try:
-            chat = Chat.objects.get(id=chat_id, deleted_at__isnull=True)
-            # Verificar se usuário tem acesso
-            if chat.from_user_id != request.user.id and chat.to_user_id != request.user.id:
-                return Response(
-                    {'error': 'Chat não encontrado ou você não tem permissão para acessá-lo'}, 
-                    status=404
-                )
+            chat = Chat.objects.select_related('from_user', 'to_user').get(id=chat_id, deleted_at__isnull=True)
         except Chat.DoesNotExist:
-            return Response(
-                {'error': 'Chat não encontrado'}, 
-                status=404
-            )
+            return self.chat_access_denied()
         
         # Criar mensagem
         message_data = {
@@ -118,11 +163,16 @@ class ChatMessagesView(BaseView):
             message_data['attachment_code'] = attachment_code
             message_data['attachment_id'] = attachment_id
         
-        message = ChatMessage.objects.create(**message_data)
-        
-        # Atualizar viewed_at do chat
-        chat.viewed_at = timezone.now()
-        chat.save()
+        # Atualizar viewed_at, a atividade e a versão do chat junto com a criação
+        with transaction.atomic():
+            chat.viewed_at = timezone.now()
+            chat.last_message_at = chat.viewed_at
+            message_data['seq'] = Chat.bump_version(
+                chat.id,
+                viewed_at=chat.viewed_at,
+                last_message_at=chat.last_message_at
+            )
+            message = ChatMessage.objects.create(**message_data)
         
         # Serializar mensagem criada
         serializer = ChatMessageSerializer(message, context={'request': request})
@@ -146,4 +196,53 @@ class ChatMessagesView(BaseView):
         except Exception as e:
             pass  # Log error silently
         
-        return Response(serializer.data, status=201)
\ No newline at end of file
+        return Response(serializer.data, status=201)
+
+
+class AsyncChatMessagesView(AsyncBaseView, ChatMessagesView):
+    """Versão assíncrona de ChatMessagesView."""
+    
+    async def get(self, request, chat_id):
+        """
+        Retorna lista de mensagens de um chat específico.
+        
+        Mesmo contrato de ``ChatMessagesView.get`` (inclusive ``before``).
+        
+        Args:
+            chat_id: ID do chat
+            
+        Returns:
+            Response: Lista de mensagens serializadas
+        """
+        if not await self.auser_can_access_chat(chat_id, request.user.id):
+            return self.chat_access_denied()
+        
+        before = request.GET.get('before')
+        if before:
+            before = MessageArchive.decode_cursor(before)
+        else:
+            # Como na versão síncrona, a ETag e a listagem já refletem as mensagens marcadas
+            await self.amark_messages_as_received(chat_id, request.user.id)
+        
+        # Responder 304 se o cliente já tem a versão atual das mensagens
+        etag = ConditionalGet.for_request(request, await self.aget_messages_etag(chat_id))
+        not_modified = ConditionalGet.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        
+        users = self.get_users_map(request)
+        
+        if before:
+            limit = CursorPagination.get_limit(request, self.default_limit, self.max_limit)
+            rows, next_cursor = await MessageArchive.aolder_rows(chat_id, before, limit)
+            data = await MessageRows.aserialize_rows(rows, request, users)
+        else:
+            data = await MessageRows.aserialize(self.get_chat_messages(chat_id), request, users)
+            next_cursor = await MessageArchive.aarchive_cursor(chat_id)
+        
+        response = self.messages_response(data, users, next_cursor)
+        return ConditionalGet.finalize(response, etag)
+    
+    async def post(self, request, chat_id):
+        """Cria nova mensagem (transação e eventos síncronos, via ``ChatMessagesView.post``)."""
+        return await sync_to_async(super().post)(request, chat_id)
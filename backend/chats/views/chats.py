@@ -2,42 +2,80 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
 from core.temp_socket import socket
-from .base import BaseView
+from core.utils.conditional import ConditionalGet
+from core.utils.pagination import CursorPagination
+from core.utils.replicas import replica_reads
+from asgiref.sync import sync_to_async
+from .base import AsyncBaseView, BaseView
 from ..models import Chat
 from ..serializers import ChatSerializer
+from ..utils.membership import ChatMembership
+from ..utils.prefetch import SerializerPrefetch
+from ..utils.rows import ChatRows
 
 
+@replica_reads
 class ChatsView(BaseView):
     """View para listar e criar chats."""
     
+    default_limit = 20
+    max_limit = 50
+    
     def get(self, request):
         """
-        Retorna lista de chats do usuário logado.
+        Retorna lista paginada de chats do usuário logado.
+        
+        Os chats são ordenados pela última atividade (mensagem mais recente
+        primeiro). Parâmetros: ``limit`` (máximo ``max_limit``) e ``cursor``
+        (valor de ``next_cursor`` da página anterior). Com
+        ``shape=normalized`` os usuários vêm no dict ``users`` da página.
         
         Returns:
-            Response: Lista de chats serializados
+            Response: Página de chats serializados
         """
         user = request.user
+        limit = CursorPagination.get_limit(request, self.default_limit, self.max_limit)
+        
+        # Busca a página de chats pelo índice de atividade
+        chats, next_cursor = self.get_user_chats_page(
+            user.id,
+            limit,
+            request.GET.get('cursor')
+        )
+        total = self.get_chats_count(user.id)
+        
+        # Responder 304 se nenhum chat da página mudou (sem serializar)
+        etag = ConditionalGet.for_request(request, self.build_chats_etag(user.id, chats, total, next_cursor))
+        not_modified = ConditionalGet.not_modified(request, etag)
+        if not_modified:
+            return not_modified
         
-        # Busca chats onde o usuário é participante (from_user ou to_user)
-        chats = Chat.objects.filter(
-            Q(from_user=user) | Q(to_user=user),
-            deleted_at__isnull=True
-        ).order_by('-viewed_at', '-created_at')
+        # Serializa chats com contexto do usuário logado (caminho rápido, sem DRF)
+        users = self.get_users_map(request)
+        data = ChatRows.serialize(chats, request, users)
         
-        # Serializa chats com contexto do usuário logado
-        serializer = ChatSerializer(chats, many=True, context={'request': request})
+        response = self.chats_page_response(data, total, limit, next_cursor, users)
+        return ConditionalGet.finalize(response, etag)
+    
+    def chats_page_response(self, data, total, limit, next_cursor, users=None):
+        """Monta a resposta paginada da listagem de chats."""
+        # page/pages mantidos para compatibilidade com o frontend (como em
+        # messages_response); a navegação usa has_next/next_cursor
+        page = {
+            'data': data,
+            'total': total,
+            'page': 1,
+            'pages': 1,
+            'per_page': limit,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }
+        if users is not None:
+            page['users'] = users
         
-        # Retornar em formato paginado para compatibilidade com o frontend
         return Response({
             'success': True,
-            'data': {
-                'data': serializer.data,
-                'total': len(serializer.data),
-                'page': 1,
-                'pages': 1,
-                'per_page': 50
-            }
+            'data': page
         })
     
     def post(self, request):
@@ -65,21 +103,17 @@ class ChatsView(BaseView):
                 status=400
             )
         
-        # Verificar se chat já existe
-        existing_chat = self.check_if_chat_exists_for_user(
-            request.user.id, 
-            to_user
+        # Busca (ou cria) o chat pela chave do par de participantes
+        chat, created = Chat.get_or_create_between(
+            request.user,
+            to_user,
+            viewed_at=timezone.now()
         )
         
-        if existing_chat:
-            return Response(existing_chat)
+        if not created:
+            return Response(ChatSerializer(chat, context={'request': request}).data)
         
-        # Criar novo chat
-        chat = Chat.objects.create(
-            from_user=request.user,
-            to_user=to_user,
-            viewed_at=timezone.now()
-        )
+        self.invalidate_chats_count(request.user.id, to_user.id)
         
         # Serializar chat criado
         serializer = ChatSerializer(chat, context={'request': request})
@@ -134,7 +168,9 @@ class ChatView(BaseView):
         
         # Fazer soft delete
         chat.deleted_at = timezone.now()
-        chat.save()
+        Chat.bump_version(chat.id, deleted_at=chat.deleted_at, **Chat.released_pair())
+        ChatMembership.invalidate(chat.id)
+        self.invalidate_chats_count(chat.from_user_id, chat.to_user_id)
         
         # Emitir evento socket de delete para ambos os usuários
         socket.emit_to_user(chat.from_user.id, 'update_chat', {
@@ -151,4 +187,69 @@ class ChatView(BaseView):
             'to_user_id': chat.to_user.id
         })
         
-        return Response({'success': True})
\ No newline at end of file
+        return Response({'success': True})
+
+
+class AsyncChatsView(AsyncBaseView, ChatsView):
+    """Versão assíncrona de ChatsView (ORM e serialização assíncronos)."""
+    
+    async def get(self, request):
+        """
+        Retorna lista paginada de chats do usuário logado.
+        
+        Mesmo contrato de ``ChatsView.get``, com as consultas pelo ORM
+        assíncrono.
+        
+        Returns:
+            Response: Página de chats serializados
+        """
+        user = request.user
+        limit = CursorPagination.get_limit(request, self.default_limit, self.max_limit)
+        
+        chats, next_cursor = await self.aget_user_chats_page(
+            user.id,
+            limit,
+            request.GET.get('cursor')
+        )
+        total = await self.aget_chats_count(user.id)
+        
+        # Responder 304 se nenhum chat da página mudou (sem serializar)
+        etag = ConditionalGet.for_request(request, self.build_chats_etag(user.id, chats, total, next_cursor))
+        not_modified = ConditionalGet.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        
+        users = self.get_users_map(request)
+        data = await ChatRows.aserialize(chats, request, users)
+        
+        response = self.chats_page_response(data, total, limit, next_cursor, users)
+        return ConditionalGet.finalize(response, etag)
+    
+    async def post(self, request):
+        """Cria novo chat (transação e eventos síncronos, via ``ChatsView.post``)."""
+        return await sync_to_async(super().post)(request)
+
+
+class AsyncChatView(AsyncBaseView, ChatView):
+    """Versão assíncrona de ChatView."""
+    
+    async def get(self, request, pk):
+        """
+        Busca um chat específico.
+        
+        Args:
+            pk: ID do chat
+            
+        Returns:
+            Response: Chat serializado
+        """
+        chat = await self.achat_belongs_to_user(pk, request.user.id)
+        
+        context = await SerializerPrefetch.chats([chat], request.user.id)
+        serializer = ChatSerializer(chat, context={'request': request, **context})
+        
+        return Response(serializer.data)
+    
+    async def delete(self, request, pk):
+        """Soft delete de um chat (via ``ChatView.delete``)."""
+        return await sync_to_async(super().delete)(request, pk)
@@ -0,0 +1,124 @@
+from rest_framework.response import Response
+from django.db.models import Count, Q
+from core.utils.exceptions import ValidationError
+from core.utils.pagination import CursorPagination
+from .base import BaseView
+from ..models import Chat, ChatMessage, SyncSequence
+from ..utils.rows import ChatRows, MessageRows
+
+
+class ChatSyncView(BaseView):
+    """View para sincronização incremental dos chats do usuário."""
+    
+    # Máximo de mensagens alteradas devolvidas por chat antes de pedir recarga completa
+    max_messages_per_chat = 200
+    
+    def post(self, request):
+        """
+        Retorna o que mudou nos chats do usuário desde o cursor informado.
+        
+        O cursor é a sequência de alterações do usuário (``SyncSequence``)
+        conhecida pelo cliente: toda alteração de um chat ou de suas
+        mensagens gera uma versão maior que ela (ver ``Chat.bump_version``).
+        Só os chats com versão maior que o cursor são lidos, pelos índices
+        (participante, versão), e as mensagens alteradas de todos eles vêm
+        de uma vez pelo índice (chat, seq); o custo depende do que mudou, não
+        da quantidade de chats. Sem cursor, a resposta traz apenas o cursor
+        atual para o cliente usar após a carga inicial.
+        
+        Chats removidos definitivamente pelo ``purge_deleted`` não aparecem;
+        clientes parados por mais de ``CHAT_PURGE_AFTER_DAYS`` devem recarregar
+        a lista inteira.
+        
+        Body:
+            cursor (str): Cursor retornado pela sincronização anterior
+        
+        Returns:
+            Response: Chats, mensagens e exclusões alterados e o novo cursor
+        """
+        user_id = request.user.id
+        known = self.decode_cursor(request.data.get('cursor'))
+        
+        # Lido antes das alterações: versões até ele já foram confirmadas, e o
+        # que for confirmado depois volta na próxima sincronização
+        cursor = SyncSequence.current(user_id)
+        
+        changes = {
+            'chats': [],
+            'deleted_chats': [],
+            'messages': [],
+            'deleted_messages': [],
+            'resync_chats': [],
+        }
+        
+        if known is None or known >= cursor:
+            return self.sync_response(changes, cursor)
+        
+        chats = []
+        for side in (Q(from_user_id=user_id), Q(to_user_id=user_id)):
+            chats += Chat.objects.filter(side, version__gt=known).select_related('from_user', 'to_user')
+        
+        live = []
+        for chat in chats:
+            if chat.deleted_at:
+                changes['deleted_chats'].append(chat.id)
+            else:
+                live.append(chat)
+        
+        if not live:
+            return self.sync_response(changes, cursor)
+        
+        changes['chats'] = ChatRows.serialize(live, request)
+        
+        # Muitas alterações: mais barato o cliente recarregar o chat inteiro
+        changed = ChatMessage.objects.filter(chat_id__in=[chat.id for chat in live], seq__gt=known)
+        totals = changed.values('chat_id').annotate(total=Count('id')).order_by()
+        resync = [row['chat_id'] for row in totals if row['total'] > self.max_messages_per_chat]
+        changes['resync_chats'] = resync
+        if resync:
+            changed = changed.exclude(chat_id__in=resync)
+        
+        changes['deleted_messages'] = [
+            {'id': message_id, 'chat_id': chat_id}
+            for message_id, chat_id in changed.filter(deleted_at__isnull=False).order_by('seq', 'id').values_list('id', 'chat_id')
+        ]
+        changes['messages'] = MessageRows.serialize(
+            changed.filter(deleted_at__isnull=True).order_by('seq', 'id'), request
+        )
+        
+        return self.sync_response(changes, cursor)
+    
+    def decode_cursor(self, cursor):
+        """
+        Converte o cursor recebido na sequência conhecida pelo cliente.
+        
+        Args:
+            cursor (str): Cursor opaco enviado pelo cliente
+        
+        Returns:
+            int | None: Sequência conhecida ou None se o cursor não foi enviado
+        
+        Raises:
+            ValidationError: Se o cursor for inválido
+        """
+        if not cursor:
+            return None
+        
+        try:
+            seq, = CursorPagination.decode(cursor, 1)
+        except ValidationError:
+            raise ValidationError('Cursor de sincronização inválido')
+        
+        if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+            raise ValidationError('Cursor de sincronização inválido')
+        
+        return seq
+    
+    def sync_response(self, changes, cursor):
+        """Monta a resposta da sincronização com o novo cursor."""
+        changes['cursor'] = CursorPagination.encode([cursor])
+        
+        return Response({
+            'success': True,
+            'data': changes
+        })
@@ -0,0 +1,76 @@
+from threading import Lock
+
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from core.utils.db_pool import ConnectionPool, PoolTimeout
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    """
+    Backend MySQL com pool de conexões (``ENGINE = 'core.backends.mysql'``).
+
+    Em vez de abrir uma conexão TCP autenticada por requisição, pega uma do
+    ``ConnectionPool`` do alias e a devolve quando o Django a fecharia (com
+    ``CONN_MAX_AGE = 0``, no fim de cada requisição). A configuração fica na
+    chave ``POOL`` do banco em ``DATABASES``: ``SIZE``, ``MAX_OVERFLOW``,
+    ``TIMEOUT``, ``MAX_LIFETIME``, ``HEALTH_CHECK_INTERVAL`` e
+    ``WAIT_WARNING_MS``.
+    """
+
+    pools = {}
+    pools_lock = Lock()
+
+    def get_pool(self, conn_params):
+        """Retorna (criando na primeira chamada) o pool do alias."""
+        with self.pools_lock:
+            pool = self.pools.get(self.alias)
+            if pool is None:
+                options = self.settings_dict.get('POOL', {})
+                pool = self.pools[self.alias] = ConnectionPool(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                    size=options.get('SIZE', 10),
+                    max_overflow=options.get('MAX_OVERFLOW', 0),
+                    timeout=options.get('TIMEOUT', 10),
+                    max_lifetime=options.get('MAX_LIFETIME', 1800),
+                    health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 0),
+                    wait_warning_ms=options.get('WAIT_WARNING_MS', 200),
+                    name=self.alias,
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.get_pool(conn_params).checkout()
+        except PoolTimeout as error:
+            # Convertido pelo wrap_database_errors em django.db.OperationalError
+            raise Database.OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        pool = self.pools.get(self.alias)
+        with self.wrap_database_errors:
+            # Fechada no meio de um atomic(): a conexão segue referenciada
+            # pelo wrapper, então não pode voltar ao pool
+            if pool is None or self.in_atomic_block:
+                if pool is not None:
+                    return pool.discard(self.connection)
+                return self.connection.close()
+
+            try:
+                # Transação aberta não pode vazar para a próxima requisição
+                if not self.get_autocommit():
+                    self.connection.rollback()
+            except Database.Error:
+                return pool.checkin(self.connection, discard=True)
+
+            return pool.checkin(self.connection, discard=bool(self.errors_occurred and not self.is_usable()))
+
+    @classmethod
+    def pool_stats(cls):
+        """Métricas dos pools do processo, por alias."""
+        with cls.pools_lock:
+            pools = dict(cls.pools)
+        return {alias: pool.stats() for alias, pool in pools.items()}
@@ -14,6 +14,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from core.utils.replicas import replica_reads
+
 # Store para eventos pendentes por usuário
 user_events = {}
 user_events_lock = Lock()
@@ -65,6 +67,8 @@ def clear_user_events(user_id, before_timestamp):
                 if e['timestamp'] >= before_timestamp
             ]
 
+# Busca do usuário na autenticação vai para a réplica
+@replica_reads
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def poll_events(request):
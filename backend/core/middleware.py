@@ -0,0 +1,222 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core.utils.replicas import ReplicaRouting
+
+try:
+    import brotli
+except ImportError:  # Sem o pacote Brotli as respostas usam apenas gzip
+    brotli = None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime com brotli ou gzip as respostas da API.
+
+    Só atua nos caminhos de ``COMPRESSION_PATH_PREFIXES`` e em respostas com
+    pelo menos o tamanho mínimo da rota, respeitando o ``Accept-Encoding``
+    do cliente (brotli tem preferência quando o pacote está instalado).
+    Conteúdo já comprimido (imagens, áudio, vídeo, arquivos compactados) e
+    respostas com ``Content-Encoding`` passam intactos. Respostas streaming
+    (síncronas ou assíncronas) são comprimidas pedaço a pedaço.
+
+    ``COMPRESSION_ROUTES`` define nível e tamanho mínimo por nome de rota,
+    no formato ``nome:nível[:tamanho mínimo]``; nível 0 desliga a compressão.
+    """
+
+    ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+    COMPRESSED_TYPES = (
+        'image/', 'audio/', 'video/', 'font/woff',
+        'application/zip', 'application/gzip', 'application/x-gzip',
+        'application/x-7z-compressed', 'application/x-rar-compressed',
+        'application/x-bzip2', 'application/pdf', 'application/octet-stream',
+    )
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.routes = self.parse_routes(settings.COMPRESSION_ROUTES)
+
+    @staticmethod
+    def parse_routes(entries):
+        """
+        Converte as entradas de ``COMPRESSION_ROUTES``.
+
+        Args:
+            entries (list): Itens ``nome:nível[:tamanho mínimo]``
+
+        Returns:
+            dict: ``nome -> (nível, tamanho mínimo ou None)``
+        """
+        routes = {}
+        for entry in entries:
+            name, _, options = entry.partition(':')
+            level, _, min_size = options.partition(':')
+            routes[name.strip()] = (int(level), int(min_size) if min_size else None)
+        return routes
+
+    def process_response(self, request, response):
+        if not request.path.startswith(tuple(settings.COMPRESSION_PATH_PREFIXES)):
+            return response
+
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(self.COMPRESSED_TYPES):
+            return response
+
+        level, min_size = self.route_options(request)
+        if level <= 0:
+            return response
+
+        # A representação depende do Accept-Encoding mesmo quando não comprimida
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.acompress_stream(response.streaming_content, encoding, level)
+            else:
+                response.streaming_content = self.compress_stream(response.streaming_content, encoding, level)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < min_size:
+                return response
+
+            compressed = self.compress(response.content, encoding, level)
+            # Conteúdo pouco compressível: não vale o cabeçalho extra
+            if len(compressed) >= len(response.content):
+                return response
+
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # O corpo muda com a codificação: ETags fortes deixam de ser byte a byte
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def route_options(self, request):
+        """Retorna ``(nível, tamanho mínimo)`` da rota resolvida."""
+        match = getattr(request, 'resolver_match', None)
+        level, min_size = self.routes.get(match.url_name if match else None, (None, None))
+
+        return (
+            settings.COMPRESSION_LEVEL if level is None else level,
+            settings.COMPRESSION_MIN_SIZE if min_size is None else min_size,
+        )
+
+    @classmethod
+    def negotiate(cls, accept_encoding):
+        """
+        Escolhe a codificação a partir do ``Accept-Encoding``.
+
+        Returns:
+            str: ``'br'``, ``'gzip'`` ou None se o cliente não aceita nenhuma
+        """
+        accepted = {}
+        for part in accept_encoding.lower().split(','):
+            coding, _, params = part.partition(';')
+            quality = 1.0
+            for param in params.split(';'):
+                key, _, value = param.strip().partition('=')
+                if key == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if coding.strip():
+                accepted[coding.strip()] = quality
+
+        wildcard = accepted.get('*', 0.0)
+        candidates = [
+            (accepted.get(encoding, wildcard), encoding)
+            for encoding in cls.ENCODINGS
+        ]
+        # Empate na qualidade mantém a ordem de preferência de ENCODINGS
+        quality, encoding = max(candidates, key=lambda item: item[0])
+        return encoding if quality > 0 else None
+
+    @staticmethod
+    def compressor(encoding, level):
+        """Cria o compressor incremental da codificação."""
+        if encoding == 'br':
+            return brotli.Compressor(quality=min(level, 11))
+        # wbits 31: formato gzip (cabeçalho e CRC)
+        return zlib.compressobj(min(level, 9), zlib.DEFLATED, 31)
+
+    @classmethod
+    def compress(cls, content, encoding, level):
+        """Comprime um corpo inteiro."""
+        compressor = cls.compressor(encoding, level)
+        if encoding == 'br':
+            return compressor.process(content) + compressor.finish()
+        return compressor.compress(content) + compressor.flush()
+
+    @classmethod
+    def compress_stream(cls, chunks, encoding, level):
+        """Comprime uma resposta streaming, enviando cada pedaço assim que chega."""
+        compressor = cls.compressor(encoding, level)
+        for chunk in chunks:
+            data = cls.compress_chunk(compressor, encoding, chunk)
+            if data:
+                yield data
+        yield compressor.finish() if encoding == 'br' else compressor.flush()
+
+    @classmethod
+    async def acompress_stream(cls, chunks, encoding, level):
+        """Versão assíncrona de ``compress_stream``."""
+        compressor = cls.compressor(encoding, level)
+        async for chunk in chunks:
+            data = cls.compress_chunk(compressor, encoding, chunk)
+            if data:
+                yield data
+        yield compressor.finish() if encoding == 'br' else compressor.flush()
+
+    @staticmethod
+    def compress_chunk(compressor, encoding, chunk):
+        """Comprime um pedaço e descarrega o buffer (o cliente não espera o fim do stream)."""
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if encoding == 'br':
+            return compressor.process(chunk) + compressor.flush()
+        return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Abre e fecha o estado de ``ReplicaRouting`` de cada requisição.
+
+    Libera as leituras em réplica só para views marcadas com
+    ``replica_reads`` em métodos seguros e, ao final, prende ao primário o
+    usuário cuja requisição escreveu no banco (cookie na resposta).
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def process_request(self, request):
+        request._replica_routing_state = ReplicaRouting.begin(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        marked = getattr(view_func, 'replica_reads', False) or getattr(view_class, 'replica_reads', False)
+
+        if marked and request.method in self.SAFE_METHODS:
+            ReplicaRouting.enable_replica_reads()
+
+    def process_response(self, request, response):
+        state = getattr(request, '_replica_routing_state', None)
+        if state is not None:
+            del request._replica_routing_state
+            ReplicaRouting.end(state, response)
+        return response
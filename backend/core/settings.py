@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 from decouple import config, Csv
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,21 +86,72 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Backend MySQL com pool de conexões (ver core/backends/mysql)
+DB_ENGINE = config('DB_ENGINE', default='core.backends.mysql')
+
 DATABASES = {
     'default': {
-        'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
+        'ENGINE': DB_ENGINE,
         'NAME': config('DB_NAME', default='grf_talk'),
         'USER': config('DB_USER', default='root'),
         'PASSWORD': config('DB_PASSWORD', default='root'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='3306'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-        }
+        # charset só existe no MySQL (o SQLite é usado localmente, ex.: réplicas)
+        'OPTIONS': {'charset': 'utf8mb4'} if 'mysql' in DB_ENGINE else {},
+        # Com o pool, "fechar" no fim da requisição devolve a conexão ao pool
+        'CONN_MAX_AGE': 0,
+        # Pool: conexões mantidas, extras em picos, espera máxima (s), idade
+        # máxima (s), tempo parado (s) a partir do qual há ping no checkout e
+        # espera (ms) que gera aviso no log
+        'POOL': {
+            'SIZE': config('DB_POOL_SIZE', default=10, cast=int),
+            'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=5, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800, cast=int),
+            'HEALTH_CHECK_INTERVAL': config('DB_POOL_HEALTH_CHECK_INTERVAL', default=5, cast=float),
+            'WAIT_WARNING_MS': config('DB_POOL_WAIT_WARNING_MS', default=200, cast=int),
+        },
     }
 }
 
 
+# Réplicas de leitura: cada item de DB_REPLICAS é o HOST de uma réplica (no
+# SQLite, o arquivo do banco), com as demais configurações do default. As views
+# marcadas com replica_reads leem delas; após uma escrita o usuário fica
+# REPLICA_STICKY_SECONDS preso ao primário
+for index, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    field = 'NAME' if DB_ENGINE.endswith('sqlite3') else 'HOST'
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], field: replica, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.utils.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Com CACHE_REDIS_URL (ex.: redis://localhost:6379/1) o cache é compartilhado
+# entre os processos; sem ela cada processo tem o seu cache em memória e os
+# caches que dependem de invalidação entre processos ficam só no nível local
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -146,11 +200,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # orjson por padrão; compacto com Accept: application/json; compact=1
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.utils.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Simple JWT settings
@@ -165,6 +224,99 @@ AUTH_USER_MODEL = 'accounts.User'
 # Current URL for media files
 CURRENT_URL = config('CURRENT_URL', default='http://127.0.0.1:8000')
 
+# Tempo (segundos) que a contagem de chats do usuário fica em cache
+CHATS_COUNT_CACHE_TIMEOUT = config('CHATS_COUNT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Gravação em lote do last_access (segundos entre gravações por usuário e entre lotes)
+LAST_ACCESS_MIN_INTERVAL = config('LAST_ACCESS_MIN_INTERVAL', default=60, cast=int)
+LAST_ACCESS_FLUSH_INTERVAL = config('LAST_ACCESS_FLUSH_INTERVAL', default=30, cast=int)
+LAST_ACCESS_BATCH_SIZE = config('LAST_ACCESS_BATCH_SIZE', default=500, cast=int)
+
+# Tempo (segundos) que tokens verificados e o snapshot do usuário ficam em cache
+# (o snapshot só é usado com CACHE_REDIS_URL, ver CachedJWTAuthentication)
+AUTH_CACHE_TIMEOUT = config('AUTH_CACHE_TIMEOUT', default=60, cast=int)
+
+# Usar as views assíncronas de chats (recomendado ao servir via ASGI)
+CHATS_ASYNC_VIEWS = config('CHATS_ASYNC_VIEWS', default=False, cast=bool)
+
+# Variantes de avatar geradas no upload (px) e tamanho usado em listagens
+AVATAR_SIZES = config('AVATAR_SIZES', default='48,128,512', cast=Csv(int))
+AVATAR_LIST_SIZE = config('AVATAR_LIST_SIZE', default=48, cast=int)
+# Threads que processam avatares (0 processa na própria requisição)
+AVATAR_PROCESSING_WORKERS = config('AVATAR_PROCESSING_WORKERS', default=2, cast=int)
+
+# Avatar padrão com iniciais: formato das URLs geradas e cache em disco
+INITIALS_AVATAR_FORMAT = config('INITIALS_AVATAR_FORMAT', default='svg')
+INITIALS_AVATAR_CACHE_DIR = config('INITIALS_AVATAR_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'initials'))
+
+# Upload retomável de anexos: limites (bytes), bloco de leitura e pasta dos parciais
+ATTACHMENT_MAX_FILE_SIZE = config('ATTACHMENT_MAX_FILE_SIZE', default=25 * 1024 * 1024, cast=int)
+ATTACHMENT_MAX_AUDIO_SIZE = config('ATTACHMENT_MAX_AUDIO_SIZE', default=10 * 1024 * 1024, cast=int)
+ATTACHMENT_UPLOAD_CHUNK_SIZE = config('ATTACHMENT_UPLOAD_CHUNK_SIZE', default=64 * 1024, cast=int)
+ATTACHMENT_UPLOAD_DIR = config('ATTACHMENT_UPLOAD_DIR', default=str(BASE_DIR / 'uploads'))
+# Uploads não finalizados após este tempo (horas) são descartados
+ATTACHMENT_UPLOAD_EXPIRATION_HOURS = config('ATTACHMENT_UPLOAD_EXPIRATION_HOURS', default=24, cast=int)
+
+# Metadados de áudio (duração e forma de onda): threads (0 processa na própria
+# requisição), quantidade de picos e decodificadores tentados em ordem
+AUDIO_PROCESSING_WORKERS = config('AUDIO_PROCESSING_WORKERS', default=2, cast=int)
+AUDIO_PEAKS_COUNT = config('AUDIO_PEAKS_COUNT', default=64, cast=int)
+AUDIO_DECODERS = config(
+    'AUDIO_DECODERS',
+    default='attachments.utils.audio.WaveDecoder,attachments.utils.audio.FfmpegDecoder',
+    cast=Csv()
+)
+
+# Miniaturas de anexos de imagem: processos do pool (0 processa na própria
+# requisição), maior lado da miniatura e do placeholder embutido (px)
+ATTACHMENT_THUMBNAIL_WORKERS = config('ATTACHMENT_THUMBNAIL_WORKERS', default=2, cast=int)
+ATTACHMENT_THUMBNAIL_SIZE = config('ATTACHMENT_THUMBNAIL_SIZE', default=320, cast=int)
+ATTACHMENT_PLACEHOLDER_SIZE = config('ATTACHMENT_PLACEHOLDER_SIZE', default=16, cast=int)
+
+# Mídia protegida: prefixos públicos, validade (segundos) das URLs assinadas e
+# transferência pelo proxy ('nginx' usa X-Accel-Redirect para MEDIA_ACCEL_PREFIX,
+# 'apache' usa X-Sendfile; vazio serve pelo próprio Django)
+MEDIA_PUBLIC_PREFIXES = config('MEDIA_PUBLIC_PREFIXES', default='avatars/', cast=Csv())
+MEDIA_SIGNED_URL_TTL = config('MEDIA_SIGNED_URL_TTL', default=3600, cast=int)
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+# Compressão (gzip/brotli) das respostas da API: prefixos comprimidos, tamanho
+# mínimo em bytes e nível padrão; COMPRESSION_ROUTES ajusta por nome de rota
+# ('nome:nível[:tamanho mínimo]', nível 0 desliga). O polling só é comprimido
+# acima de um limite maior, já que as respostas vazias são pequenas
+COMPRESSION_PATH_PREFIXES = config('COMPRESSION_PATH_PREFIXES', default='/api/', cast=Csv())
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_LEVEL = config('COMPRESSION_LEVEL', default=6, cast=int)
+COMPRESSION_ROUTES = config('COMPRESSION_ROUTES', default='poll-events:4:4096,chats-sync:4:4096', cast=Csv())
+
+# Arquivamento de mensagens (comando archive_messages): idade em dias para
+# arquivar, mensagens por lote, pausa (s) entre lotes e nível zlib do corpo
+# arquivado (0 grava sem compressão)
+CHAT_ARCHIVE_AFTER_DAYS = config('CHAT_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+CHAT_ARCHIVE_BATCH_SIZE = config('CHAT_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+CHAT_ARCHIVE_BATCH_SLEEP = config('CHAT_ARCHIVE_BATCH_SLEEP', default=0.05, cast=float)
+CHAT_ARCHIVE_COMPRESSION = config('CHAT_ARCHIVE_COMPRESSION', default=6, cast=int)
+
+# Remoção definitiva de chats e mensagens com soft delete (comando
+# purge_deleted): idade em dias, tamanho da faixa de IDs e pausa (s) entre faixas
+CHAT_PURGE_AFTER_DAYS = config('CHAT_PURGE_AFTER_DAYS', default=30, cast=int)
+CHAT_PURGE_BATCH_SIZE = config('CHAT_PURGE_BATCH_SIZE', default=1000, cast=int)
+CHAT_PURGE_BATCH_SLEEP = config('CHAT_PURGE_BATCH_SLEEP', default=0.1, cast=float)
+
+# Cache dos participantes dos chats (verificações de acesso): entradas e
+# validade (s) do LRU em memória, uso do cache compartilhado e seu tempo (s).
+# O cache compartilhado só é usado com CACHE_REDIS_URL configurado
+CHAT_MEMBERSHIP_CACHE_SIZE = config('CHAT_MEMBERSHIP_CACHE_SIZE', default=10000, cast=int)
+CHAT_MEMBERSHIP_LOCAL_TTL = config('CHAT_MEMBERSHIP_LOCAL_TTL', default=30, cast=float)
+CHAT_MEMBERSHIP_SHARED_CACHE = config('CHAT_MEMBERSHIP_SHARED_CACHE', default=True, cast=bool)
+CHAT_MEMBERSHIP_CACHE_TIMEOUT = config('CHAT_MEMBERSHIP_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Pool dedicado para hashing de senhas (signin/signup)
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+PASSWORD_HASHING_MAX_PENDING = config('PASSWORD_HASHING_MAX_PENDING', default=64, cast=int)
+PASSWORD_HASHING_QUEUE_WARNING_MS = config('PASSWORD_HASHING_QUEUE_WARNING_MS', default=500, cast=int)
+
 # CORS settings
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
@@ -180,8 +332,13 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'upload-offset',
+    'x-chunk-sha256',
 ]
 
+# Cabeçalhos de resposta legíveis pelo frontend
+CORS_EXPOSE_HEADERS = ['upload-offset']
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
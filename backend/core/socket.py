@@ -45,14 +45,19 @@ def join_chat(sid, data):
     user_id = data.get('user_id')
     
     if chat_id and user_id:
+        from chats.utils.membership import ChatMembership
+        
         # Verificar se usuário está autenticado
-        if user_sessions.get(user_id) == sid:
+        if user_sessions.get(user_id) != sid:
+            socket.emit('joined_chat', {'status': 'error', 'message': 'User not authenticated'}, room=sid)
+        # Verificar se usuário participa do chat (cache de participantes)
+        elif not ChatMembership.is_member(chat_id, user_id):
+            socket.emit('joined_chat', {'status': 'error', 'message': 'Chat not found'}, room=sid)
+        else:
             room_name = f"chat_{chat_id}"
             socket.enter_room(sid, room_name)
             print(f"Usuário {user_id} entrou no chat {chat_id}")
             socket.emit('joined_chat', {'chat_id': chat_id, 'status': 'success'}, room=sid)
-        else:
-            socket.emit('joined_chat', {'status': 'error', 'message': 'User not authenticated'}, room=sid)
     else:
         socket.emit('joined_chat', {'status': 'error', 'message': 'Chat ID and User ID required'}, room=sid)
 
@@ -0,0 +1,120 @@
+import threading
+import time
+from django.test import SimpleTestCase
+
+from core.utils.db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Conexão falsa que registra ping e fechamento."""
+    
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.pings = 0
+    
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise OSError('conexão perdida')
+    
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Testes para o pool de conexões de banco."""
+    
+    def make_pool(self, **kwargs):
+        self.opened = []
+        
+        def connect():
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+        
+        return ConnectionPool(connect, **kwargs)
+    
+    def test_reuses_returned_connection(self):
+        """Testa que a conexão devolvida é reutilizada sem abrir outra."""
+        pool = self.make_pool(size=2)
+        
+        connection = pool.checkout()
+        pool.checkin(connection)
+        
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+    
+    def test_overflow_closed_on_checkin(self):
+        """Testa que conexões de overflow são fechadas ao serem devolvidas."""
+        pool = self.make_pool(size=1, max_overflow=1)
+        
+        first, second = pool.checkout(), pool.checkout()
+        self.assertEqual(pool.stats()['overflow'], 1)
+        
+        pool.checkin(first)
+        pool.checkin(second)
+        
+        # Só ``size`` conexões continuam abertas
+        self.assertEqual([first.closed, second.closed], [True, False])
+        self.assertEqual(pool.stats()['idle'], 1)
+        self.assertEqual(pool.stats()['overflow'], 0)
+    
+    def test_timeout_when_exhausted(self):
+        """Testa que o checkout falha após a espera quando o limite foi atingido."""
+        pool = self.make_pool(size=1, timeout=0.05)
+        pool.checkout()
+        
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+    
+    def test_waiter_gets_returned_connection(self):
+        """Testa que uma thread esperando recebe a conexão devolvida."""
+        pool = self.make_pool(size=1, timeout=5)
+        connection = pool.checkout()
+        result = []
+        
+        waiter = threading.Thread(target=lambda: result.append(pool.checkout()))
+        waiter.start()
+        time.sleep(0.05)
+        pool.checkin(connection)
+        waiter.join(5)
+        
+        self.assertEqual(result, [connection])
+        self.assertGreater(pool.stats()['wait_time_max_ms'], 0)
+    
+    def test_health_check_discards_dead_connection(self):
+        """Testa que conexão caída é descartada no checkout e substituída."""
+        pool = self.make_pool(size=1, health_check_interval=0)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        connection.alive = False
+        
+        replacement = pool.checkout()
+        
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+    
+    def test_health_check_skipped_for_recent_connection(self):
+        """Testa que conexões devolvidas há pouco não recebem ping."""
+        pool = self.make_pool(size=1, health_check_interval=60)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        
+        pool.checkout()
+        
+        self.assertEqual(connection.pings, 0)
+    
+    def test_max_lifetime(self):
+        """Testa que conexões acima da idade máxima não voltam ao pool."""
+        pool = self.make_pool(size=1, max_lifetime=0.01)
+        connection = pool.checkout()
+        time.sleep(0.02)
+        pool.checkin(connection)
+        
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.checkout(), connection)
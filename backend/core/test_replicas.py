@@ -0,0 +1,156 @@
+import tempfile
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from chats.models import Chat
+from chats.views.base import BaseView
+from core.utils.replicas import ReplicaRouter, ReplicaRouting
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(TransactionTestCase):
+    """
+    Testes para o router de réplicas de leitura.
+    
+    TransactionTestCase: o atomic() do TestCase faria toda leitura ir ao primário.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.state = ReplicaRouting.begin()
+    
+    def tearDown(self):
+        ReplicaRouting.state.set(None)
+    
+    def test_only_marked_requests_use_replica(self):
+        """Testa que só requisições liberadas leem da réplica."""
+        self.assertIsNone(self.router.db_for_read(User))
+        
+        ReplicaRouting.enable_replica_reads()
+        self.assertEqual(self.router.db_for_read(User), 'replica1')
+        
+        ReplicaRouting.state.set(None)
+        self.assertIsNone(self.router.db_for_read(User))
+    
+    def test_write_switches_request_to_primary(self):
+        """Testa que após uma escrita a requisição lê do primário."""
+        ReplicaRouting.enable_replica_reads()
+        
+        self.assertEqual(self.router.db_for_write(User), 'default')
+        self.assertIsNone(self.router.db_for_read(User))
+    
+    def test_reads_inside_transaction_use_primary(self):
+        """Testa que leituras dentro de atomic() ficam no primário."""
+        ReplicaRouting.enable_replica_reads()
+        
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(User))
+    
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp()
+    }})
+    def test_writer_is_pinned_to_primary(self):
+        """Testa a janela de leitura das próprias escritas entre requisições (cache compartilhado)."""
+        ReplicaRouting.identify(42)
+        self.router.db_for_write(User)
+        ReplicaRouting.end(self.state)
+        
+        # Próxima requisição do mesmo usuário
+        ReplicaRouting.begin()
+        ReplicaRouting.enable_replica_reads()
+        ReplicaRouting.identify(42)
+        self.assertIsNone(self.router.db_for_read(User))
+        
+        # Outro usuário continua na réplica
+        ReplicaRouting.begin()
+        ReplicaRouting.enable_replica_reads()
+        ReplicaRouting.identify(7)
+        self.assertEqual(self.router.db_for_read(User), 'replica1')
+    
+    def test_marking_messages_reads_primary(self):
+        """Testa que a marcação de mensagens vistas consulta o primário."""
+        ReplicaRouting.enable_replica_reads()
+        
+        unseen = BaseView().get_unseen_messages(1, 42)
+        
+        self.assertEqual(unseen.db, 'default')
+    
+    def test_migrations_only_on_primary(self):
+        """Testa que as réplicas não recebem migrações."""
+        self.assertIsNone(self.router.allow_migrate('default', 'chats'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'chats'))
+
+
+# O próprio default faz o papel de réplica: read_alias devolve 'default'
+# quando a leitura iria para a réplica e None quando fica no primário
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingViewsTest(TransactionTestCase):
+    """Testes do roteamento nas views marcadas com replica_reads."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(name='User One', email='user1@example.com')
+        self.other = User.objects.create(name='User Two', email='user2@example.com')
+        self.chat = Chat.objects.create(from_user=self.user, to_user=self.other)
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    
+    def aliases(self, method, url, data=None):
+        """Executa a requisição e retorna os aliases escolhidos nas leituras."""
+        results = []
+        read_alias = ReplicaRouting.read_alias
+        
+        def record():
+            results.append(read_alias())
+            return results[-1]
+        
+        with patch.object(ReplicaRouting, 'read_alias', side_effect=record):
+            response = getattr(self.client, method)(url, data, format='json')
+        
+        self.assertLess(response.status_code, 400)
+        return set(results)
+    
+    def test_marked_view_reads_from_replica(self):
+        """Testa que as listagens marcadas leem da réplica."""
+        self.assertIn('default', self.aliases('get', reverse('chats')))
+        self.assertIn('default', self.aliases('get', reverse('users-list')))
+    
+    def test_user_reads_own_writes(self):
+        """Testa que após enviar uma mensagem as leituras do usuário vão ao primário."""
+        url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        
+        self.aliases('post', url, {'body': 'Olá'})
+        
+        self.assertEqual(self.aliases('get', url), {None})
+        self.assertEqual(self.aliases('get', reverse('chats')), {None})
+    
+    def test_pin_cookie_reaches_other_workers(self):
+        """Testa que o cookie assinado prende o usuário ao primário sem o cache do processo."""
+        url = reverse('chat-messages', kwargs={'chat_id': self.chat.id})
+        
+        self.aliases('post', url, {'body': 'Olá'})
+        self.assertIn(ReplicaRouting.PIN_COOKIE, self.client.cookies)
+        
+        # Outro worker: nada no cache local
+        cache.clear()
+        self.assertEqual(self.aliases('get', reverse('chats')), {None})
+        
+        # O cookie não vale para outro usuário nem depois de expirar
+        refresh = RefreshToken.for_user(self.other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.assertIn('default', self.aliases('get', reverse('chats')))
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertIn('default', self.aliases('get', reverse('chats')))
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from attachments.views import MediaView
 from core.events import poll_events
 # from .views import SocketTestView, OnlineUsersView, socket_status
 
@@ -25,12 +25,11 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/accounts/', include('accounts.urls')),
     path('api/v1/chats/', include('chats.urls')),
+    path('api/v1/attachments/', include('attachments.urls')),
     path('api/v1/events/poll/', poll_events, name='poll-events'),
     # path('api/v1/socket/test/', SocketTestView.as_view(), name='socket-test'),
     # path('api/v1/socket/online-users/', OnlineUsersView.as_view(), name='online-users'),
     # path('api/v1/socket/status/', socket_status, name='socket-status'),
+    # Arquivos de mídia com controle de acesso e Range (também em produção)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", MediaView.as_view(), name='media'),
 ]
-
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,21 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class SharedCache:
+    """
+    Classe utilitária para saber se o cache do Django é compartilhado.
+
+    Sem ``CACHE_REDIS_URL`` o cache padrão é um ``LocMemCache``, que existe
+    só no processo atual: o que um worker grava ou remove nele não chega aos
+    outros. Dados que dependem de invalidação entre processos só devem usar
+    o cache quando ele é realmente compartilhado.
+    """
+
+    PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+    @staticmethod
+    def available(alias='default') -> bool:
+        """Verifica se o cache ``alias`` é visto por todos os processos."""
+        return not isinstance(caches[alias], SharedCache.PROCESS_LOCAL_BACKENDS)
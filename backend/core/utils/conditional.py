@@ -0,0 +1,84 @@
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .renderers import ORJSONRenderer
+
+
+class ConditionalGet:
+    """
+    Classe utilitária para GETs condicionais (ETag / If-None-Match).
+
+    As views calculam a ETag a partir de dados de versão baratos (contadores,
+    datas de atualização) antes de montar o payload; se o cliente já possui
+    essa versão, a resposta é um 304 sem consultas extras nem serialização.
+    """
+
+    @staticmethod
+    def make_etag(*parts) -> str:
+        """
+        Gera uma ETag fraca a partir dos dados de versão.
+
+        Args:
+            *parts: Valores que identificam a versão do recurso
+
+        Returns:
+            str: ETag no formato W/"<hash>"
+        """
+        raw = ':'.join(str(part) for part in parts)
+        return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+    @staticmethod
+    def for_request(request, etag: str) -> str:
+        """
+        Diferencia a ETag pela representação negociada na requisição.
+
+        O modo compacto do ``ORJSONRenderer`` devolve outro corpo na mesma
+        URL, então não pode validar o cache da representação padrão.
+
+        Args:
+            request: Request object (após a negociação de conteúdo)
+            etag (str): ETag gerada por ``make_etag``
+
+        Returns:
+            str: ETag da representação aceita
+        """
+        if not ORJSONRenderer.is_compact(getattr(request, 'accepted_media_type', None)):
+            return etag
+        return etag[:-1] + '-compact"'
+
+    @staticmethod
+    def not_modified(request, etag: str):
+        """
+        Retorna um 304 se o If-None-Match da requisição casar com a ETag.
+
+        A comparação é fraca (RFC 9110), ignorando o prefixo W/.
+
+        Args:
+            request: Request object
+            etag (str): ETag atual do recurso
+
+        Returns:
+            Response | None: Resposta 304 ou None se o recurso mudou
+        """
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return None
+
+        current = etag.removeprefix('W/')
+        etags = parse_etags(header)
+        if '*' not in etags and current not in [tag.removeprefix('W/') for tag in etags]:
+            return None
+
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return ConditionalGet.finalize(response, etag)
+
+    @staticmethod
+    def finalize(response, etag: str):
+        """Adiciona ETag e Cache-Control (privado, sempre revalidar) à resposta."""
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,213 @@
+import logging
+import time
+from collections import deque
+from threading import Condition, Lock
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão do pool ficou livre dentro do tempo de espera."""
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões de banco, compartilhado pelas threads do processo.
+
+    Mantém até ``size`` conexões abertas entre requisições e abre até
+    ``max_overflow`` conexões extras em picos (fechadas ao serem devolvidas).
+    Acima disso o checkout espera até ``timeout`` segundos e falha com
+    ``PoolTimeout``. Cada conexão é usada por uma única thread por vez: o
+    backend devolve a conexão ao pool quando o Django a fecharia (fim da
+    requisição com ``CONN_MAX_AGE = 0``), então nenhuma conexão passa de
+    uma thread para outra em uso, inclusive sob ASGI.
+
+    No checkout, conexões acima de ``max_lifetime`` segundos são descartadas
+    e as paradas há mais de ``health_check_interval`` segundos passam pelo
+    ``ping`` antes de serem entregues.
+    """
+
+    def __init__(self, connect, size=10, max_overflow=0, timeout=10.0, max_lifetime=1800.0,
+                 health_check_interval=0.0, wait_warning_ms=200, ping=None, name='default'):
+        """
+        Args:
+            connect: Função sem argumentos que abre uma conexão nova
+            size (int): Conexões mantidas abertas
+            max_overflow (int): Conexões extras permitidas em picos
+            timeout (float): Espera máxima por uma conexão livre (segundos)
+            max_lifetime (float): Idade máxima de uma conexão (segundos, 0 = sem limite)
+            health_check_interval (float): Tempo parado a partir do qual a
+                conexão é verificada no checkout (0 = sempre)
+            wait_warning_ms (float): Espera que gera aviso no log
+            ping: Função ``ping(conexão)`` que levanta exceção se a conexão caiu
+            name (str): Nome usado nos logs (alias do banco)
+        """
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.wait_warning_ms = wait_warning_ms
+        self.ping = ping or (lambda connection: connection.ping())
+        self.name = name
+
+        self.condition = Condition(Lock())
+        # Conexões livres: (conexão, criada em, devolvida em); a mais recente no fim
+        self.idle = deque()
+        # Conexões em uso: id(conexão) -> criada em
+        self.in_use = {}
+        # Conexões sendo abertas fora do lock (reservam vaga no limite)
+        self.opening = 0
+
+        self.metrics = {
+            'checkouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'wait_time_total_ms': 0.0,
+            'wait_time_max_ms': 0.0,
+        }
+
+    @property
+    def limit(self):
+        """Máximo de conexões abertas ao mesmo tempo."""
+        return self.size + self.max_overflow
+
+    def checkout(self):
+        """
+        Entrega uma conexão saudável, reutilizando as livres.
+
+        Returns:
+            Conexão aberta e exclusiva da thread até o ``checkin``
+
+        Raises:
+            PoolTimeout: Se o limite foi atingido e nada foi devolvido a tempo
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            with self.condition:
+                while not self.idle and len(self.in_use) + self.opening >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'Nenhuma conexão livre no pool "{self.name}" após {self.timeout:g}s '
+                            f'({len(self.in_use)} em uso)'
+                        )
+                    self.condition.wait(remaining)
+
+                if self.idle:
+                    connection, created_at, returned_at = self.idle.pop()
+                    self.in_use[id(connection)] = created_at
+                else:
+                    connection = None
+                    self.opening += 1
+
+            # Abertura e verificação de saúde ficam fora do lock (I/O de rede)
+            if connection is None:
+                try:
+                    connection = self.connect()
+                    created_at = time.monotonic()
+                finally:
+                    with self.condition:
+                        self.opening -= 1
+                        if connection is not None:
+                            self.in_use[id(connection)] = created_at
+                            self.metrics['created'] += 1
+                        else:
+                            self.condition.notify()
+                break
+
+            if self.is_healthy(connection, created_at, returned_at):
+                break
+
+            self.discard(connection)
+
+        self.record_wait(time.monotonic() - started)
+        return connection
+
+    def is_healthy(self, connection, created_at, returned_at):
+        """Verifica idade e, se ficou parada tempo suficiente, responde ao ``ping``."""
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at >= self.max_lifetime:
+            return False
+
+        if now - returned_at < self.health_check_interval:
+            return True
+
+        try:
+            self.ping(connection)
+        except Exception:
+            logger.info('Conexão do pool "%s" caiu e foi descartada', self.name)
+            return False
+        return True
+
+    def checkin(self, connection, discard=False):
+        """
+        Devolve uma conexão ao pool.
+
+        Conexões de overflow, vencidas ou marcadas com ``discard`` são fechadas.
+        """
+        now = time.monotonic()
+        with self.condition:
+            created_at = self.in_use.pop(id(connection), None)
+            if created_at is None:
+                # Conexão que não veio do pool (ou já devolvida)
+                return
+
+            expired = self.max_lifetime and now - created_at >= self.max_lifetime
+            keep = not discard and not expired and len(self.idle) + len(self.in_use) < self.size
+            if keep:
+                self.idle.append((connection, created_at, now))
+            self.condition.notify()
+
+        if not keep:
+            self.close(connection)
+
+    def discard(self, connection):
+        """Fecha uma conexão em uso e libera a vaga."""
+        with self.condition:
+            self.in_use.pop(id(connection), None)
+            self.condition.notify()
+        self.close(connection)
+
+    def close(self, connection):
+        """Fecha uma conexão ignorando erros (ela já pode estar caída)."""
+        with self.condition:
+            self.metrics['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        """Fecha todas as conexões livres (ex.: após um fork)."""
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for connection, created_at, returned_at in idle:
+            self.close(connection)
+
+    def record_wait(self, wait_time):
+        """Registra o tempo de espera de um checkout."""
+        wait_ms = wait_time * 1000
+        with self.condition:
+            self.metrics['checkouts'] += 1
+            self.metrics['wait_time_total_ms'] += wait_ms
+            self.metrics['wait_time_max_ms'] = max(self.metrics['wait_time_max_ms'], wait_ms)
+
+        if wait_ms >= self.wait_warning_ms:
+            logger.warning('Checkout no pool "%s" aguardou %.0f ms', self.name, wait_ms)
+
+    def stats(self):
+        """Retorna uma cópia das métricas com o estado atual do pool."""
+        with self.condition:
+            stats = dict(self.metrics)
+            stats['in_use'] = len(self.in_use)
+            stats['idle'] = len(self.idle)
+            stats['overflow'] = max(0, len(self.in_use) + len(self.idle) - self.size)
+
+        stats['wait_time_avg_ms'] = stats['wait_time_total_ms'] / (stats['checkouts'] or 1)
+        return stats
@@ -5,4 +5,12 @@ class ValidationError(APIException):
     """Exception customizada para erros de validação."""
     status_code = 400
     default_detail = 'Parâmetros inválidos para a requisição'
-    default_code = 'validation_error'
\ No newline at end of file
+    default_code = 'validation_error'
+
+class ServiceBusy(APIException):
+    """Exception para quando o servidor está sobrecarregado e a requisição pode ser repetida."""
+    status_code = 503
+    default_detail = 'Servidor ocupado, tente novamente em instantes'
+    default_code = 'service_busy'
+    # Usado pelo exception handler do DRF para o header Retry-After
+    wait = 1
@@ -0,0 +1,264 @@
+import mimetypes
+import os
+import posixpath
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import parse_etags, quote
+
+from .storage import media_storage
+
+
+class MediaSigner:
+    """
+    URLs de mídia assinadas (HMAC) e de curta duração.
+
+    A assinatura cobre o nome do arquivo e a expiração; quem tem a URL pode
+    baixar o arquivo até ela expirar sem autenticação nem consulta ao banco
+    (tags ``<audio>``/``<img>`` não enviam o cabeçalho Authorization). A
+    expiração é arredondada para janelas de ``MEDIA_SIGNED_URL_TTL``, então
+    a mesma mídia gera a mesma URL durante a janela e o cache do navegador
+    continua valendo.
+    """
+
+    SALT = 'core.utils.media.MediaSigner'
+
+    @staticmethod
+    def signature(name, expires):
+        """Calcula a assinatura de (nome, expiração)."""
+        return salted_hmac(MediaSigner.SALT, f'{name}:{expires}', algorithm='sha256').hexdigest()[:32]
+
+    @staticmethod
+    def sign(url):
+        """
+        Assina a URL pública de um arquivo da storage de mídia.
+
+        Args:
+            url (str): URL relativa (/media/...) do arquivo
+
+        Returns:
+            str: URL com ``expires`` e ``signature`` (URLs externas voltam iguais)
+        """
+        name = media_storage.name_from_url(url)
+        if not name or MediaSigner.is_public(name):
+            return url
+
+        # Válida por pelo menos um TTL inteiro
+        expires = (MediaSigner.window() + 2) * settings.MEDIA_SIGNED_URL_TTL
+        query = urlencode({'expires': expires, 'signature': MediaSigner.signature(name, expires)})
+        return f'{url}?{query}'
+
+    @staticmethod
+    def window():
+        """
+        Retorna a janela de assinatura atual.
+
+        As URLs assinadas só mudam quando a janela muda; respostas que as
+        embutem incluem a janela na ETag para não revalidar URLs expiradas.
+        """
+        return int(time.time()) // settings.MEDIA_SIGNED_URL_TTL
+
+    @staticmethod
+    def verify(name, expires, signature):
+        """
+        Confere a assinatura e a expiração recebidas na query string.
+
+        Returns:
+            bool: True se a URL é válida e ainda não expirou
+        """
+        if not expires or not signature:
+            return False
+
+        try:
+            expires = int(expires)
+        except ValueError:
+            return False
+
+        if expires < time.time():
+            return False
+
+        return constant_time_compare(MediaSigner.signature(name, expires), signature)
+
+    @staticmethod
+    def normalize(name):
+        """
+        Normaliza o nome relativo recebido na URL.
+
+        Deve ser chamado antes de ``is_public`` e ``verify``: um nome como
+        ``avatars/../attachments/...`` passaria pelo prefixo público e
+        apontaria para um arquivo protegido.
+
+        Returns:
+            str | None: Nome normalizado ou None se ele sair da storage
+        """
+        if '..' in name.split('/') or '\0' in name:
+            return None
+
+        normalized = posixpath.normpath(name)
+        if normalized.startswith('/') or normalized in ('.', '..') or normalized.startswith('../'):
+            return None
+
+        return normalized
+
+    @staticmethod
+    def is_public(name):
+        """Verifica se o arquivo fica fora da checagem de acesso (ex: avatares)."""
+        return any(name.startswith(prefix) for prefix in settings.MEDIA_PUBLIC_PREFIXES)
+
+
+class RangedFile:
+    """
+    Arquivo limitado a ``length`` bytes a partir da posição atual.
+
+    Expõe ``fileno()`` para que o servidor (ex: gunicorn com
+    ``wsgi.file_wrapper``) use ``os.sendfile`` a partir da posição atual e
+    limitado pelo Content-Length; sem isso, ``read`` devolve só o trecho.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class MediaResponse:
+    """
+    Monta a resposta de um arquivo da storage de mídia.
+
+    Com ``MEDIA_SENDFILE_BACKEND`` a transferência é delegada ao proxy
+    (``nginx``: ``X-Accel-Redirect`` para ``MEDIA_ACCEL_PREFIX``; ``apache``:
+    ``X-Sendfile`` com o caminho absoluto), que também trata Range. Sem
+    backend, o próprio Django responde com ``FileResponse``, atendendo
+    requisições ``Range: bytes=`` (um intervalo) com 206.
+    """
+
+    RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    @staticmethod
+    def build(request, name, public=False):
+        """
+        Args:
+            request: Request object
+            name (str): Nome relativo do arquivo na storage
+            public (bool): Se o conteúdo pode ficar em caches compartilhados
+
+        Returns:
+            HttpResponse: Resposta com o arquivo (ou 404/416)
+        """
+        path = media_storage.path(name)
+        if not os.path.isfile(path):
+            return HttpResponse(status=404)
+
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        etag = MediaResponse.etag(name, path)
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=304)
+            return MediaResponse.finalize(response, name, etag, public)
+
+        backend = settings.MEDIA_SENDFILE_BACKEND
+        if backend:
+            response = HttpResponse(content_type=content_type)
+            if backend == 'nginx':
+                response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+            else:
+                response['X-Sendfile'] = path
+            return MediaResponse.finalize(response, name, etag, public)
+
+        size = os.path.getsize(path)
+        byte_range = MediaResponse.parse_range(request, size, etag)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return MediaResponse.finalize(response, name, etag, public)
+
+        file = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            file.seek(start)
+            response = FileResponse(RangedFile(file, end - start + 1), content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+
+        return MediaResponse.finalize(response, name, etag, public)
+
+    @staticmethod
+    def parse_range(request, size, etag):
+        """
+        Interpreta o cabeçalho Range (apenas um intervalo de bytes).
+
+        Múltiplos intervalos, sintaxe inválida ou If-Range desatualizado fazem
+        a resposta ser o arquivo inteiro, como permite a RFC 9110.
+
+        Returns:
+            tuple | None | bool: (início, fim) inclusivos, None para o arquivo
+            inteiro ou False se o intervalo não é satisfatível
+        """
+        header = request.headers.get('Range', '')
+        match = MediaResponse.RANGE_PATTERN.match(header.strip())
+        if not match or not any(match.groups()):
+            return None
+
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag:
+            return None
+
+        first, last = match.groups()
+        if not first:
+            # Sufixo: últimos N bytes
+            length = int(last)
+            if length == 0:
+                return False
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or end < start:
+            return False
+
+        return start, end
+
+    @staticmethod
+    def etag(name, path):
+        """ETag forte: o hash do nome endereçado por conteúdo ou tamanho/mtime."""
+        if media_storage.is_content_addressed(name):
+            return f'"{os.path.splitext(os.path.basename(name))[0]}"'
+
+        stat = os.stat(path)
+        return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    @staticmethod
+    def finalize(response, name, etag, public):
+        """Adiciona ETag, Accept-Ranges e Cache-Control."""
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+
+        scope = 'public' if public else 'private'
+        if media_storage.is_content_addressed(name):
+            # O conteúdo de um nome endereçado por conteúdo nunca muda
+            response['Cache-Control'] = f'{scope}, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = f'{scope}, no-cache'
+
+        return response
@@ -0,0 +1,75 @@
+import base64
+import json
+
+from .exceptions import ValidationError
+
+
+class CursorPagination:
+    """
+    Classe utilitária para paginação por cursor (keyset).
+
+    O cursor é a chave de ordenação do último item da página, serializada em
+    JSON e codificada em base64 url-safe. A próxima página é buscada com um
+    filtro "maior que a chave", sem OFFSET, então o custo não cresce com a
+    profundidade da paginação.
+    """
+
+    @staticmethod
+    def encode(values: list) -> str:
+        """
+        Codifica a chave de ordenação em um cursor opaco.
+
+        Args:
+            values (list): Valores da chave de ordenação do último item
+
+        Returns:
+            str: Cursor para a próxima página
+        """
+        raw = json.dumps(values, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor: str, size: int = None) -> list:
+        """
+        Decodifica um cursor gerado por ``encode``.
+
+        Args:
+            cursor (str): Cursor recebido do cliente
+            size (int): Quantidade de valores esperada na chave (None aceita qualquer tamanho)
+
+        Returns:
+            list: Valores da chave de ordenação
+
+        Raises:
+            ValidationError: Se o cursor for inválido
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise ValidationError('Cursor de paginação inválido')
+
+        if not isinstance(values, list) or (size is not None and len(values) != size):
+            raise ValidationError('Cursor de paginação inválido')
+
+        return values
+
+    @staticmethod
+    def get_limit(request, default: int, maximum: int) -> int:
+        """
+        Lê o parâmetro ``limit`` da requisição respeitando o teto.
+
+        Args:
+            request: Request object
+            default (int): Limite usado quando o parâmetro não é enviado
+            maximum (int): Limite máximo permitido
+
+        Returns:
+            int: Quantidade de itens por página
+        """
+        try:
+            limit = int(request.GET.get('limit', default))
+        except (TypeError, ValueError):
+            raise ValidationError('Parâmetro limit inválido')
+
+        return max(1, min(limit, maximum))
@@ -0,0 +1,111 @@
+import re
+from datetime import date, datetime, timezone
+
+import orjson
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON baseado no orjson.
+
+    Gera o mesmo JSON do ``JSONRenderer`` do DRF (UTF-8, sem espaços, datas
+    ISO 8601 com ``Z``) serializando em C, inclusive ``datetime``/``UUID``
+    nativos; tipos que o orjson não conhece (Decimal, textos lazy...) passam
+    pelo encoder do DRF.
+
+    Parâmetros do Accept (``application/json; ...``):
+        indent: indenta a saída (sempre com 2 espaços)
+        compact=1: modo compacto, sem chaves com valor null e com datas em
+            milissegundos desde a época (campos ``*_at`` e ``last_access``)
+
+    As duas representações compartilham a URL: as respostas levam
+    ``Vary: Accept`` e as ETags são diferenciadas pelo modo compacto
+    (``ConditionalGet.for_request``).
+    """
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    TIMESTAMP_KEY_PATTERN = re.compile(r'(_at|_access)$')
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            # A mesma URL tem representações diferentes conforme o Accept,
+            # inclusive nos 304 (sem corpo)
+            patch_vary_headers(response, ['Accept'])
+
+        if data is None:
+            return b''
+
+        params = self.media_type_params(accepted_media_type)
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if params.get('indent'):
+            options |= orjson.OPT_INDENT_2
+
+        if self.is_compact(accepted_media_type):
+            data = self.compact(data)
+
+        return orjson.dumps(data, default=self.encoder.default, option=options)
+
+    @staticmethod
+    def media_type_params(accepted_media_type):
+        """Extrai os parâmetros (``; chave=valor``) do media type aceito."""
+        params = {}
+        for part in (accepted_media_type or '').split(';')[1:]:
+            key, separator, value = part.partition('=')
+            if separator:
+                params[key.strip()] = value.strip().strip('"')
+        return params
+
+    @classmethod
+    def is_compact(cls, accepted_media_type) -> bool:
+        """Verifica se o media type aceito pede o modo compacto."""
+        return cls.media_type_params(accepted_media_type).get('compact') in ('1', 'true')
+
+    @classmethod
+    def compact(cls, value, key=None):
+        """
+        Remove recursivamente as chaves null e converte as datas em epoch (ms).
+
+        Itens null de listas são mantidos (a posição tem significado). As
+        listagens montadas por linhas (``MessageRows``, ``ChatRows``...) trazem
+        ``datetime`` nativo e não passam por parse; o parse de texto ISO fica
+        só para as respostas dos serializers do DRF, que já chegam em texto.
+        """
+        if isinstance(value, dict):
+            return {
+                item_key: cls.compact(item, item_key)
+                for item_key, item in value.items()
+                if item is not None
+            }
+
+        if isinstance(value, (list, tuple)):
+            return [cls.compact(item) for item in value]
+
+        if isinstance(value, datetime):
+            return cls.epoch_ms(value)
+
+        if isinstance(value, str) and key and cls.TIMESTAMP_KEY_PATTERN.search(str(key)):
+            try:
+                return cls.epoch_ms(datetime.fromisoformat(value))
+            except ValueError:
+                return value
+
+        if isinstance(value, date):
+            return value.isoformat()
+
+        return value
+
+    @staticmethod
+    def epoch_ms(value):
+        """Converte um datetime (sem fuso = UTC) em milissegundos desde a época."""
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
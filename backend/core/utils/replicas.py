@@ -0,0 +1,197 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import SharedCache
+
+
+class RoutingState:
+    """Estado de roteamento de uma requisição."""
+
+    __slots__ = ('replica_reads', 'wrote', 'user_id', 'pinned', 'pinned_user_id', 'replica')
+
+    def __init__(self):
+        self.replica_reads = False
+        self.wrote = False
+        self.user_id = None
+        # Usuário do cookie de leitura das próprias escritas, se válido
+        self.pinned_user_id = None
+        # None = ainda não verificado (cookie / cache)
+        self.pinned = None
+        self.replica = None
+
+
+class ReplicaRouting:
+    """
+    Controle das leituras em réplica com leitura das próprias escritas.
+
+    Só as views marcadas com ``replica_reads`` (em métodos seguros) leem das
+    réplicas de ``DATABASE_REPLICAS``; todo o resto, e qualquer leitura
+    dentro de transação, usa o ``default``. Uma requisição que escreve passa
+    a ler do primário até o fim, e o usuário fica preso ao primário por
+    ``REPLICA_STICKY_SECONDS``, para ver na hora o que acabou de enviar
+    mesmo com atraso de replicação. A marca vai em um cookie assinado na
+    resposta da escrita, válido em qualquer processo, e também no cache
+    quando ele é compartilhado (clientes que não enviam cookies).
+
+    O estado fica em um ``ContextVar`` com um objeto mutável, compartilhado
+    com as threads do ``sync_to_async`` (que copiam o contexto).
+    """
+
+    state = ContextVar('replica_routing_state', default=None)
+
+    PIN_COOKIE = 'db_primary'
+    PIN_SALT = 'core.utils.replicas.ReplicaRouting'
+
+    @staticmethod
+    def begin(request=None):
+        """Inicia o estado da requisição atual (lendo o cookie de ``request``)."""
+        state = RoutingState()
+        if request is not None:
+            state.pinned_user_id = ReplicaRouting.read_pin_cookie(request)
+        ReplicaRouting.state.set(state)
+        return state
+
+    @staticmethod
+    def end(state, response=None):
+        """Finaliza a requisição, prendendo ao primário o usuário que escreveu."""
+        # set() em vez de reset(): sob ASGI o início e o fim da requisição
+        # podem rodar em contextos diferentes
+        ReplicaRouting.state.set(None)
+
+        if state.wrote and state.user_id is not None:
+            ReplicaRouting.pin(state.user_id, response)
+
+    @staticmethod
+    def enable_replica_reads():
+        """Libera as leituras em réplica na requisição atual."""
+        state = ReplicaRouting.state.get()
+        if state is not None:
+            state.replica_reads = True
+
+    @staticmethod
+    def identify(user_id):
+        """Informa o usuário autenticado da requisição atual."""
+        state = ReplicaRouting.state.get()
+        if state is not None:
+            state.user_id = user_id
+
+    @staticmethod
+    def pin_key(user_id):
+        """Retorna a chave de cache que prende o usuário ao primário."""
+        return f'db:primary:{user_id}'
+
+    @staticmethod
+    def pin(user_id, response=None):
+        """
+        Prende as leituras do usuário ao primário pela janela configurada.
+
+        Args:
+            user_id: ID do usuário que escreveu
+            response: Resposta da escrita, que recebe o cookie assinado
+        """
+        seconds = settings.REPLICA_STICKY_SECONDS
+        if not settings.DATABASE_REPLICAS or seconds <= 0:
+            return
+
+        if SharedCache.available():
+            cache.set(ReplicaRouting.pin_key(user_id), True, seconds)
+
+        if response is not None:
+            response.set_signed_cookie(
+                ReplicaRouting.PIN_COOKIE,
+                str(user_id),
+                salt=ReplicaRouting.PIN_SALT,
+                max_age=seconds,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax'
+            )
+
+    @staticmethod
+    def read_pin_cookie(request):
+        """Retorna o usuário do cookie de leitura das próprias escritas (None se inválido ou expirado)."""
+        return request.get_signed_cookie(
+            ReplicaRouting.PIN_COOKIE,
+            default=None,
+            salt=ReplicaRouting.PIN_SALT,
+            max_age=settings.REPLICA_STICKY_SECONDS
+        )
+
+    @staticmethod
+    def is_pinned(state):
+        """Verifica se o usuário da requisição está preso ao primário."""
+        if state.pinned_user_id == str(state.user_id):
+            return True
+
+        return SharedCache.available() and cache.get(ReplicaRouting.pin_key(state.user_id)) is not None
+
+    @staticmethod
+    def read_alias():
+        """
+        Escolhe o banco de uma leitura.
+
+        Returns:
+            str: Alias da réplica ou None para usar o ``default``
+        """
+        state = ReplicaRouting.state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or not state.replica_reads or state.wrote or not replicas:
+            return None
+
+        # Leituras dentro de transação precisam enxergar as escritas dela
+        if connections['default'].in_atomic_block:
+            return None
+
+        if state.user_id is not None and state.pinned is None:
+            state.pinned = ReplicaRouting.is_pinned(state)
+        if state.pinned:
+            return None
+
+        # Mesma réplica durante toda a requisição (leituras consistentes entre si)
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    @staticmethod
+    def record_write():
+        """Registra uma escrita: o resto da requisição lê do primário."""
+        state = ReplicaRouting.state.get()
+        if state is not None:
+            state.wrote = True
+
+
+class ReplicaRouter:
+    """Router de banco (``DATABASE_ROUTERS``) baseado em ``ReplicaRouting``."""
+
+    def db_for_read(self, model, **hints):
+        return ReplicaRouting.read_alias()
+
+    def db_for_write(self, model, **hints):
+        ReplicaRouting.record_write()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do primário
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Réplicas recebem o schema pela replicação; o primário nunca é bloqueado
+        if db != 'default' and db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def replica_reads(view):
+    """
+    Marca uma view (classe ou função) para ler das réplicas em GET/HEAD.
+
+    Exemplo:
+        @replica_reads
+        class ChatsView(BaseView): ...
+    """
+    view.replica_reads = True
+    return view
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Storage que nomeia os arquivos pelo SHA-256 do conteúdo.
+
+    O arquivo recebido é copiado em blocos para um temporário enquanto o hash
+    é calculado; o nome final é ``<pasta>/<hash[:2]>/<hash><extensão>``.
+    Conteúdo idêntico vira o mesmo arquivo: cada ``save`` soma uma referência
+    em ``StoredFile`` e cada ``delete`` remove uma, apagando o arquivo só
+    quando não sobra nenhuma. Como o conteúdo de uma URL nunca muda, ela pode
+    ser servida com ``Cache-Control: immutable``.
+
+    Arquivos gravados antes desta storage (sem registro em ``StoredFile``)
+    continuam sendo apagados diretamente.
+    """
+
+    CONTENT_ADDRESSED_PATTERN = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+    EXTENSION_PATTERN = re.compile(r'^\.[a-z0-9]{1,15}$')
+
+    def get_available_name(self, name, max_length=None):
+        """O nome final vem do hash; conteúdo igual reutiliza o mesmo arquivo."""
+        return name
+
+    def _save(self, name, content):
+        """
+        Grava ``content`` pelo hash e registra uma referência.
+
+        Args:
+            name (str): Nome sugerido; apenas a pasta e a extensão são usadas
+            content: File do Django (lido com ``chunks()``)
+
+        Returns:
+            str: Nome relativo do arquivo armazenado
+        """
+        incoming = os.path.join(self.location, os.path.dirname(name))
+        os.makedirs(incoming, exist_ok=True)
+
+        hasher = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(dir=incoming, suffix='.upload')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    file.write(chunk)
+
+            return self.store(temporary, name, hasher.hexdigest())
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def adopt(self, path, name, digest=None):
+        """
+        Move para a storage um arquivo local já completo, sem copiá-lo.
+
+        Args:
+            path (str): Caminho do arquivo (é movido ou removido)
+            name (str): Nome sugerido; apenas a pasta e a extensão são usadas
+            digest (str): SHA-256 já calculado do arquivo, se houver
+
+        Returns:
+            str: Nome relativo do arquivo armazenado
+        """
+        return self.store(path, name, digest or self.file_digest(path))
+
+    def store(self, path, name, digest):
+        """
+        Registra uma referência e coloca o arquivo no nome final.
+
+        Se o conteúdo já existe, o arquivo de ``path`` é descartado.
+        """
+        from attachments.models import StoredFile
+
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        if not self.EXTENSION_PATTERN.match(extension):
+            extension = ''
+
+        final_name = '/'.join(part for part in (directory, digest[:2], f'{digest}{extension}') if part)
+
+        with transaction.atomic():
+            stored, created = StoredFile.objects.select_for_update().get_or_create(
+                name=final_name,
+                defaults={'size': os.path.getsize(path), 'references': 0}
+            )
+            StoredFile.objects.filter(id=stored.id).update(references=F('references') + 1)
+
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.chmod(path, self.file_permissions_mode or 0o644)
+                # Renomeia (atômico) no mesmo sistema de arquivos; entre sistemas diferentes, copia
+                shutil.move(path, final_path)
+
+        return final_name
+
+    @staticmethod
+    def file_digest(path, chunk_size=64 * 1024):
+        """Calcula o SHA-256 de um arquivo lendo em blocos."""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def delete(self, name):
+        """
+        Remove uma referência ao arquivo; apaga o arquivo na última.
+
+        Args:
+            name (str): Nome relativo retornado por ``save``
+        """
+        from attachments.models import StoredFile
+
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                # Arquivo anterior à storage endereçada por conteúdo
+                return super().delete(name)
+
+            if stored.references > 1:
+                StoredFile.objects.filter(id=stored.id).update(references=F('references') - 1)
+                return
+
+            stored.delete()
+            super().delete(name)
+
+    def is_content_addressed(self, name):
+        """Verifica se o nome segue o formato endereçado por conteúdo."""
+        return bool(self.CONTENT_ADDRESSED_PATTERN.search(name))
+
+    def name_from_url(self, url):
+        """
+        Converte a URL pública (/media/...) de volta no nome relativo.
+
+        Returns:
+            str: Nome relativo ou None se a URL não pertence à storage
+        """
+        if not url:
+            return None
+
+        url = '/' + url.replace(settings.CURRENT_URL, '', 1).lstrip('/')
+        base_url = self.base_url
+        if not url.startswith(base_url):
+            return None
+
+        return url[len(base_url):]
+
+    def release_url(self, url):
+        """Remove uma referência ao arquivo da URL pública (ignora URLs externas)."""
+        name = self.name_from_url(url)
+        if name:
+            self.delete(name)
+
+
+# Usa MEDIA_ROOT/MEDIA_URL (lidos sob demanda, respeitando override_settings)
+media_storage = ContentAddressedStorage()
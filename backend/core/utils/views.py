@@ -0,0 +1,45 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView com handlers ``async def``.
+
+    O DRF só executa handlers síncronos; sob ASGI isso faz cada requisição
+    ocupar uma thread via ``sync_to_async``. Aqui o ``dispatch`` é uma
+    corrotina: autenticação, permissões e throttling (código síncrono que
+    pode ir ao banco) rodam em ``sync_to_async`` e o handler é aguardado
+    diretamente no event loop. Tratamento de exceções e ``finalize_response``
+    são os mesmos do APIView.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Versão assíncrona de ``APIView.dispatch``."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            # Get the appropriate handler method
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(),
+                                  self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
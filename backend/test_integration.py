@@ -78,7 +78,8 @@ class UserAuthenticationFlowTest(APITestCase):
         get_response = self.client.get(avatar_url)
         self.assertEqual(get_response.status_code, status.HTTP_200_OK)
         self.assertFalse(get_response.data['has_custom_avatar'])
-        self.assertIn('ui-avatars.com', get_response.data['avatar_url'])
+        self.assertNotIn('ui-avatars.com', get_response.data['avatar_url'])
+        self.assertIn('/avatars/initials/TU/', get_response.data['avatar_url'])
         
         # 3. Upload de avatar customizado
         image = Image.new('RGB', (100, 100), color='red')
@@ -282,7 +283,8 @@ class AttachmentFlowTest(APITestCase):
             extension='pdf',
             size=2048,
             src='/media/uploads/document.pdf',
-            content_type='application/pdf'
+            content_type='application/pdf',
+            user=self.user1
         )
         
         # 2. Enviar mensagem com anexo
@@ -316,7 +318,8 @@ class AttachmentFlowTest(APITestCase):
         
         # 1. Criar anexo de áudio
         audio_attachment = AudioAttachment.objects.create(
-            src='/media/uploads/voice_message.mp3'
+            src='/media/uploads/voice_message.mp3',
+            user=self.user1
         )
         
         # 2. Enviar mensagem com anexo de áudio